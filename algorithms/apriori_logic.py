@@ -1,17 +1,187 @@
 # algorithms/apriori_logic.py
-from collections import defaultdict
-from itertools import combinations
+from array import array
+from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, repeat
 import math
+import os
+import time
+import zlib
+from algorithms.rule_generation import generate_association_rules
+try:
+    import numpy as np
+except ImportError: # NumPy chỉ cần cho counting_backend="numpy"
+    np = None
 # PerformanceMetrics sẽ được truyền vào từ main visualizer script
-# from utils.metrics_collector import PerformanceMetrics 
+# from utils.metrics_collector import PerformanceMetrics
+
+COUNTING_BACKENDS = ("python", "numpy")
+_NUMPY_BATCH_CELLS = 1 << 24 # Số ô bool tối đa của ma trận tạm khi đếm một lô ứng viên
+
+_TRIE_LEAF = None # Khóa đánh dấu nút trie kết thúc một ứng viên
+
+def _iter_weighted(transactions, weights):
+    """Duyệt (giao dịch, trọng số); trọng số là 1 khi weights là None."""
+    return zip(transactions, repeat(1) if weights is None else weights)
+
+def _build_candidate_trie(candidates):
+    """
+    Xây prefix trie từ các ứng viên (frozenset) theo thứ tự item đã sắp xếp.
+    Mỗi nút là dict {item: nút con}; khóa _TRIE_LEAF giữ ứng viên kết thúc tại nút đó.
+    Các ứng viên có thể có độ dài khác nhau.
+    """
+    trie_root = {}
+    for candidate in candidates:
+        node = trie_root
+        for item in sorted(candidate):
+            node = node.setdefault(item, {})
+        node[_TRIE_LEAF] = candidate
+    return trie_root
+
+def _count_trie_matches(node, sorted_items, start, item_counts, weight=1):
+    """
+    Duyệt trie theo các item (đã sắp xếp) của một giao dịch, cộng weight (số lần lặp của giao dịch)
+    cho mỗi ứng viên chứa trong giao dịch.
+    """
+    for i in range(start, len(sorted_items)):
+        child = node.get(sorted_items[i])
+        if child is None:
+            continue
+        candidate = child.get(_TRIE_LEAF)
+        if candidate is not None:
+            item_counts[candidate] += weight
+            if len(child) == 1: # Nút lá, không còn nhánh con
+                continue
+        _count_trie_matches(child, sorted_items, i + 1, item_counts, weight)
+
+def _count_candidates_with_trie(candidates, transactions, min_candidate_length=1, weights=None):
+    """
+    Đếm support cho các ứng viên bằng prefix trie: mỗi giao dịch chỉ duyệt
+    những nhánh trie khớp với item của nó thay vì thử issubset với mọi ứng viên.
+    weights (nếu có) là số lần lặp của từng giao dịch, song song với transactions.
+    Returns:
+        defaultdict: {candidate (frozenset): support_count}
+    """
+    item_counts = defaultdict(int)
+    if not candidates:
+        return item_counts
+    trie_root = _build_candidate_trie(candidates)
+    candidate_items = set().union(*candidates)
+    for transaction, weight in _iter_weighted(transactions, weights):
+        relevant_items = transaction & candidate_items
+        if len(relevant_items) < min_candidate_length:
+            continue
+        _count_trie_matches(trie_root, sorted(relevant_items), 0, item_counts, weight)
+    return item_counts
+
+def _pair_bucket(pair, num_buckets):
+    """
+    Bucket DHP của một cặp item (tuple đã sắp xếp). Dùng crc32 thay cho hash() vì hash của str khác nhau
+    giữa các tiến trình (PYTHONHASHSEED), còn bucket đếm ở các worker được cộng dồn và tra ở tiến trình chính.
+    """
+    return zlib.crc32(repr(pair).encode()) % num_buckets
+
+def _count_items_and_pair_buckets(transactions, weights=None, num_buckets=0):
+    """
+    Đếm 1-itemset; nếu num_buckets > 0 thì trong cùng vòng lặp băm mọi cặp item (đã sắp xếp)
+    của giao dịch vào mảng đếm bucket (DHP).
+    Returns:
+        tuple: (Counter {item: support_count}, array('I') đếm theo bucket hoặc None)
+    """
+    item_counts = Counter()
+    bucket_counts = array('I', bytes(4 * num_buckets)) if num_buckets else None
+    for transaction, weight in _iter_weighted(transactions, weights):
+        for item in transaction:
+            item_counts[item] += weight
+        if bucket_counts is not None:
+            for pair in combinations(sorted(transaction), 2):
+                bucket_counts[_pair_bucket(pair, num_buckets)] += weight
+    return item_counts, bucket_counts
+
+# --- Đếm song song (count distribution) ---
+# Mỗi tiến trình worker nhận toàn bộ DB một lần qua initializer của pool,
+# sau đó mỗi mức chỉ nhận (khoảng shard, ứng viên của mức đó).
+_WORKER_TRANSACTIONS = None
+_WORKER_WEIGHTS = None
+
+def _init_count_worker(transactions, weights=None):
+    global _WORKER_TRANSACTIONS, _WORKER_WEIGHTS
+    _WORKER_TRANSACTIONS = transactions
+    _WORKER_WEIGHTS = weights
+
+def _count_shard_worker(shard_start, shard_end, candidates, min_candidate_length,
+                        shard_transactions=None, shard_weights=None, num_buckets=0):
+    """
+    Đếm support trên một shard giao dịch. Nếu candidates là None thì đếm 1-itemset
+    (và băm các cặp item vào num_buckets bucket DHP nếu num_buckets > 0).
+    shard_transactions (và shard_weights) được truyền khi DB đã bị rút gọn (khác DB gửi lúc khởi tạo worker).
+    Returns:
+        tuple: (counts dict, bucket DHP của shard hoặc None, thời gian đếm (giây), pid worker, số giao dịch của shard)
+    """
+    started = time.perf_counter()
+    if shard_transactions is None:
+        shard_transactions = _WORKER_TRANSACTIONS[shard_start:shard_end]
+        if _WORKER_WEIGHTS is not None:
+            shard_weights = _WORKER_WEIGHTS[shard_start:shard_end]
+    bucket_counts = None
+    if candidates is None:
+        counts, bucket_counts = _count_items_and_pair_buckets(shard_transactions, shard_weights, num_buckets)
+    else:
+        counts = _count_candidates_with_trie(candidates, shard_transactions, min_candidate_length, shard_weights)
+    return dict(counts), bucket_counts, time.perf_counter() - started, os.getpid(), len(shard_transactions)
+
+def _shard_bounds(num_items, num_shards):
+    """Chia [0, num_items) thành tối đa num_shards khoảng liên tiếp có kích thước gần bằng nhau."""
+    num_shards = max(1, min(num_shards, num_items))
+    step = math.ceil(num_items / num_shards) if num_items else 0
+    return [(start, min(start + step, num_items)) for start in range(0, num_items, step)] if step else []
 
 class AprioriAlgorithm:
-    def __init__(self, transactions, min_support_count, metrics_collector):
+    def __init__(self, transactions, min_support_count, metrics_collector, counting_backend="python",
+                 transaction_reduction=False, n_jobs=1, dhp_buckets=0, triangular_l2=False,
+                 transaction_weights=None):
+        """
+        Args:
+            counting_backend (str): "python" (prefix trie, bản tham chiếu) hoặc "numpy"
+                (ma trận one-hot bool, đếm support bằng phép AND theo cột trong NumPy).
+            transaction_reduction (bool): Nếu True, sau mỗi lần tạo Lk sẽ rút gọn DB (kiểu AprioriTid):
+                bỏ item không thuộc k-itemset phổ biến nào và bỏ giao dịch còn ít hơn k+1 item.
+            n_jobs (int): Số tiến trình dùng để đếm support (chia DB thành n_jobs shard,
+                đếm song song rồi gộp). 1 = tuần tự. Với backend numpy chỉ áp dụng cho L1.
+            dhp_buckets (int): Số bucket cho kỹ thuật DHP. Nếu > 0, trong cùng vòng lặp đếm L1 (và trong cùng
+                các shard khi n_jobs > 1) mỗi cặp item của từng giao dịch được băm vào mảng đếm bucket;
+                ứng viên C2 có bucket < min_support bị loại trước khi quét.
+            triangular_l2 (bool): Nếu True, mức k=2 được đếm trực tiếp trên mảng tam giác phẳng theo chỉ số
+                của các item phổ biến (không tạo ứng viên frozenset, không dùng dict đếm); bỏ qua C2 và DHP.
+            transaction_weights (list[int], optional): Số lần lặp của từng giao dịch (song song với transactions),
+                ví dụ sau khi gộp giỏ hàng trùng bằng compress_duplicate_transactions. Mỗi lần đếm cộng trọng số
+                thay vì 1; None = mọi giao dịch có trọng số 1.
+        """
+        if counting_backend not in COUNTING_BACKENDS:
+            raise ValueError(f"counting_backend phải là một trong {COUNTING_BACKENDS}, nhận được: {counting_backend!r}")
+        if counting_backend == "numpy" and np is None:
+            raise ImportError("counting_backend='numpy' cần cài đặt numpy (pip install numpy).")
+        if transaction_weights is not None and len(transaction_weights) != len(transactions):
+            raise ValueError("transaction_weights phải có cùng độ dài với transactions.")
         self.transactions_list_of_sets = [set(t) for t in transactions]
-        self.num_transactions = len(transactions)
+        self.transaction_weights = list(transaction_weights) if transaction_weights is not None else None
+        # Số giao dịch gốc (tổng trọng số) dùng cho support tương đối trong luật
+        self.num_transactions = sum(self.transaction_weights) if self.transaction_weights is not None else len(transactions)
         self.min_support_count = min_support_count
         self.metrics = metrics_collector
+        self.counting_backend = counting_backend
+        self.transaction_reduction = transaction_reduction
+        self._working_transactions = self.transactions_list_of_sets # DB dùng để quét (có thể bị rút gọn)
+        self._working_weights = self.transaction_weights # Trọng số song song với _working_transactions
+        self.n_jobs = max(1, n_jobs or 1)
+        self._executor = None # ProcessPoolExecutor, chỉ tồn tại trong run() khi n_jobs > 1
+        self.dhp_buckets = max(0, dhp_buckets or 0)
+        self._pair_bucket_counts = None # array('I') đếm cặp item theo bucket, chỉ dùng khi dhp_buckets > 0
+        self.triangular_l2 = triangular_l2
         self.intermediate_steps_data = [] # Lưu trữ dữ liệu cho từng bước để trực quan hóa
+        self._item_matrix = None # Ma trận one-hot (item x giao dịch), chỉ dùng với backend numpy
+        self._matrix_weights = None # Vector trọng số theo cột của _item_matrix (None = trọng số 1)
+        self._matrix_item_index = {} # {item: chỉ số hàng trong _item_matrix}
 
     def _log_step_data(self, step_name, data_dict, k=None, notes=None):
         """Ghi lại dữ liệu của một bước."""
@@ -25,11 +195,15 @@ class AprioriAlgorithm:
     def _generate_L1(self):
         """Tạo tập 1-itemset phổ biến (L1)."""
         self.metrics.start_step("Apriori: Tạo L1 - Đếm 1-itemsets")
-        item_counts = defaultdict(int)
-        for transaction in self.transactions_list_of_sets:
-            for item in transaction:
-                item_counts[frozenset([item])] += 1
-        
+        # DHP: các cặp item được băm vào bucket ngay trong lượt đếm L1 (không cần quét thêm DB)
+        num_buckets = self.dhp_buckets if not self.triangular_l2 else 0
+        if self._executor is not None:
+            single_item_counts, self._pair_bucket_counts = self._count_in_parallel(None, 1, num_buckets)
+        else:
+            single_item_counts, self._pair_bucket_counts = _count_items_and_pair_buckets(
+                self.transactions_list_of_sets, self.transaction_weights, num_buckets)
+        item_counts = {frozenset([item]): count for item, count in single_item_counts.items()}
+
         self._log_step_data("Đếm 1-itemset ban đầu (C1)", dict(item_counts), k=1, 
                             notes=f"Tổng số 1-itemset ứng viên: {len(item_counts)}")
         self.metrics.record_apriori_candidates(1, len(item_counts))
@@ -44,23 +218,35 @@ class AprioriAlgorithm:
         return L1
 
     def _generate_candidates_Ck(self, Lk_minus_1_itemsets, k):
-      """Tạo tập ứng viên k-itemset (Ck) từ (k-1)-itemset phổ biến (Lk-1)."""
+      """
+      Tạo tập ứng viên k-itemset (Ck) từ (k-1)-itemset phổ biến (Lk-1).
+      Chỉ join các itemset (dạng tuple đã sắp xếp) có chung tiền tố (k-2) phần tử,
+      thay vì hợp mọi cặp rồi loại các hợp có kích thước khác k.
+      """
       self.metrics.start_step(f"Apriori: Tạo C{k} - Bước Join")
       candidates_Ck = set()
-      prev_frequent_items_list = list(Lk_minus_1_itemsets) # list of frozensets
 
-      for i in range(len(prev_frequent_items_list)):
-          for j in range(i + 1, len(prev_frequent_items_list)):
-              itemset1 = prev_frequent_items_list[i]
-              itemset2 = prev_frequent_items_list[j]
-              union_set = itemset1 | itemset2
-              if len(union_set) == k:
-                  candidates_Ck.add(union_set)
+      # Nhóm các (k-1)-itemset theo tiền tố (k-2) phần tử: {prefix: [item cuối, ...]}
+      last_items_by_prefix = defaultdict(list)
+      for itemset in Lk_minus_1_itemsets:
+          sorted_items = tuple(sorted(itemset))
+          last_items_by_prefix[sorted_items[:-1]].append(sorted_items[-1])
+
+      pairs_joined = 0
+      for prefix, last_items in last_items_by_prefix.items():
+          last_items.sort()
+          for i in range(len(last_items)):
+              for j in range(i + 1, len(last_items)):
+                  candidates_Ck.add(frozenset(prefix + (last_items[i], last_items[j])))
+                  pairs_joined += 1
 
-      self._log_step_data(f"C{k} - Ứng viên {k}-itemset (sau Join)", 
+      self._log_step_data(f"C{k} - Ứng viên {k}-itemset (sau Join)",
                           list(candidates_Ck), k=k,
-                          notes=f"Số ứng viên sau join: {len(candidates_Ck)}")
-      self.metrics.end_step(additional_info={"candidates_after_join": len(candidates_Ck)})
+                          notes=f"Số ứng viên sau join: {len(candidates_Ck)} "
+                                f"(join theo tiền tố, {len(last_items_by_prefix)} nhóm tiền tố)")
+      self.metrics.end_step(additional_info={"candidates_after_join": len(candidates_Ck),
+                                             "prefix_groups": len(last_items_by_prefix),
+                                             "pairs_joined": pairs_joined})
       return candidates_Ck
 
     def _prune_candidates_Ck(self, Ck, Lk_minus_1_itemsets_set, k):
@@ -76,23 +262,38 @@ class AprioriAlgorithm:
                     break
             if is_valid:
                 pruned_Ck.add(candidate)
-        
-        self._log_step_data(f"C{k} - Ứng viên {k}-itemset (sau Prune)", 
-                            list(pruned_Ck), k=k,
-                            notes=f"Số ứng viên sau prune: {len(pruned_Ck)}")
-        self.metrics.record_apriori_candidates(k, len(pruned_Ck))
-        self.metrics.end_step(additional_info={"candidates_after_prune": len(pruned_Ck)})
+
+        # DHP: loại các 2-itemset có bucket băm chưa đạt min_support (support thật <= số đếm bucket)
+        pruned_by_hash = 0
+        if k == 2 and self._pair_bucket_counts is not None:
+            candidates_before_hash = len(pruned_Ck)
+            pruned_Ck = {
+                candidate for candidate in pruned_Ck
+                if self._pair_bucket_counts[_pair_bucket(tuple(sorted(candidate)), self.dhp_buckets)] >= self.min_support_count
+            }
+            pruned_by_hash = candidates_before_hash - len(pruned_Ck)
+
+        notes = f"Số ứng viên sau prune: {len(pruned_Ck)}"
+        if pruned_by_hash:
+            notes += f" (DHP loại thêm {pruned_by_hash} ứng viên)"
+        self._log_step_data(f"C{k} - Ứng viên {k}-itemset (sau Prune)",
+                            list(pruned_Ck), k=k, notes=notes)
+        self.metrics.record_apriori_candidates(k, len(pruned_Ck), pruned_by_hash=pruned_by_hash)
+        self.metrics.end_step(additional_info={"candidates_after_prune": len(pruned_Ck),
+                                               "pruned_by_hash": pruned_by_hash})
         return pruned_Ck
 
     def _scan_transactions_for_Lk(self, Ck_pruned, k):
-        """Quét DB để đếm support cho các ứng viên đã tỉa và tạo Lk."""
+        """Quét DB để đếm support cho các ứng viên đã tỉa (qua prefix trie hoặc ma trận NumPy) và tạo Lk."""
         self.metrics.start_step(f"Apriori: Tạo L{k} - Đếm support và Lọc")
-        item_counts = defaultdict(int)
-        for transaction in self.transactions_list_of_sets:
-            for candidate in Ck_pruned:
-                if candidate.issubset(transaction):
-                    item_counts[candidate] += 1
-        
+        if self.counting_backend == "numpy":
+            item_counts = self._count_candidates_with_matrix(Ck_pruned, k)
+        elif self._executor is not None:
+            item_counts, _ = self._count_in_parallel(Ck_pruned, k)
+        else:
+            item_counts = _count_candidates_with_trie(Ck_pruned, self._working_transactions,
+                                                      min_candidate_length=k, weights=self._working_weights)
+
         Lk = {itemset: count for itemset, count in item_counts.items() if count >= self.min_support_count}
         self._log_step_data(f"L{k} - {k}-itemset phổ biến", dict(Lk), k=k,
                             notes=f"Số {k}-itemset phổ biến: {len(Lk)}")
@@ -100,23 +301,219 @@ class AprioriAlgorithm:
         self.metrics.end_step(additional_info={"frequent_count": len(Lk)})
         return Lk
 
+    def _count_in_parallel(self, candidates, k, num_buckets=0):
+        """
+        Đếm support song song: mỗi shard của DB được đếm bởi một worker (ứng viên của mức k
+        được gửi một lần cho mỗi shard), sau đó gộp các bộ đếm và ghi thời gian từng worker.
+        Với k = 1 và num_buckets > 0, mỗi worker băm luôn các cặp item của shard vào bucket DHP.
+        Returns:
+            tuple: (Counter đã gộp, array('I') bucket DHP đã gộp hoặc None)
+        """
+        db_is_original = self._working_transactions is self.transactions_list_of_sets
+        futures = []
+        for shard_start, shard_end in _shard_bounds(len(self._working_transactions), self.n_jobs):
+            # DB đã rút gọn không còn khớp với bản worker nhận lúc khởi tạo nên phải gửi kèm shard
+            shard_transactions = shard_weights = None
+            if not db_is_original:
+                shard_transactions = self._working_transactions[shard_start:shard_end]
+                if self._working_weights is not None:
+                    shard_weights = self._working_weights[shard_start:shard_end]
+            futures.append(self._executor.submit(_count_shard_worker, shard_start, shard_end,
+                                                 candidates, k, shard_transactions, shard_weights, num_buckets))
+
+        merged_counts = Counter()
+        merged_buckets = array('I', bytes(4 * num_buckets)) if num_buckets else None
+        for shard_index, future in enumerate(futures):
+            shard_counts, shard_buckets, duration, worker_pid, shard_size = future.result()
+            merged_counts.update(shard_counts)
+            if merged_buckets is not None:
+                for bucket, count in enumerate(shard_buckets):
+                    if count:
+                        merged_buckets[bucket] += count
+            self.metrics.record_apriori_worker_timing(k, shard_index, worker_pid, duration, shard_size)
+        return merged_counts, merged_buckets
+
+    def _build_item_matrix(self, L1):
+        """
+        Mã hóa one-hot DB một lần thành ma trận bool (item phổ biến x giao dịch).
+        Chỉ giữ các item trong L1 vì mọi ứng viên k >= 2 đều chỉ gồm các item này.
+        """
+        self.metrics.start_step("Apriori: Mã hóa one-hot giao dịch (NumPy)")
+        frequent_items = sorted(item for itemset in L1 for item in itemset)
+        self._matrix_item_index = {item: row for row, item in enumerate(frequent_items)}
+
+        row_indices, col_indices = [], []
+        for tid, transaction in enumerate(self.transactions_list_of_sets):
+            for item in transaction:
+                row = self._matrix_item_index.get(item)
+                if row is not None:
+                    row_indices.append(row)
+                    col_indices.append(tid)
+        self._item_matrix = np.zeros((len(frequent_items), len(self.transactions_list_of_sets)), dtype=np.bool_)
+        self._item_matrix[row_indices, col_indices] = True
+        if self.transaction_weights is not None:
+            self._matrix_weights = np.array(self.transaction_weights, dtype=np.int64)
+
+        self.metrics.end_step(additional_info={"matrix_shape": self._item_matrix.shape,
+                                               "matrix_MB": self._item_matrix.nbytes / (1024 * 1024)})
+
+    def _count_candidates_with_matrix(self, Ck_pruned, k):
+        """
+        Đếm support của các k-itemset ứng viên trên ma trận one-hot: với mỗi lô ứng viên,
+        AND các hàng item tương ứng rồi đếm số cột True (toàn bộ chạy trong NumPy).
+        """
+        candidates = list(Ck_pruned)
+        candidate_rows = np.array(
+            [[self._matrix_item_index[item] for item in candidate] for candidate in candidates],
+            dtype=np.intp
+        ).reshape(len(candidates), k)
+
+        batch_size = max(1, _NUMPY_BATCH_CELLS // max(1, self._item_matrix.shape[1]))
+        support_counts = np.empty(len(candidates), dtype=np.int64)
+        for start in range(0, len(candidates), batch_size):
+            batch_rows = candidate_rows[start:start + batch_size]
+            contains_all = self._item_matrix[batch_rows[:, 0]] # (lô, số giao dịch), bản sao
+            for j in range(1, k):
+                contains_all &= self._item_matrix[batch_rows[:, j]]
+            if self._matrix_weights is None:
+                support_counts[start:start + batch_size] = np.count_nonzero(contains_all, axis=1)
+            else: # Giao dịch có trọng số: tổng trọng số của các cột chứa đủ item
+                support_counts[start:start + batch_size] = contains_all @ self._matrix_weights
+
+        return {candidate: int(count) for candidate, count in zip(candidates, support_counts) if count > 0}
+
+    def _count_pairs_triangular(self, L1):
+        """
+        Tạo L2 trực tiếp: ánh xạ item phổ biến sang chỉ số 0..n-1 và đếm mọi cặp (i < j) cùng xuất hiện
+        trong một mảng tam giác phẳng array('I') kích thước n(n-1)/2, ô của cặp (i, j) nằm tại
+        i*(2n-i-1)/2 + (j-i-1).
+        """
+        self.metrics.start_step("Apriori: Tạo L2 - Đếm cặp bằng mảng tam giác")
+        frequent_items = sorted(item for itemset in L1 for item in itemset)
+        item_index = {item: index for index, item in enumerate(frequent_items)}
+        n = len(frequent_items)
+        # row_offsets[i] + j = vị trí của cặp (i, j) trong mảng phẳng
+        row_offsets = [i * (2 * n - i - 1) // 2 - i - 1 for i in range(n)]
+        pair_counts = array('I', bytes(4 * (n * (n - 1) // 2)))
+
+        for transaction, weight in _iter_weighted(self._working_transactions, self._working_weights):
+            indices = sorted(item_index[item] for item in transaction if item in item_index)
+            for position, i in enumerate(indices):
+                row_offset = row_offsets[i]
+                for j in indices[position + 1:]:
+                    pair_counts[row_offset + j] += weight
+
+        L2 = {}
+        if np is not None:
+            flat_counts = np.frombuffer(pair_counts, dtype=np.uint32)
+            frequent_positions = np.flatnonzero(flat_counts >= self.min_support_count)
+            row_starts = np.array([row_offsets[i] + i + 1 for i in range(n)], dtype=np.int64)
+            rows = np.searchsorted(row_starts, frequent_positions, side='right') - 1
+            for position, i in zip(frequent_positions.tolist(), rows.tolist()):
+                j = position - row_offsets[i]
+                L2[frozenset((frequent_items[i], frequent_items[j]))] = pair_counts[position]
+        else:
+            for i in range(n):
+                row_start = row_offsets[i] + i + 1
+                for j, count in enumerate(pair_counts[row_start:row_start + n - i - 1], start=i + 1):
+                    if count >= self.min_support_count:
+                        L2[frozenset((frequent_items[i], frequent_items[j]))] = count
+
+        self._log_step_data("L2 - 2-itemset phổ biến (mảng tam giác)", dict(L2), k=2,
+                            notes=f"Đếm {len(pair_counts)} cặp của {n} item phổ biến, số 2-itemset phổ biến: {len(L2)}")
+        self.metrics.record_apriori_candidates(2, len(pair_counts))
+        self.metrics.record_apriori_frequent_items(2, len(L2))
+        self.metrics.end_step(additional_info={"candidate_count": len(pair_counts),
+                                               "frequent_count": len(L2),
+                                               "triangular_array_MB": pair_counts.itemsize * len(pair_counts) / (1024 * 1024)})
+        return L2
+
+    def _reduce_transactions(self, Lk, k):
+        """
+        Rút gọn DB sau khi có Lk: chỉ giữ các item xuất hiện trong ít nhất một k-itemset phổ biến,
+        và bỏ các giao dịch còn ít hơn k+1 item (không thể chứa ứng viên (k+1) nào).
+        """
+        self.metrics.start_step(f"Apriori: Rút gọn DB sau L{k}")
+        items_in_Lk = set().union(*Lk)
+        transactions_before = len(self._working_transactions)
+
+        reduced_transactions = []
+        kept_positions = [] # Vị trí (trong DB hiện tại) của các giao dịch được giữ lại
+        for position, transaction in enumerate(self._working_transactions):
+            reduced = transaction & items_in_Lk
+            if len(reduced) > k:
+                reduced_transactions.append(reduced)
+                kept_positions.append(position)
+        self._working_transactions = reduced_transactions
+        if self._working_weights is not None:
+            self._working_weights = [self._working_weights[position] for position in kept_positions]
+        if self._item_matrix is not None:
+            self._item_matrix = self._item_matrix[:, kept_positions]
+            if self._matrix_weights is not None:
+                self._matrix_weights = self._matrix_weights[kept_positions]
+
+        items_remaining = len(set().union(*reduced_transactions)) if reduced_transactions else 0
+        self._log_step_data(f"Rút gọn DB sau L{k}",
+                            {"transactions_before": transactions_before,
+                             "transactions_remaining": len(reduced_transactions),
+                             "items_remaining": items_remaining},
+                            k=k,
+                            notes=f"Còn {len(reduced_transactions)}/{transactions_before} giao dịch, {items_remaining} item")
+        self.metrics.record_apriori_db_size(k + 1, len(reduced_transactions))
+        self.metrics.end_step(additional_info={"transactions_remaining": len(reduced_transactions),
+                                               "items_remaining": items_remaining})
+
     def run(self):
         """Chạy thuật toán Apriori."""
         self.metrics.start_overall_measurement()
         self.intermediate_steps_data = [] # Reset
-        
+        self._working_transactions = self.transactions_list_of_sets
+        self._working_weights = self.transaction_weights
+        self._item_matrix = None
+        self._matrix_weights = None
+        self._pair_bucket_counts = None
+
+        if self.n_jobs > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_count_worker,
+                                                 initargs=(self.transactions_list_of_sets, self.transaction_weights))
+        try:
+            all_frequent_itemsets = self._run_levels()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+        self.metrics.end_overall_measurement()
+        return all_frequent_itemsets, self.intermediate_steps_data
+
+    def _run_levels(self):
+        """Vòng lặp theo mức của Apriori: L1, rồi (Join, Prune, Quét) cho tới khi Lk rỗng."""
         all_frequent_itemsets = {} # {itemset: support_count}
 
         # Bước 1: Tạo L1
         L1 = self._generate_L1()
         if not L1:
-            self.metrics.end_overall_measurement()
-            return {}, self.intermediate_steps_data # Trả về dict rỗng nếu không có L1
+            return {} # Trả về dict rỗng nếu không có L1
         
         all_frequent_itemsets.update(L1)
-        
+        if self.counting_backend == "numpy":
+            self._build_item_matrix(L1)
+        if self.transaction_reduction:
+            self._reduce_transactions(L1, 1)
+
         Lk_minus_1 = L1
         k = 2
+        if self.triangular_l2:
+            L2 = self._count_pairs_triangular(L1)
+            if not L2:
+                self._log_step_data("L2 - Kết thúc", {}, k=2, notes="Không có 2-itemset phổ biến nào.")
+                return all_frequent_itemsets
+            all_frequent_itemsets.update(L2)
+            if self.transaction_reduction:
+                self._reduce_transactions(L2, 2)
+            Lk_minus_1 = L2
+            k = 3
+
         while Lk_minus_1: # Tiếp tục khi Lk-1 không rỗng
             Lk_minus_1_itemsets_set = set(Lk_minus_1.keys()) # Dùng cho bước prune
 
@@ -139,76 +536,21 @@ class AprioriAlgorithm:
                 break
 
             all_frequent_itemsets.update(Lk)
+            if self.transaction_reduction:
+                self._reduce_transactions(Lk, k)
             Lk_minus_1 = Lk
             k += 1
-            
-        self.metrics.end_overall_measurement()
-        return all_frequent_itemsets, self.intermediate_steps_data
+
+        return all_frequent_itemsets
 
     def generate_association_rules(self, all_frequent_itemsets, min_confidence):
         """
-        Sinh luật kết hợp từ các tập mục phổ biến.
+        Sinh luật kết hợp từ các tập mục phổ biến (xem rule_generation.generate_association_rules).
         Args:
             all_frequent_itemsets (dict): {frozenset: support_count}
             min_confidence (float): Ngưỡng confidence tối thiểu.
         Returns:
             list: Danh sách các luật, mỗi luật là một dict.
         """
-        if not all_frequent_itemsets:
-            return []
-
-        self.metrics.start_step("Apriori: Sinh Luật Kết Hợp")
-        rules = []
-        
-        for itemset, support_itemset_count in all_frequent_itemsets.items():
-            if len(itemset) < 2: # Luật cần ít nhất 2 item
-                continue
-
-            # Sinh tất cả các tập con không rỗng của itemset để làm tiền đề (antecedent)
-            # Chỉ cần duyệt các tập con có độ dài từ 1 đến len(itemset)-1
-            for i in range(1, len(itemset)):
-                for antecedent_tuple in combinations(itemset, i):
-                    antecedent = frozenset(antecedent_tuple)
-                    consequent = itemset.difference(antecedent)
-
-                    # Lấy support count của antecedent
-                    support_antecedent_count = all_frequent_itemsets.get(antecedent)
-
-                    if support_antecedent_count is None or support_antecedent_count == 0:
-                        # Điều này không nên xảy ra nếu all_frequent_itemsets chứa tất cả các tập con phổ biến
-                        continue 
-                    
-                    confidence = support_itemset_count / support_antecedent_count
-                    
-                    if confidence >= min_confidence:
-                        support_itemset_frac = support_itemset_count / self.num_transactions
-                        support_antecedent_frac = support_antecedent_count / self.num_transactions
-                        
-                        # Lấy support count của consequent để tính lift
-                        support_consequent_count = all_frequent_itemsets.get(consequent)
-                        if support_consequent_count is None: # Có thể xảy ra nếu consequent là 1 item đơn lẻ và không có trong L1 (ít khả năng)
-                            support_consequent_frac = 0
-                        else:
-                            support_consequent_frac = support_consequent_count / self.num_transactions
-                        
-                        lift = 0
-                        if support_antecedent_frac > 0 and support_consequent_frac > 0:
-                            lift = support_itemset_frac / (support_antecedent_frac * support_consequent_frac)
-                        else: # Tránh chia cho 0 nếu support của consequent là 0 (ví dụ, item không phổ biến đơn lẻ)
-                            lift = 0 # Hoặc có thể coi là không xác định / không thú vị
-
-                        rules.append({
-                            "antecedent": tuple(sorted(list(antecedent))),
-                            "consequent": tuple(sorted(list(consequent))),
-                            "support": support_itemset_frac,
-                            "confidence": confidence,
-                            "lift": lift,
-                            "itemset_support_count": support_itemset_count,
-                            "antecedent_support_count": support_antecedent_count,
-                            "consequent_support_count": support_consequent_count if support_consequent_count is not None else 0
-                        })
-        
-        self._log_step_data("Luật Kết Hợp Đã Sinh", rules, 
-                            notes=f"Số luật: {len(rules)} với min_confidence={min_confidence:.2f}")
-        self.metrics.end_step(additional_info={"rules_generated": len(rules)})
-        return rules
+        return generate_association_rules(all_frequent_itemsets, self.num_transactions, min_confidence,
+                                          self.metrics, self._log_step_data, algorithm_name="Apriori")
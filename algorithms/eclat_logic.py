@@ -0,0 +1,132 @@
+# algorithms/eclat_logic.py
+from collections import defaultdict
+from algorithms.rule_generation import generate_association_rules
+# PerformanceMetrics sẽ được truyền vào từ main visualizer script
+# from utils.metrics_collector import PerformanceMetrics
+
+try:
+    _popcount = int.bit_count # Python >= 3.10
+except AttributeError:
+    def _popcount(bitset):
+        return bin(bitset).count("1")
+
+class EclatAlgorithm:
+    """
+    Khai phá tập mục phổ biến theo chiều dọc (Eclat): mỗi item giữ một TID-set
+    dạng bitset (số nguyên Python, bit thứ t = giao dịch t chứa item), support của
+    một itemset là số bit 1 sau phép giao (&) các TID-set, duyệt theo chiều sâu.
+    """
+    def __init__(self, transactions, min_support_count, metrics_collector):
+        self.transactions = transactions # list of lists
+        self.num_transactions = len(transactions)
+        self.min_support_count = min_support_count
+        self.metrics = metrics_collector
+        self.intermediate_steps_data = []
+        self.frequent_itemsets_final = {} # {frozenset: support_count}
+        self._intersections_count = 0
+        self._max_depth_reached = 0
+
+    def _log_step_data(self, step_name, data_dict, k=None, notes=None):
+        """Ghi lại dữ liệu của một bước."""
+        log_entry = {"step_name": step_name, "data": data_dict}
+        if k is not None:
+            log_entry["k"] = k
+        if notes is not None:
+            log_entry["notes"] = notes
+        self.intermediate_steps_data.append(log_entry)
+
+    def _build_vertical_database(self):
+        """
+        Chuyển DB sang dạng dọc: {item: bitset TID}. Bitset được dựng qua bytearray
+        rồi đổi sang int một lần cho mỗi item (tránh OR lặp trên số nguyên lớn).
+        """
+        self.metrics.start_step("Eclat: Xây dựng TID-set (bitset) cho 1-itemset")
+        tid_lists = defaultdict(list)
+        for tid, transaction in enumerate(self.transactions):
+            for item in set(transaction):
+                tid_lists[item].append(tid)
+
+        num_bytes = (self.num_transactions + 7) // 8
+        frequent_tidsets = {} # {item: (bitset, support)}
+        for item, tids in tid_lists.items():
+            if len(tids) < self.min_support_count:
+                continue
+            bit_buffer = bytearray(num_bytes)
+            for tid in tids:
+                bit_buffer[tid >> 3] |= 1 << (tid & 7)
+            frequent_tidsets[item] = (int.from_bytes(bit_buffer, "little"), len(tids))
+
+        L1 = {frozenset([item]): support for item, (_, support) in frequent_tidsets.items()}
+        self._log_step_data("L1 - 1-itemset phổ biến (TID-set dọc)", L1, k=1,
+                            notes=f"Tổng số item: {len(tid_lists)}, số 1-itemset phổ biến: {len(L1)}")
+        self.metrics.record_eclat_frequent_items(1, len(L1))
+        self.metrics.end_step(additional_info={"candidate_count": len(tid_lists), "frequent_count": len(L1)})
+        return frequent_tidsets
+
+    def _mine_equivalence_class(self, prefix, class_members, depth):
+        """
+        Khai phá đệ quy một lớp tương đương theo chiều sâu.
+        Args:
+            prefix (tuple): Các item của tiền tố chung.
+            class_members (list): [(item, bitset, support)] đã sắp theo support tăng dần.
+            depth (int): Kích thước itemset của các phần tử trong lớp.
+        """
+        self._max_depth_reached = max(self._max_depth_reached, depth)
+        for i, (item_i, tidset_i, support_i) in enumerate(class_members):
+            new_prefix = prefix + (item_i,)
+            self.frequent_itemsets_final[frozenset(new_prefix)] = support_i
+
+            next_class_members = []
+            for item_j, tidset_j, _ in class_members[i + 1:]:
+                joined_tidset = tidset_i & tidset_j
+                self._intersections_count += 1
+                joined_support = _popcount(joined_tidset)
+                if joined_support >= self.min_support_count:
+                    next_class_members.append((item_j, joined_tidset, joined_support))
+
+            if next_class_members:
+                self.metrics.record_eclat_frequent_items(depth + 1, len(next_class_members))
+                self._mine_equivalence_class(new_prefix, next_class_members, depth + 1)
+
+    def run(self):
+        """Chạy thuật toán Eclat."""
+        self.metrics.start_overall_measurement()
+        self.intermediate_steps_data = []
+        self.frequent_itemsets_final = {}
+        self._intersections_count = 0
+        self._max_depth_reached = 0
+
+        frequent_tidsets = self._build_vertical_database()
+        if not frequent_tidsets:
+            self._log_step_data("Kết thúc sớm", {}, notes="Không có 1-itemset phổ biến nào.")
+            self.metrics.end_overall_measurement()
+            return {}, self.intermediate_steps_data
+
+        # Sắp item theo support tăng dần (heuristic giúp các lớp tương đương nhỏ hơn)
+        root_class = sorted(
+            ((item, bitset, support) for item, (bitset, support) in frequent_tidsets.items()),
+            key=lambda member: (member[2], member[0])
+        )
+
+        self.metrics.start_step("Eclat: Khai phá DFS bằng giao TID-set")
+        self._mine_equivalence_class((), root_class, 1)
+        self.metrics.eclat_tidset_intersections = self._intersections_count
+        self.metrics.eclat_max_depth = self._max_depth_reached
+        self.metrics.end_step(additional_info={"tidset_intersections": self._intersections_count,
+                                               "frequent_count": len(self.frequent_itemsets_final)})
+
+        itemsets_by_k = defaultdict(dict)
+        for itemset, support in self.frequent_itemsets_final.items():
+            itemsets_by_k[len(itemset)][itemset] = support
+        for k in sorted(itemsets_by_k):
+            if k > 1:
+                self._log_step_data(f"L{k} - {k}-itemset phổ biến", itemsets_by_k[k], k=k,
+                                    notes=f"Số {k}-itemset phổ biến: {len(itemsets_by_k[k])}")
+
+        self.metrics.end_overall_measurement()
+        return self.frequent_itemsets_final, self.intermediate_steps_data
+
+    def generate_association_rules(self, all_frequent_itemsets, min_confidence):
+        """Sinh luật kết hợp (dùng chung rule_generation.generate_association_rules)."""
+        return generate_association_rules(all_frequent_itemsets, self.num_transactions, min_confidence,
+                                          self.metrics, self._log_step_data, algorithm_name="Eclat")
@@ -1,6 +1,20 @@
 # algorithms/fp_growth_logic.py
-from collections import defaultdict, Counter
-from itertools import combinations
+import hashlib
+import heapq
+import json
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from datetime import timedelta
+from collections import defaultdict, deque, Counter
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, repeat
+from algorithms.rule_generation import generate_association_rules
 # PerformanceMetrics sẽ được truyền vào từ main visualizer script
 # from utils.metrics_collector import PerformanceMetrics 
 
@@ -16,31 +30,477 @@ class TreeNode:
     def increment_count(self, count_val):
         self.count += count_val
 
+FP_TREE_REPRESENTATIONS = ("object", "array")
+FP_MINING_STRATEGIES = ("recursive", "iterative")
+FP_MINING_MODES = ("all", "closed", "maximal", "top_k")
+_FP_TREE_FILE_MAGIC = b"FPTREE\x00\x02" # Đầu file của save_fp_tree (định dạng phiên bản 2: metadata JSON)
+_SPILL_CHUNK_SIZE = 10000 # Số giao dịch gom lại trong bộ nhớ trước mỗi lần ghi nối vào file projected DB
+_NO_NODE = -1 # Chỉ số "không có nút" trong các mảng của ArrayFPTree
+_FP_ARRAY_MAX_DENSITY = 0.25 # Chỉ dựng FP-array khi mật độ (độ dài đường đi TB / số item) không vượt ngưỡng này
+_FP_ARRAY_MAX_ITEMS = 2000 # Bảng tam giác có ~n²/2 ô 8 byte: quá ngưỡng này thì không dựng FP-array
+
+class ArrayFPTree:
+    """
+    FP-Tree lưu dạng các mảng song song thay vì một đối tượng TreeNode cho mỗi nút.
+    Nút i có: parent[i], item[i] (id item cục bộ), count[i], next_link[i] (node-link cùng item),
+    first_child[i] / next_sibling[i] (để liệt kê con). Trong lúc xây, con của một nút được tra qua một bảng băm
+    duy nhất {parent * số item + item id: chỉ số con}; finalize() giải phóng bảng băm này khi cây đã xây xong,
+    sau đó con chỉ được duyệt qua first_child/next_sibling. Nút 0 là root.
+    Bên ngoài, cây được dùng qua ArrayTreeNode (cùng giao diện với TreeNode) nên
+    _mine_fp_tree_recursively và visualize_fp_tree_interactive không cần thay đổi.
+    """
+    def __init__(self, items, root_name='root'):
+        """
+        Args:
+            items (iterable): Các item có thể xuất hiện trong cây (khóa của header table).
+            root_name (str): Tên nút root (như TreeNode).
+        """
+        self.root_name = root_name
+        self.item_names = list(items) # id item cục bộ -> item
+        self._item_ids = {item: item_id for item_id, item in enumerate(self.item_names)}
+        self.parent = array('i', [_NO_NODE])
+        self.item = array('i', [_NO_NODE])
+        self.count = array('q', [1])
+        self.next_link = array('i', [_NO_NODE])
+        self.first_child = array('i', [_NO_NODE])
+        self.next_sibling = array('i', [_NO_NODE])
+        self._child_index = {} # {parent * len(item_names) + item id: chỉ số nút con}
+        self.link_head = array('i', [_NO_NODE]) * len(self.item_names) # Nút đầu chuỗi node-link của mỗi item
+        self.link_tail = array('i', [_NO_NODE]) * len(self.item_names) # Nút cuối, để nối trong O(1)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def insert(self, path_items, path_count, fp_array=None):
+        """
+        Chèn một giao dịch (item đã sắp theo thứ tự header) với số lần path_count. Chỉ dùng trước finalize().
+        fp_array (FPArray, optional): cộng luôn đường đi vào FP-array; cây phải được tạo với fp_array.item_order
+            để id item trùng thứ hạng trong FP-array.
+        """
+        if self._child_index is None:
+            raise RuntimeError("Không thể chèn vào ArrayFPTree sau finalize().")
+        num_items = len(self.item_names)
+        current = 0
+        path_ids = [] if fp_array is not None else None
+        for item in path_items:
+            item_id = self._item_ids[item]
+            key = current * num_items + item_id
+            child = self._child_index.get(key)
+            if child is None:
+                child = self.add_child(current, item_id, path_count)
+            else:
+                self.count[child] += path_count
+            current = child
+            if path_ids is not None:
+                path_ids.append(item_id)
+        if path_ids is not None:
+            fp_array.add_path(path_ids, path_count)
+
+    def add_child(self, parent, item_id, count):
+        """Thêm một nút con mới của parent (dùng khi chèn giao dịch và khi nạp cây đã lưu); trả về chỉ số nút."""
+        child = len(self.parent)
+        if self._child_index is not None:
+            self._child_index[parent * len(self.item_names) + item_id] = child
+        self.parent.append(parent)
+        self.item.append(item_id)
+        self.count.append(count)
+        self.next_link.append(_NO_NODE)
+        self.first_child.append(_NO_NODE)
+        self.next_sibling.append(self.first_child[parent])
+        self.first_child[parent] = child
+        # Nối nút mới vào cuối chuỗi node-link của item (giữ thứ tự tạo nút như TreeNode)
+        if self.link_tail[item_id] == _NO_NODE:
+            self.link_head[item_id] = child
+        else:
+            self.next_link[self.link_tail[item_id]] = child
+        self.link_tail[item_id] = child
+        return child
+
+    def finalize(self):
+        """Kết thúc giai đoạn xây: giải phóng bảng băm tra con (chỉ cần khi chèn), cây trở thành chỉ đọc."""
+        self._child_index = None
+
+    def child_indices(self, index):
+        """Chỉ số các nút con của nút index theo thứ tự tạo nút (danh sách first_child/next_sibling bị đảo khi nối)."""
+        child_indices = []
+        child = self.first_child[index]
+        while child != _NO_NODE:
+            child_indices.append(child)
+            child = self.next_sibling[child]
+        child_indices.reverse()
+        return child_indices
+
+    def node(self, index):
+        return ArrayTreeNode(self, index) if index != _NO_NODE else None
+
+    @property
+    def root(self):
+        return ArrayTreeNode(self, 0)
+
+    def header_table(self, item_counts):
+        """Header table cùng dạng với cây TreeNode: item -> {'count', 'node', 'tail'}."""
+        return {
+            item: {'count': item_counts[item],
+                   'node': self.node(self.link_head[item_id]),
+                   'tail': self.node(self.link_tail[item_id])}
+            for item_id, item in enumerate(self.item_names)
+        }
+
+    def memory_bytes(self):
+        """Bộ nhớ ước tính của cây: các mảng, cộng bảng băm con (và các int trong đó) nếu chưa finalize()."""
+        total_bytes = sum(sys.getsizeof(arr) for arr in (self.parent, self.item, self.count, self.next_link,
+                                                           self.first_child, self.next_sibling))
+        if self._child_index is not None:
+            total_bytes += sys.getsizeof(self._child_index)
+            total_bytes += sum(sys.getsizeof(key) + sys.getsizeof(child) for key, child in self._child_index.items())
+        return total_bytes
+
+class ArrayTreeNode:
+    """Khung nhìn (view) nhẹ tới một nút của ArrayFPTree, có cùng thuộc tính đọc như TreeNode."""
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, ArrayTreeNode) and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    @property
+    def item_name(self):
+        if self.index == 0:
+            return self.tree.root_name
+        return self.tree.item_names[self.tree.item[self.index]]
+
+    @property
+    def count(self):
+        return self.tree.count[self.index]
+
+    @property
+    def parent(self):
+        return self.tree.node(self.tree.parent[self.index])
+
+    @property
+    def next_node_link(self):
+        return self.tree.node(self.tree.next_link[self.index])
+
+    @property
+    def children(self):
+        """Khung nhìn chỉ đọc {item_name: ArrayTreeNode} theo thứ tự tạo nút (không dựng dict mỗi lần truy cập)."""
+        return ArrayChildrenView(self.tree, self.index)
+
+class ArrayChildrenView(Mapping):
+    """
+    Các con của một nút ArrayFPTree dưới dạng Mapping chỉ đọc {item_name: ArrayTreeNode}, duyệt trực tiếp
+    first_child/next_sibling. bool() chỉ đọc first_child; values()/items() trả về list theo thứ tự tạo nút.
+    """
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    def __bool__(self):
+        return self.tree.first_child[self.index] != _NO_NODE
+
+    def __len__(self):
+        return len(self.tree.child_indices(self.index))
+
+    def __iter__(self):
+        tree = self.tree
+        return (tree.item_names[tree.item[child]] for child in tree.child_indices(self.index))
+
+    def __getitem__(self, item_name):
+        tree = self.tree
+        item_id = tree._item_ids.get(item_name)
+        child = tree.first_child[self.index]
+        while child != _NO_NODE:
+            if tree.item[child] == item_id:
+                return ArrayTreeNode(tree, child)
+            child = tree.next_sibling[child]
+        raise KeyError(item_name)
+
+    def values(self):
+        return [ArrayTreeNode(self.tree, child) for child in self.tree.child_indices(self.index)]
+
+    def items(self):
+        tree = self.tree
+        return [(tree.item_names[tree.item[child]], ArrayTreeNode(tree, child))
+                for child in tree.child_indices(self.index)]
+
+class FPArray:
+    """
+    FP-array (FPgrowth*): ma trận tam giác, hàng của item thứ hạng r chứa tổng count của các đường đi có cả item đó
+    và item thứ hạng r' < r (đứng trước trong cây). Hàng của một item chính là count các item trong Conditional
+    Pattern Base của nó, nên header table của Conditional FP-Tree kế tiếp được lấy thẳng từ đây, không cần
+    duyệt chuỗi node-link. Được cộng dồn ngay khi chèn từng đường đi vào cây.
+    """
+    __slots__ = ("item_order", "item_rank", "rows")
+
+    def __init__(self, item_order):
+        self.item_order = list(item_order) # Thứ tự item trong cây (từ gốc xuống)
+        self.item_rank = {item: rank for rank, item in enumerate(self.item_order)}
+        self.rows = [array('q', bytes(8 * rank)) for rank in range(len(self.item_order))]
+
+    def add_path(self, path_ranks, path_count):
+        """Cộng path_count cho mọi cặp (item trước, item sau) của một đường đi (các thứ hạng theo thứ tự trong cây)."""
+        rows = self.rows
+        earlier_ranks = []
+        for rank in path_ranks:
+            row = rows[rank]
+            for earlier_rank in earlier_ranks:
+                row[earlier_rank] += path_count
+            earlier_ranks.append(rank)
+
+    def add_items(self, path_items, path_count):
+        """Như add_path nhưng nhận chính các item của đường đi (cây TreeNode)."""
+        self.add_path(map(self.item_rank.__getitem__, path_items), path_count)
+
+    def counts_for(self, item):
+        """Count các item trong Conditional Pattern Base của item (chỉ các item có count > 0)."""
+        item_order = self.item_order
+        return {item_order[rank]: count for rank, count in enumerate(self.rows[self.item_rank[item]]) if count}
+
+class MaximalItemsetTree:
+    """
+    MFI-tree (FPMax): cây tiền tố của các tập tối đại đã tìm thấy, item trong mỗi tập được sắp theo thứ tự
+    của FP-Tree chính (phổ biến nhất ở gần gốc). Mỗi item có danh sách các nút của nó (như node-link),
+    nên kiểm tra "X là tập con của một tập tối đại" chỉ cần đi ngược lên từ các nút của item thấp nhất trong X.
+    """
+    def __init__(self, ordered_items):
+        self.item_rank = {item: rank for rank, item in enumerate(ordered_items)}
+        self.root = TreeNode(item_name='mfi_root', count=0, parent_node=None)
+        self.nodes_by_item = defaultdict(list)
+        self._num_nodes = 1
+
+    def __len__(self):
+        return self._num_nodes
+
+    def insert(self, itemset):
+        current_node = self.root
+        for item in sorted(itemset, key=self.item_rank.__getitem__):
+            child_node = current_node.children.get(item)
+            if child_node is None:
+                child_node = TreeNode(item_name=item, count=0, parent_node=current_node)
+                current_node.children[item] = child_node
+                self.nodes_by_item[item].append(child_node)
+                self._num_nodes += 1
+            child_node.increment_count(1)
+            current_node = child_node
+
+    def contains_superset_of(self, itemset):
+        """True nếu itemset là tập con của một tập đã chèn vào cây."""
+        if not itemset:
+            return self._num_nodes > 1
+        ordered_items = sorted(itemset, key=self.item_rank.__getitem__)
+        lowest_item = ordered_items[-1]
+        for node in self.nodes_by_item.get(lowest_item, ()):
+            remaining = len(ordered_items) - 1 # Các item còn phải gặp trên đường lên gốc, từ dưới lên
+            ancestor = node.parent
+            while remaining and ancestor is not self.root:
+                ancestor_rank = self.item_rank[ancestor.item_name]
+                needed_rank = self.item_rank[ordered_items[remaining - 1]]
+                if ancestor_rank == needed_rank:
+                    remaining -= 1
+                elif ancestor_rank < needed_rank:
+                    break # Đã vượt qua vị trí của item cần tìm: nhánh này không chứa nó
+                ancestor = ancestor.parent
+            if not remaining:
+                return True
+        return False
+
+class FPTreeSnapshot:
+    """
+    FP-Tree chính đã xây xong (TreeNode hoặc ArrayTreeNode) cùng header table, thứ tự item (từ gốc xuống),
+    ngưỡng support lúc xây và tổng số giao dịch; đủ để khai phá lại bằng FPGrowthAlgorithm.mine_from_tree
+    ở mọi ngưỡng >= min_support_count mà không cần dữ liệu gốc.
+    """
+    def __init__(self, root, header_table, item_order, min_support_count, num_transactions, num_nodes):
+        self.root = root
+        self.header_table = header_table
+        self.item_order = list(item_order)
+        self.min_support_count = min_support_count
+        self.num_transactions = num_transactions
+        self.num_nodes = num_nodes
+
+def _estimate_object_tree_bytes(root_node):
+    """Bộ nhớ ước tính của cây TreeNode: đối tượng nút, __dict__, dict children và các giá trị count."""
+    total_bytes = 0
+    stack = [root_node]
+    while stack:
+        node = stack.pop()
+        total_bytes += (sys.getsizeof(node) + sys.getsizeof(node.__dict__) +
+                        sys.getsizeof(node.children) + sys.getsizeof(node.count))
+        stack.extend(node.children.values())
+    return total_bytes
+
+def _mine_projected_bases_worker(projected_bases, min_support_count, metrics_class,
+                                 tree_representation, mining_strategy, use_fp_array=False):
+    """
+    Worker của chế độ song song: khai phá một nhóm Conditional Pattern Base. Mỗi base (các đường đi tiền tố
+    của một item header) được khai phá như một DB có trọng số bằng một FPGrowthAlgorithm riêng,
+    rồi item được gắn vào mọi itemset tìm được.
+    Args:
+        projected_bases (list): Các bộ (item, support của item, các đường đi, count của từng đường đi).
+    Returns:
+        tuple: (itemsets dict, số Conditional FP-Tree đã xây, thời gian (giây), pid worker)
+    """
+    started = time.perf_counter()
+    itemsets = {}
+    conditional_trees_built = 0
+    for item, item_count, paths, path_counts in projected_bases:
+        item_set = frozenset([item])
+        itemsets[item_set] = item_count
+        projected_miner = FPGrowthAlgorithm(paths, min_support_count, metrics_class(),
+                                            transaction_weights=path_counts,
+                                            tree_representation=tree_representation,
+                                            mining_strategy=mining_strategy,
+                                            log_intermediate_steps=False,
+                                            use_fp_array=use_fp_array)
+        projected_itemsets, _ = projected_miner.run()
+        if projected_miner.metrics.fp_nodes_in_tree: # Cây chính của worker chính là Conditional FP-Tree của item
+            conditional_trees_built += 1 + projected_miner.metrics.fp_conditional_trees_built
+        for itemset, support in projected_itemsets.items():
+            itemsets[itemset | item_set] = support
+    return itemsets, conditional_trees_built, time.perf_counter() - started, os.getpid()
+
 class FPGrowthAlgorithm:
-    def __init__(self, transactions, min_support_count, metrics_collector):
+    def __init__(self, transactions, min_support_count, metrics_collector, transaction_weights=None,
+                 tree_representation="object", mining_strategy="recursive", max_alive_trees=None,
+                 log_intermediate_steps=True, n_jobs=1, mining_mode="all", top_k=None, min_itemset_length=1,
+                 use_fp_array=False, out_of_core=False, spill_directory=None):
+        """
+        Args:
+            transactions (list | callable): Danh sách giao dịch (mỗi giao dịch là list item). Chỉ với out_of_core=True
+                có thể là hàm không tham số, mỗi lần gọi trả về một iterable các chunk giao dịch (cùng dạng nguồn của
+                PartitionAlgorithm, ví dụ iter_transaction_chunks_from_file); hàm được gọi hai lần (quét lần 1 và
+                chia vào projected DB) và không cần giữ toàn bộ dữ liệu trong bộ nhớ.
+            transaction_weights (list[int], optional): Số lần lặp của từng giao dịch (song song với transactions),
+                ví dụ sau khi gộp giỏ hàng trùng bằng compress_duplicate_transactions. Trọng số được dùng làm
+                transaction_count khi xây cây; None = mọi giao dịch có trọng số 1.
+            tree_representation (str): "object" (mỗi nút là một TreeNode) hoặc "array"
+                (ArrayFPTree: các mảng song song, ít bộ nhớ hơn nhiều cho cây lớn).
+            mining_strategy (str): "recursive" (_mine_fp_tree_recursively) hoặc "iterative"
+                (_mine_fp_tree_iteratively: ngăn xếp tường minh, cùng kết quả, không giới hạn độ sâu đệ quy).
+                "iterative" chỉ dùng được với mining_mode="all" (các chế độ khác chỉ có bản đệ quy).
+            max_alive_trees (int, optional): Chỉ dùng với "iterative": số Conditional FP-Tree tối đa được giữ cùng lúc.
+                Cây bị bỏ được thay bằng việc dựng lại CPB từ khung cha khi cần: tốn thêm thời gian để giảm bộ nhớ.
+            log_intermediate_steps (bool): Nếu False, không ghi các bước trung gian (CPB, cây có điều kiện...)
+                để các cây không bị giữ lại trong intermediate_steps_data.
+            n_jobs (int): Lớn hơn 1: sau khi xây FP-Tree chính, Conditional Pattern Base của từng item header
+                được gửi tới một pool n_jobs tiến trình (chia nhóm theo kích thước ước tính) và khai phá độc lập.
+            mining_mode (str): "all" (mọi tập mục phổ biến), "closed" (chỉ tập mục đóng: không có tập cha
+                nào cùng support; tỉa ngay trong lúc khai phá kiểu CLOSET; support của mọi tập mục phổ biến vẫn
+                suy ra được từ các tập đóng) hoặc "maximal" (chỉ tập mục tối đại: không có tập cha nào phổ biến;
+                FPMax với MFI-tree; không sinh được luật vì mất support của các tập con) hoặc "top_k" (top_k tập
+                mục có support cao nhất; min_support_count chỉ còn là ngưỡng sàn, ngưỡng thực được nâng dần
+                trong lúc khai phá).
+            top_k (int): Số tập mục cần lấy với mining_mode="top_k" (các tập hòa support với tập thứ top_k cũng được giữ).
+            min_itemset_length (int): Với "top_k": chỉ tính các tập mục có ít nhất chừng này item.
+            use_fp_array (bool): Nếu True, khi xây một cây thưa (chính hoặc có điều kiện, xem _new_fp_array) thì
+                đếm luôn số lần đồng xuất hiện của từng cặp item ngay lúc chèn đường đi (FPArray, như FPgrowth*),
+                gắn vào header table (khóa 'fp_array'). Header của Conditional FP-Tree kế tiếp được lấy thẳng từ đó;
+                chuỗi node-link chỉ được duyệt khi item thật sự có Conditional FP-Tree.
+            out_of_core (bool): Nếu True, không xây FP-Tree chính: giao dịch đã sắp xếp được chia vào các
+                projected DB trên đĩa (mỗi item header một file) rồi từng projected DB được khai phá độc lập
+                bằng một FP-Tree trong bộ nhớ. Ngoài dữ liệu đầu vào, bộ nhớ đỉnh chỉ phụ thuộc projected DB lớn
+                nhất; nếu transactions là list thì chính list đó vẫn nằm trong bộ nhớ suốt lần chạy, muốn dữ liệu
+                không nằm trong bộ nhớ thì truyền hàm nguồn chunk. Chỉ hỗ trợ mining_mode="all" và n_jobs = 1.
+            spill_directory (str, optional): Thư mục đặt các file projected DB (mặc định: thư mục tạm của hệ thống).
+        """
+        if tree_representation not in FP_TREE_REPRESENTATIONS:
+            raise ValueError(f"tree_representation phải là một trong {FP_TREE_REPRESENTATIONS}, "
+                             f"nhận được: {tree_representation!r}")
+        self.transaction_chunks_source = None # Hàm nguồn chunk (chỉ với out_of_core), thay cho list transactions
+        if callable(transactions):
+            if not out_of_core or transaction_weights is not None:
+                raise ValueError("Nguồn chunk giao dịch (callable) chỉ dùng được với out_of_core=True "
+                                 "và không kèm transaction_weights.")
+            self.transaction_chunks_source, transactions = transactions, []
+        if transaction_weights is not None and len(transaction_weights) != len(transactions):
+            raise ValueError("transaction_weights phải có cùng độ dài với transactions.")
         self.transactions = transactions # list of lists
+        self.transaction_weights = list(transaction_weights) if transaction_weights is not None else None
         self.min_support_count = min_support_count
         self.metrics = metrics_collector
+        if mining_strategy not in FP_MINING_STRATEGIES:
+            raise ValueError(f"mining_strategy phải là một trong {FP_MINING_STRATEGIES}, nhận được: {mining_strategy!r}")
+        if mining_mode not in FP_MINING_MODES:
+            raise ValueError(f"mining_mode phải là một trong {FP_MINING_MODES}, nhận được: {mining_mode!r}")
+        if mining_mode != "all" and n_jobs and n_jobs > 1:
+            raise ValueError(f"mining_mode={mining_mode!r} dùng trạng thái chung của toàn bộ lần khai phá, "
+                             f"không hỗ trợ n_jobs > 1.")
+        if mining_mode != "all" and mining_strategy == "iterative":
+            raise ValueError(f"mining_mode={mining_mode!r} chỉ có bản khai phá đệ quy, "
+                             f"không hỗ trợ mining_strategy='iterative'.")
+        if mining_mode == "top_k" and (not top_k or top_k < 1):
+            raise ValueError(f"mining_mode='top_k' cần top_k >= 1, nhận được: {top_k}")
+        if out_of_core and (mining_mode != "all" or (n_jobs and n_jobs > 1)):
+            raise ValueError("out_of_core chỉ hỗ trợ mining_mode='all' và n_jobs = 1.")
+        if max_alive_trees is not None and max_alive_trees < 1:
+            raise ValueError(f"max_alive_trees phải >= 1, nhận được: {max_alive_trees}")
+        self.tree_representation = tree_representation
+        self.mining_strategy = mining_strategy
+        self.max_alive_trees = max_alive_trees
+        self.log_intermediate_steps = log_intermediate_steps
+        self.n_jobs = max(1, n_jobs or 1)
+        self.mining_mode = mining_mode
+        self.use_fp_array = use_fp_array
+        self.out_of_core = out_of_core
+        self.spill_directory = spill_directory
+        self._closed_itemsets_by_support = defaultdict(list) # {support: [tập đóng]}, dùng cho kiểm tra tập cha
+        self._maximal_itemset_tree = None # MaximalItemsetTree, chỉ dùng với mining_mode="maximal"
+        self.top_k = top_k
+        self.min_itemset_length = max(1, min_itemset_length or 1)
+        self._top_k_support_heap = [] # Min-heap support của top_k tập mục tốt nhất hiện có
+        self._top_k_subset_supports = {} # Tập ngắn hơn min_itemset_length đã duyệt: support cho tiền đề/hậu quả của luật
+        self.top_k_support_threshold = None # Ngưỡng support thực của kết quả top-k (sau khi chạy)
+        self.main_tree_snapshot = None # FPTreeSnapshot của FP-Tree chính lần chạy gần nhất (để lưu/khai phá lại)
         self.intermediate_steps_data = []
-        self.num_transactions = len(transactions)
+        # Số giao dịch gốc (tổng trọng số) dùng cho support tương đối trong luật
+        # Với nguồn chunk, số giao dịch chỉ biết sau quét lần 1
+        self.num_transactions = sum(self.transaction_weights) if self.transaction_weights is not None else len(transactions)
         self.frequent_itemsets_final = {} # {frozenset: support_count}
 
     def _log_step_data(self, step_name, data_dict, notes=None, tree_dot=None, header_table_data=None):
+        if not self.log_intermediate_steps:
+            return
         log_entry = {"step_name": step_name, "data": data_dict}
         if notes is not None: log_entry["notes"] = notes
         if tree_dot is not None: log_entry["tree_dot_object"] = tree_dot # Đối tượng graphviz DOT
         if header_table_data is not None: log_entry["header_table"] = header_table_data
         self.intermediate_steps_data.append(log_entry)
 
+    def _iter_weighted_transactions(self):
+        """Duyệt (giao dịch, trọng số); trọng số là 1 khi không có transaction_weights (và với nguồn chunk)."""
+        if self.transaction_chunks_source is not None:
+            return ((transaction, 1) for chunk in self.transaction_chunks_source() for transaction in chunk)
+        return zip(self.transactions, repeat(1) if self.transaction_weights is None else self.transaction_weights)
+
+    def _ordered_weighted_transactions(self, ordered_frequent_1_items):
+        """Sinh (giao dịch đã lọc item không phổ biến và sắp theo thứ tự L, trọng số); bỏ giao dịch rỗng."""
+        # Map từ item sang vị trí trong ordered_frequent_1_items (count giảm dần, rồi theo tên) để sort
+        order_map = {item: i for i, item in enumerate(ordered_frequent_1_items)}
+        for transaction, weight in self._iter_weighted_transactions():
+            filtered_transaction = sorted((item for item in transaction if item in order_map), key=order_map.__getitem__)
+            if filtered_transaction:
+                yield filtered_transaction, weight # (transaction_items, count=trọng số)
+
     def _scan1_find_frequent_1_itemsets_and_order(self):
         """
         Quét DB lần 1: Tìm các 1-itemset phổ biến và thứ tự của chúng (giảm dần theo support).
         """
         self.metrics.start_step("FP-Growth: Quét lần 1 - Tìm 1-itemset phổ biến")
         item_counts = Counter()
-        for transaction in self.transactions:
+        total_weight = 0
+        for transaction, weight in self._iter_weighted_transactions():
+            total_weight += weight
             for item in transaction:
-                item_counts[item] += 1
+                item_counts[item] += weight
+        self.num_transactions = total_weight
         
         self._log_step_data("Đếm 1-itemset ban đầu", dict(item_counts), 
                             notes=f"Tổng số item duy nhất ban đầu: {len(item_counts)}")
@@ -83,26 +543,76 @@ class FPGrowthAlgorithm:
         while current and current.children: # Bắt đầu duyệt từ các con của root (nếu có)
             # Vì là single path, chỉ có 1 con (hoặc không có con nào nếu là lá)
             current = list(current.children.values())[0] 
+            if current.count < self.min_support_count:
+                # Chỉ xảy ra với cây xây ở ngưỡng thấp hơn (mine_from_tree): count giảm dần dọc đường đi
+                # nên phần còn lại của đường đi đều không phổ biến
+                break
             path_items_counts.append((current.item_name, current.count))
             if not current.children: # Đã đến nút lá của path
                 break
         return path_items_counts
 
-    def _build_fp_tree(self, ordered_transactions, frequent_1_item_counts):
+    @staticmethod
+    def _append_node_link(header_entry, new_node):
+        """Nối new_node vào cuối chuỗi node-link của một mục header table qua con trỏ 'tail' (O(1))."""
+        if header_entry['tail'] is None:
+            header_entry['node'] = new_node
+        else:
+            header_entry['tail'].next_node_link = new_node
+        header_entry['tail'] = new_node
+
+    def _new_fp_array(self, item_order, item_counts, total_count):
+        """
+        FP-array cho cây sắp xây, hoặc None. Chỉ dựng khi use_fp_array và dữ liệu thưa: mật độ = độ dài đường đi
+        trung bình / số item = tổng count item / (total_count * số item). Dữ liệu dày nén tốt thành ít nút nên
+        duyệt node-link rẻ, còn cộng mọi cặp item của các đường đi dài lại tốn hơn phần tiết kiệm được.
+        Args:
+            total_count (int): Tổng trọng số các đường đi sẽ chèn (số giao dịch hoặc support của item tiền tố).
+        """
+        if not self.use_fp_array or not 2 <= len(item_order) <= _FP_ARRAY_MAX_ITEMS or total_count <= 0:
+            return None
+        if sum(item_counts.values()) > _FP_ARRAY_MAX_DENSITY * total_count * len(item_order):
+            self.metrics.fp_array_dense_trees += 1
+            return None
+        return FPArray(item_order)
+
+    @staticmethod
+    def _attach_fp_array(header_table, fp_array):
+        """Gắn FP-array của cây vào mọi mục header (khóa 'fp_array') để _conditional_item_counts dùng."""
+        if fp_array is not None:
+            for header_entry in header_table.values():
+                header_entry['fp_array'] = fp_array
+
+    def _build_fp_tree(self, ordered_transactions, frequent_1_item_counts, ordered_frequent_1_items):
         """
-        Xây dựng FP-Tree từ các giao dịch đã được sắp xếp và lọc.
+        Xây dựng FP-Tree từ các giao dịch đã được sắp xếp và lọc (theo ordered_frequent_1_items).
         """
         self.metrics.start_step("FP-Growth: Xây dựng FP-Tree chính")
-        
-        # Khởi tạo Header Table: item -> {'count': tổng count, 'node': con trỏ đến nút đầu tiên}
+        fp_array = self._new_fp_array(ordered_frequent_1_items, frequent_1_item_counts, self.num_transactions)
+        if self.tree_representation == "array":
+            array_tree = ArrayFPTree(ordered_frequent_1_items, root_name='root')
+            for transaction_items, transaction_count in ordered_transactions:
+                array_tree.insert(transaction_items, transaction_count, fp_array)
+            build_peak_bytes = array_tree.memory_bytes() # Còn bảng băm tra con: bộ nhớ đỉnh lúc xây
+            array_tree.finalize()
+            root_node, header_table = array_tree.root, array_tree.header_table(frequent_1_item_counts)
+            self._attach_fp_array(header_table, fp_array)
+            num_nodes = len(array_tree)
+            self.metrics.record_fp_tree_memory("array", array_tree.memory_bytes(), num_nodes, build_peak_bytes)
+            return self._finish_main_tree_step(root_node, header_table, num_nodes)
+
+        # Khởi tạo Header Table: item -> {'count': tổng count, 'node': con trỏ đến nút đầu tiên,
+        #                                 'tail': con trỏ đến nút cuối để nối nút mới trong O(1)}
         header_table = {
-            item: {'count': frequent_1_item_counts[item], 'node': None}
+            item: {'count': frequent_1_item_counts[item], 'node': None, 'tail': None}
             for item in frequent_1_item_counts
         }
         
         root_node = TreeNode(item_name='root', count=1, parent_node=None)
         
         for transaction_items, transaction_count in ordered_transactions: # transaction_count thường là 1 trừ khi có trọng số
+            if fp_array is not None:
+                fp_array.add_items(transaction_items, transaction_count)
             current_node = root_node
             for item in transaction_items: # Các item đã được sắp xếp theo thứ tự L
                 # Thêm item vào cây con của current_node
@@ -113,17 +623,10 @@ class FPGrowthAlgorithm:
                     child_node = TreeNode(item_name=item, count=transaction_count, parent_node=current_node)
                     current_node.children[item] = child_node
                     
-                    # Liên kết nút mới vào header_table
-                    # Nối vào đầu danh sách liên kết
-                    if header_table[item]['node'] is None:
-                        header_table[item]['node'] = child_node
-                    else:
-                        # Tìm cuối danh sách liên kết hiện tại và nối vào
-                        temp_node = header_table[item]['node']
-                        while temp_node.next_node_link is not None:
-                            temp_node = temp_node.next_node_link
-                        temp_node.next_node_link = child_node
+                    # Liên kết nút mới vào cuối danh sách liên kết của header_table (giữ thứ tự tạo nút)
+                    self._append_node_link(header_table[item], child_node)
                 current_node = child_node # Di chuyển xuống nút con
+        self._attach_fp_array(header_table, fp_array)
         
         # Đếm số node trong cây (ước tính)
         num_nodes = 1 # for root
@@ -133,6 +636,11 @@ class FPGrowthAlgorithm:
             num_nodes += len(node.children)
             for child in node.children.values():
                 queue.append(child)
+        self.metrics.record_fp_tree_memory("object", _estimate_object_tree_bytes(root_node), num_nodes)
+        return self._finish_main_tree_step(root_node, header_table, num_nodes)
+
+    def _finish_main_tree_step(self, root_node, header_table, num_nodes):
+        """Ghi nhận số nút, log và kết thúc bước xây FP-Tree chính (dùng chung cho cả hai cách lưu cây)."""
         self.metrics.fp_nodes_in_tree = num_nodes
 
         self._log_step_data("FP-Tree Chính đã xây dựng", 
@@ -143,6 +651,143 @@ class FPGrowthAlgorithm:
         self.metrics.end_step(additional_info={"nodes_in_tree": num_nodes})
         return root_node, header_table
 
+    def _mine_single_path(self, current_tree_root, current_header_table, prefix_path):
+        """Cây là một đường đi đơn: sinh trực tiếp mọi tổ hợp item trên đường đi (kết hợp với tiền tố)."""
+        self._log_step_data(f"Xử lý Single Path cho tiền tố {list(prefix_path) if prefix_path else '{}'}",
+                            {"message": "Cây hiện tại là một đường đi đơn. Tạo tổ hợp trực tiếp."},
+                            notes=f"Tiền tố hiện tại: {prefix_path}",
+                            tree_dot=current_tree_root, header_table_data=current_header_table)
+        
+        path_items_with_counts = self._extract_items_counts_from_single_path(current_tree_root)
+        
+        if path_items_with_counts:
+            self._log_step_data(f"Items trên Single Path (cho tiền tố {prefix_path})", 
+                                {"items_on_path": path_items_with_counts})
+
+            items_on_path = [item for item, count in path_items_with_counts]
+            item_counts_on_path_map = dict(path_items_with_counts)
+
+            for i in range(1, len(items_on_path) + 1):
+                for combination_tuple in combinations(items_on_path, i):
+                    # Kết hợp tổ hợp này với tiền tố hiện tại
+                    current_combination_fset = frozenset(combination_tuple)
+                    new_frequent_itemset = prefix_path.union(current_combination_fset)
+                    
+                    # Support của itemset này là min count của các item trong combination_tuple trên path
+                    support_for_combination = min(item_counts_on_path_map[item] for item in combination_tuple)
+                    
+                    self.frequent_itemsets_final[new_frequent_itemset] = support_for_combination
+                    self._log_step_data(f"Tạo mẫu từ Single Path (tiền tố {prefix_path})",
+                                        {"pattern": new_frequent_itemset, "support": support_for_combination, 
+                                         "combination_from_path": current_combination_fset},
+                                        notes=f"Tổ hợp {current_combination_fset} với support {support_for_combination} từ single path.")
+        self.metrics.end_step(additional_info={"is_single_path_optimization": True, "items_in_path": len(path_items_with_counts)})
+
+    def _conditional_pattern_base(self, first_node):
+        """Duyệt chuỗi node-link bắt đầu từ first_node, lấy đường đi tiền tố (từ root xuống) của mỗi nút."""
+        return list(self._iter_conditional_pattern_base(first_node))
+
+    @staticmethod
+    def _iter_conditional_pattern_base(first_node):
+        """Như _conditional_pattern_base nhưng sinh từng mục, không giữ cả CPB trong bộ nhớ."""
+        path_node = first_node # Nút đầu tiên trong chuỗi liên kết của item
+        
+        while path_node is not None:
+            # Lấy đường đi từ nút này lên gốc (không bao gồm nút item_name hiện tại)
+            single_path_to_root = []
+            temp_parent_node = path_node.parent
+            # Điều kiện dừng được thay đổi để không phụ thuộc vào item_name cụ thể của root,
+            # mà dựa vào việc node cha của nó có phải là None không (tức là nó là root).
+            while temp_parent_node is not None and temp_parent_node.parent is not None:
+                single_path_to_root.append(temp_parent_node.item_name)
+                temp_parent_node = temp_parent_node.parent
+
+            
+            if single_path_to_root: # Chỉ thêm nếu đường đi không rỗng
+                # Đường đi đang ngược (từ node lên root), đảo lại
+                yield {'path': list(reversed(single_path_to_root)), 'count': path_node.count}
+            path_node = path_node.next_node_link
+
+    def _mine_conditional_for_item(self, item_name, item_data, prefix_path, min_sup_count):
+        """
+        Một bước khai phá cho một item của header table: ghi nhận prefix + item, lấy Conditional Pattern Base
+        và xây Conditional FP-Tree. Bước đo (start_step) được mở ở đây và do nơi gọi đóng lại.
+        Args:
+            item_data (dict): Mục header table {'count', 'node'}, hoặc {'count', 'item', 'released'} khi khung
+                của miner lặp đã giải phóng cây (CPB được dựng lại từ CPB của khung cha, xem _released_pattern_base).
+        Returns:
+            tuple: (gốc Conditional FP-Tree hoặc None, header table của nó, itemset mới, số item phổ biến trong CPB)
+        """
+        # Tạo frequent itemset mới: prefix + item_name
+        new_frequent_itemset = prefix_path.union(frozenset([item_name]))
+        # Chỉ thêm nếu count này (là support của item_name trong cây hiện tại) >= min_sup_count
+        # Điều này đã được đảm bảo bởi vì item_data['count'] là từ header table của cây (có điều kiện)
+        # mà các item trong header table đó đã được lọc theo min_sup_count trong ngữ cảnh đó.
+        self.frequent_itemsets_final[new_frequent_itemset] = item_data['count'] 
+        self.metrics.start_step(f"FP-Growth: Khai phá cho '{item_name}' (tiền tố {list(prefix_path) if prefix_path else '{}'})")
+
+        # 1. Đếm tần suất các item trong Conditional Pattern Base (CPB); với FP-array của cây hiện tại thì
+        # count có sẵn và CPB chỉ được lấy (duyệt node-link) khi thật sự có item phổ biến
+        conditional_item_counts, conditional_pattern_base = self._conditional_item_counts(item_name, item_data)
+        
+        # Lọc các item phổ biến trong CPB
+        frequent_items_in_cpb = {
+            item: count for item, count in conditional_item_counts.items() if count >= min_sup_count
+        }
+        if frequent_items_in_cpb and conditional_pattern_base is None:
+            conditional_pattern_base = self._item_pattern_base(item_data)
+        if conditional_pattern_base is not None:
+            self._log_step_data(f"Conditional Pattern Base cho '{item_name}' (tiền tố: {prefix_path})",
+                                {"item": item_name, "prefix": list(prefix_path), "cpb": conditional_pattern_base},
+                                notes=f"Tìm thấy {len(conditional_pattern_base)} đường đi.")
+
+        # 2. Xây dựng Conditional FP-Tree từ CPB
+        if not frequent_items_in_cpb:
+            self._log_step_data(f"Kết thúc nhánh cho '{item_name}'", 
+                                {"message": "Không có item phổ biến nào trong Conditional Pattern Base."},
+                                notes="Không xây dựng Conditional FP-Tree.")
+            return None, None, new_frequent_itemset, 0
+
+        # Thời gian xây cây (sắp xếp lại đường đi + chèn) được đo riêng với thời gian lấy/đếm CPB ở trên
+        build_started = time.perf_counter()
+        # Sắp xếp lại các đường đi trong CPB theo thứ tự item phổ biến mới
+        # (tần suất giảm dần của frequent_items_in_cpb; thứ hạng tính một lần thay vì so sánh tuple mỗi lần sort)
+        conditional_item_order = self._conditional_item_order(frequent_items_in_cpb)
+        order_rank = {item: rank for rank, item in enumerate(conditional_item_order)}
+        # Dạng [(path_list, count)] dùng để xây cây, tạo thẳng từ CPB (không qua một bản sao trung gian)
+        paths_for_tree_build = []
+        for entry in conditional_pattern_base:
+            ordered_path = sorted((item for item in entry['path'] if item in order_rank), key=order_rank.__getitem__)
+            if ordered_path:
+                paths_for_tree_build.append((ordered_path, entry['count']))
+        conditional_pattern_base = None # Không giữ CPB trong lúc xây cây
+
+        cond_tree_root, cond_header_table = None, None
+        # Xây dựng Conditional FP-Tree (tương tự _build_fp_tree)
+        if paths_for_tree_build:
+            cond_tree_root, cond_header_table = self._build_fp_tree_for_conditional(
+                paths_for_tree_build, frequent_items_in_cpb, 
+                log_prefix=f"Conditional cho '{item_name}' (tiền tố: {prefix_path})",
+                fp_array=self._new_fp_array(conditional_item_order, frequent_items_in_cpb, item_data['count'])
+            )
+            self.metrics.fp_conditional_trees_built += 1
+        self.metrics.record_fp_conditional_build_time(time.perf_counter() - build_started)
+        return cond_tree_root, cond_header_table, new_frequent_itemset, len(frequent_items_in_cpb)
+
+    @staticmethod
+    def _conditional_item_order(frequent_items_in_cpb):
+        """Thứ tự item (từ gốc xuống) của Conditional FP-Tree: count giảm dần, hòa thì theo item giảm dần."""
+        return sorted(frequent_items_in_cpb, key=lambda i: (frequent_items_in_cpb[i], i), reverse=True)
+
+    @staticmethod
+    def _sorted_header_items(current_header_table):
+        # Sắp xếp header table theo tần suất tăng dần (heuristic)
+        # Trong demo gốc là giảm dần, nhưng nhiều tài liệu đề xuất tăng dần để xử lý item ít phổ biến trước
+        return sorted(
+            current_header_table.items(), 
+            key=lambda item_data_pair: item_data_pair[1]['count'] # Sắp theo count
+        )
+
     def _mine_fp_tree_recursively(self, current_tree_root, current_header_table, prefix_path, min_sup_count):
         """
         Khai phá FP-Tree (hoặc Conditional FP-Tree) một cách đệ quy.
@@ -152,136 +797,588 @@ class FPGrowthAlgorithm:
             prefix_path (frozenset): Tiền tố itemset đang được xét.
             min_sup_count (int): Ngưỡng support tối thiểu.
         """
-        # Sắp xếp header table theo tần suất tăng dần (heuristic)
-        # Trong demo gốc là giảm dần, nhưng nhiều tài liệu đề xuất tăng dần để xử lý item ít phổ biến trước
-        sorted_items_in_header = sorted(
-            current_header_table.items(), 
-            key=lambda item_data_pair: item_data_pair[1]['count'] # Sắp theo count
+        # Kiểm tra nếu cây hiện tại là một đường đi đơn
+        if self._is_single_path(current_tree_root):
+            self._mine_single_path(current_tree_root, current_header_table, prefix_path)
+            return # Kết thúc đệ quy cho nhánh này
+
+        for item_name, item_data in self._sorted_header_items(current_header_table):
+            cond_tree_root, cond_header_table, new_frequent_itemset, conditional_tree_items = \
+                self._mine_conditional_for_item(item_name, item_data, prefix_path, min_sup_count)
+            if cond_tree_root is not None and cond_tree_root.children: # Nếu conditional tree không rỗng
+                # Đệ quy khai phá conditional tree
+                self._mine_fp_tree_recursively(cond_tree_root, cond_header_table, new_frequent_itemset, min_sup_count)
+            self.metrics.end_step(additional_info={"conditional_tree_items": conditional_tree_items})
+
+    def _mine_fp_tree_iteratively(self, tree_root, header_table, prefix_path, min_sup_count):
+        """
+        Khai phá FP-Tree bằng ngăn xếp tường minh thay cho đệ quy (không bao giờ gặp RecursionError).
+        Mỗi khung (frame) giữ một cây, tiền tố và các item header còn phải xử lý; thứ tự duyệt (theo chiều sâu)
+        giống hệt _mine_fp_tree_recursively nên cho cùng kết quả.
+        Nếu đặt max_alive_trees, trước khi xây một Conditional FP-Tree mà số cây đang giữ đã bằng ngưỡng, khung cũ
+        nhất còn giữ cây bỏ cây đó (_release_oldest_conditional_tree) và chỉ nhớ nó được dựng từ CPB nào của khung
+        cha; CPB của từng item còn lại được dựng lại từ CPB đó khi item được lấy ra. Vì vậy không bao giờ có quá
+        max_alive_trees Conditional FP-Tree cùng lúc (cây mới đang xây cũng được tính).
+        """
+        if self._is_single_path(tree_root):
+            self._mine_single_path(tree_root, header_table, prefix_path)
+            return
+
+        # Khung: {'tree': gốc cây (None sau khi giải phóng), 'prefix', 'pending': các (item, item_data) còn lại,
+        # đảo ngược để pop() lấy item có count nhỏ nhất trước}; khung con còn có 'source' và 'item_rank'
+        # (xem _mine_next_pending_item)
+        stack = [{'tree': tree_root, 'prefix': prefix_path,
+                  'pending': list(reversed(self._sorted_header_items(header_table)))}]
+        alive_conditional_trees = 0
+        while stack:
+            frame = stack[-1]
+            if not frame['pending']:
+                stack.pop()
+                if frame['tree'] is not None and len(stack) > 0:
+                    alive_conditional_trees -= 1
+                    self._discard_conditional_tree(frame['tree'])
+                continue
+
+            # Giải phóng trước khi xây cây mới (có thể chính là cây của khung hiện tại)
+            if self.max_alive_trees is not None and alive_conditional_trees >= self.max_alive_trees:
+                self._release_oldest_conditional_tree(stack)
+                alive_conditional_trees -= 1
+            tree_built, frame_pushed = self._mine_next_pending_item(stack, min_sup_count)
+            if tree_built: # Cây mới (kể cả cây đơn đường/rỗng) cùng tồn tại với các cây đang giữ
+                self.metrics.fp_peak_alive_conditional_trees = max(self.metrics.fp_peak_alive_conditional_trees,
+                                                                   alive_conditional_trees + 1)
+            if frame_pushed:
+                alive_conditional_trees += 1
+
+    def _mine_next_pending_item(self, stack, min_sup_count):
+        """
+        Khai phá item kế tiếp của khung trên cùng (một bước của _mine_fp_tree_iteratively); Conditional FP-Tree
+        nhiều nhánh được đẩy vào stack thành khung mới, cây đơn đường được khai phá ngay. Tách thành hàm riêng để
+        item_data và cây vừa xây không bị biến cục bộ giữ lại sau bước này (cây phải giải phóng được khi khung
+        của nó bị bỏ hoặc bị pop).
+        Returns:
+            tuple: (có xây cây hay không, có đẩy khung mới hay không)
+        """
+        frame = stack[-1]
+        item_name, item_data = frame['pending'].pop()
+        cond_tree_root, cond_header_table, new_frequent_itemset, conditional_tree_items = \
+            self._mine_conditional_for_item(item_name, item_data, frame['prefix'], min_sup_count)
+        if cond_tree_root is None or not cond_tree_root.children:
+            self.metrics.end_step(additional_info={"conditional_tree_items": conditional_tree_items})
+            return cond_tree_root is not None, False
+        if self._is_single_path(cond_tree_root):
+            self._mine_single_path(cond_tree_root, cond_header_table, new_frequent_itemset)
+            self._discard_conditional_tree(cond_tree_root)
+            return True, False
+        self.metrics.end_step(additional_info={"conditional_tree_items": conditional_tree_items})
+
+        # 'source': mục header của khung cha mà cây được dựng từ CPB của nó; 'item_rank': thứ tự item trong cây.
+        # Hai khóa này đủ để dựng lại CPB của các item còn lại khi cây bị giải phóng.
+        conditional_item_order = self._conditional_item_order(
+            {item: entry['count'] for item, entry in cond_header_table.items()})
+        stack.append({'tree': cond_tree_root, 'prefix': new_frequent_itemset,
+                      'pending': list(reversed(self._sorted_header_items(cond_header_table))),
+                      'source': (item_name, item_data),
+                      'item_rank': {item: rank for rank, item in enumerate(conditional_item_order)}})
+        return True, True
+
+    def _mine_fp_tree_in_parallel(self, tree_root, header_table, min_sup_count):
+        """
+        Khai phá song song theo item header: tính Conditional Pattern Base (CPB) của mọi item trên cây chính,
+        chia các CPB thành n_jobs nhóm theo kích thước ước tính (tổng độ dài đường đi, gán tham lam
+        base lớn nhất vào nhóm đang nhẹ nhất - LPT), mỗi worker chỉ nhận CPB của nhóm mình.
+        """
+        if self._is_single_path(tree_root):
+            self._mine_single_path(tree_root, header_table, frozenset())
+            return
+
+        projected_bases = []
+        for item_name, item_data in self._sorted_header_items(header_table):
+            conditional_pattern_base = self._conditional_pattern_base(item_data['node'])
+            if not conditional_pattern_base: # Không có đường đi tiền tố: chỉ có {item}, không cần gửi đi
+                self.frequent_itemsets_final[frozenset([item_name])] = item_data['count']
+                continue
+            projected_bases.append((item_name, item_data['count'],
+                                    [entry['path'] for entry in conditional_pattern_base],
+                                    [entry['count'] for entry in conditional_pattern_base]))
+
+        # LPT: base lớn nhất trước, luôn gán vào nhóm có tổng kích thước nhỏ nhất
+        estimated_sizes = {base[0]: sum(len(path) for path in base[2]) for base in projected_bases}
+        num_groups = min(self.n_jobs, len(projected_bases))
+        groups = [[] for _ in range(num_groups)]
+        group_loads = [(0, group_index) for group_index in range(num_groups)]
+        for base in sorted(projected_bases, key=lambda base: estimated_sizes[base[0]], reverse=True):
+            load, group_index = heapq.heappop(group_loads)
+            groups[group_index].append(base)
+            heapq.heappush(group_loads, (load + estimated_sizes[base[0]], group_index))
+
+        self._log_step_data("Phân nhóm Conditional Pattern Base cho các worker",
+                            {"groups": [{"items": [base[0] for base in group],
+                                         "estimated_size": sum(estimated_sizes[base[0]] for base in group)}
+                                        for group in groups]},
+                            notes=f"{len(projected_bases)} CPB chia thành {num_groups} nhóm (LPT theo tổng độ dài đường đi)")
+        if not groups:
+            return
+
+        with ProcessPoolExecutor(max_workers=num_groups) as executor:
+            futures = [executor.submit(_mine_projected_bases_worker, group, min_sup_count, type(self.metrics),
+                                       self.tree_representation, self.mining_strategy, self.use_fp_array)
+                       for group in groups]
+            for group_index, future in enumerate(futures):
+                itemsets, conditional_trees_built, duration, worker_pid = future.result()
+                self.frequent_itemsets_final.update(itemsets)
+                self.metrics.fp_conditional_trees_built += conditional_trees_built
+                self.metrics.record_fp_worker_timing(group_index, worker_pid, duration, len(groups[group_index]),
+                                                     sum(estimated_sizes[base[0]] for base in groups[group_index]))
+
+    def _item_pattern_base(self, item_data):
+        """
+        CPB của một mục header: dựng lại từ CPB của khung cha nếu cây đã được giải phóng
+        (khóa 'released', miner lặp với max_alive_trees), ngược lại duyệt chuỗi node-link.
+        """
+        started = time.perf_counter()
+        if 'released' in item_data:
+            # Gộp các đường đi trùng nhau (như các nút chung của cây) để CPB dựng lại không lớn hơn CPB gốc
+            merged_paths = Counter()
+            for entry in self._released_pattern_base(item_data['item'], item_data['released']):
+                merged_paths[tuple(entry['path'])] += entry['count']
+            conditional_pattern_base = [{'path': list(path), 'count': count} for path, count in merged_paths.items()]
+        else:
+            conditional_pattern_base = self._conditional_pattern_base(item_data['node'])
+        self.metrics.record_fp_cpb_time(time.perf_counter() - started)
+        return conditional_pattern_base
+
+    def _released_pattern_base(self, item_name, released):
+        """
+        Sinh CPB của item_name trong cây đã giải phóng: các đường đi của cây chính là CPB của mục 'source' ở khung
+        cha, lọc và sắp theo 'item_rank'; phần đứng trước item_name trong mỗi đường đi là một mục của CPB.
+        Các mục chưa được gộp như các nút chung của cây (_item_pattern_base gộp lại), count các item là như nhau.
+        Khung cha cũng đã bị giải phóng thì CPB của nó được dựng lại theo cách tương tự.
+        """
+        source_item, source_data = released['source']
+        if 'released' in source_data:
+            source_pattern_base = self._released_pattern_base(source_item, source_data['released'])
+        else:
+            source_pattern_base = self._iter_conditional_pattern_base(source_data['node'])
+        item_rank = released['item_rank']
+        item_position = item_rank[item_name]
+        for entry in source_pattern_base:
+            if item_name not in entry['path']: # Phần lớn đường đi bị loại ở đây, trước khi phải sắp xếp
+                continue
+            prefix = sorted((item for item in entry['path'] if item_rank.get(item, item_position) < item_position),
+                            key=item_rank.__getitem__)
+            if prefix:
+                yield {'path': prefix, 'count': entry['count']}
+
+    def _conditional_item_counts(self, item_name, item_data):
+        """
+        Count các item trong CPB của item_name: lấy từ FP-array của cây nếu có (khi đó chưa cần duyệt node-link),
+        nếu không thì lấy CPB và quét nó.
+        Returns:
+            tuple: (count các item, CPB đã lấy hoặc None nếu count đến từ FP-array)
+        """
+        fp_array = item_data.get('fp_array')
+        if fp_array is not None:
+            self.metrics.fp_array_scans_skipped += 1
+            started = time.perf_counter()
+            conditional_item_counts = fp_array.counts_for(item_name)
+            self.metrics.record_fp_cpb_time(time.perf_counter() - started)
+            return conditional_item_counts, None
+        conditional_pattern_base = self._item_pattern_base(item_data)
+        started = time.perf_counter()
+        conditional_item_counts = self._weighted_item_counts(conditional_pattern_base)
+        self.metrics.record_fp_cpb_time(time.perf_counter() - started)
+        return conditional_item_counts, conditional_pattern_base
+
+    @staticmethod
+    def _weighted_item_counts(conditional_pattern_base):
+        """Đếm support của từng item trong CPB (mỗi đường đi cộng count của nó)."""
+        conditional_item_counts = Counter()
+        for entry in conditional_pattern_base:
+            for item_in_path in entry['path']:
+                conditional_item_counts[item_in_path] += entry['count']
+        return conditional_item_counts
+
+    def _build_ordered_conditional_tree(self, conditional_pattern_base, frequent_items_in_cpb, item_count, log_prefix=""):
+        """
+        Xây Conditional FP-Tree với thứ tự item tường minh (count giảm dần, rồi theo item) và trả về cả thứ tự đó,
+        để các chế độ tập đóng/tối đại duyệt header từ dưới lên khớp đúng với vị trí item trong cây.
+        item_count là support của item tiền tố (tổng count của CPB), dùng cho phép thử mật độ của FP-array.
+        Returns:
+            tuple: (gốc cây, header table, danh sách item theo thứ tự từ gốc xuống)
+        """
+        build_started = time.perf_counter()
+        conditional_item_order = sorted(frequent_items_in_cpb, key=lambda item: (-frequent_items_in_cpb[item], item))
+        order_rank = {item: rank for rank, item in enumerate(conditional_item_order)}
+        paths_for_tree_build = []
+        for entry in conditional_pattern_base:
+            ordered_path = sorted((item for item in entry['path'] if item in order_rank), key=order_rank.__getitem__)
+            if ordered_path:
+                paths_for_tree_build.append((ordered_path, entry['count']))
+        cond_tree_root, cond_header_table = self._build_fp_tree_for_conditional(
+            paths_for_tree_build, frequent_items_in_cpb, log_prefix=log_prefix,
+            fp_array=self._new_fp_array(conditional_item_order, frequent_items_in_cpb, item_count)
         )
+        self.metrics.fp_conditional_trees_built += 1
+        self.metrics.record_fp_conditional_build_time(time.perf_counter() - build_started)
+        return cond_tree_root, cond_header_table, conditional_item_order
 
-        # [Thêm vào] Kiểm tra nếu cây hiện tại là một đường đi đơn
-        if self._is_single_path(current_tree_root):
-            self._log_step_data(f"Xử lý Single Path cho tiền tố {list(prefix_path) if prefix_path else '{}'}",
-                                {"message": "Cây hiện tại là một đường đi đơn. Tạo tổ hợp trực tiếp."},
-                                notes=f"Tiền tố hiện tại: {prefix_path}",
-                                tree_dot=current_tree_root, header_table_data=current_header_table)
-            
-            path_items_with_counts = self._extract_items_counts_from_single_path(current_tree_root)
-            
+    # --- Chế độ tập mục đóng (closed itemsets) ---
+    def _is_subsumed_by_closed(self, itemset, support):
+        """Kiểm tra tập cha: đã có tập đóng cùng support chứa itemset hay chưa (chỉ so với nhóm cùng support)."""
+        return any(itemset <= closed_itemset for closed_itemset in self._closed_itemsets_by_support.get(support, ()))
+
+    def _record_closed_itemset(self, itemset, support):
+        self._closed_itemsets_by_support[support].append(itemset)
+        self.frequent_itemsets_final[itemset] = support
+
+    def _mine_closed_single_path(self, tree_root, prefix_path):
+        """
+        Cây là một đường đi đơn (count không tăng từ trên xuống): tập đóng là tiền tố cộng đoạn đầu đường đi
+        tới mỗi nút cuối cùng của một mức count, thay vì mọi 2^n tổ hợp.
+        """
+        path_items_with_counts = self._extract_items_counts_from_single_path(tree_root)
+        for position, (item, count) in enumerate(path_items_with_counts):
+            is_last_of_level = (position + 1 == len(path_items_with_counts) or
+                                path_items_with_counts[position + 1][1] < count)
+            if not is_last_of_level:
+                continue
+            candidate = prefix_path.union(path_item for path_item, _ in path_items_with_counts[:position + 1])
+            if self._is_subsumed_by_closed(candidate, count):
+                self.metrics.fp_closed_candidates_pruned += 1
+                continue
+            self._record_closed_itemset(candidate, count)
+
+    def _mine_closed_itemsets(self, tree_root, header_table, item_order, prefix_path, min_sup_count):
+        """
+        Khai phá tập mục đóng kiểu CLOSET trên FP-Tree:
+        - Duyệt item header từ dưới lên theo đúng thứ tự item trong cây (item_order, từ gốc xuống), để mọi tập
+          cha cùng support của một ứng viên (chứa item nằm dưới trong cây) đã được tìm thấy trước đó.
+        - Gộp item (item merging): item xuất hiện trong mọi đường đi của CPB (count = support) được đưa
+          thẳng vào tiền tố, không tách nhánh.
+        - Nếu ứng viên đã nằm trong một tập đóng cùng support thì bỏ qua toàn bộ nhánh con của nó.
+        """
+        if self._is_single_path(tree_root):
+            self._mine_closed_single_path(tree_root, prefix_path)
+            return
+
+        for item_name in reversed(item_order):
+            item_data = header_table.get(item_name)
+            if item_data is None:
+                continue
+            support = item_data['count']
+            conditional_item_counts, conditional_pattern_base = self._conditional_item_counts(item_name, item_data)
+
+            merged_items = [item for item, count in conditional_item_counts.items() if count == support]
+            candidate = prefix_path.union([item_name], merged_items)
+            self.metrics.fp_closed_items_merged += len(merged_items)
+            if self._is_subsumed_by_closed(candidate, support):
+                self.metrics.fp_closed_candidates_pruned += 1
+                continue
+            self._record_closed_itemset(candidate, support)
+
+            frequent_items_in_cpb = {
+                item: count for item, count in conditional_item_counts.items() if min_sup_count <= count < support
+            }
+            if not frequent_items_in_cpb:
+                continue
+            cond_tree_root, cond_header_table, conditional_item_order = self._build_ordered_conditional_tree(
+                conditional_pattern_base or self._item_pattern_base(item_data), frequent_items_in_cpb, support,
+                log_prefix=f"Conditional (tập đóng) cho '{item_name}' (tiền tố: {candidate})"
+            )
+            self._mine_closed_itemsets(cond_tree_root, cond_header_table, conditional_item_order, candidate, min_sup_count)
+
+    # --- Chế độ tập mục tối đại (maximal itemsets, FPMax) ---
+    def _record_maximal_itemset(self, itemset, support):
+        """Ghi nhận ứng viên nếu nó không là tập con của tập tối đại nào đã tìm thấy (kiểm tra trên MFI-tree)."""
+        if self._maximal_itemset_tree.contains_superset_of(itemset):
+            return
+        self._maximal_itemset_tree.insert(itemset)
+        self.frequent_itemsets_final[itemset] = support
+
+    def _mine_maximal_itemsets(self, tree_root, header_table, item_order, head, min_sup_count):
+        """
+        FPMax: khai phá tập mục tối đại trên FP-Tree.
+        - Cây là đường đi đơn: chỉ một ứng viên, head cộng toàn bộ đường đi.
+        - Duyệt item header từ dưới lên theo thứ tự item trong cây, nên tập cha tối đại luôn được tìm thấy
+          trước tập con của nó; mỗi ứng viên chỉ cần kiểm tra "là tập con của tập tối đại đã có" trên MFI-tree.
+        - Lookahead: nếu head ∪ {item} ∪ (mọi item phổ biến trong CPB của item) đã nằm trong một tập tối đại
+          thì bỏ qua toàn bộ nhánh (không xây Conditional FP-Tree).
+        """
+        if self._is_single_path(tree_root):
+            path_items_with_counts = self._extract_items_counts_from_single_path(tree_root)
             if path_items_with_counts:
-                self._log_step_data(f"Items trên Single Path (cho tiền tố {prefix_path})", 
-                                    {"items_on_path": path_items_with_counts})
-
-                items_on_path = [item for item, count in path_items_with_counts]
-                item_counts_on_path_map = dict(path_items_with_counts)
-
-                for i in range(1, len(items_on_path) + 1):
-                    for combination_tuple in combinations(items_on_path, i):
-                        # Kết hợp tổ hợp này với tiền tố hiện tại
-                        current_combination_fset = frozenset(combination_tuple)
-                        new_frequent_itemset = prefix_path.union(current_combination_fset)
-                        
-                        # Support của itemset này là min count của các item trong combination_tuple trên path
-                        support_for_combination = min(item_counts_on_path_map[item] for item in combination_tuple)
-                        
-                        self.frequent_itemsets_final[new_frequent_itemset] = support_for_combination
-                        self._log_step_data(f"Tạo mẫu từ Single Path (tiền tố {prefix_path})",
-                                            {"pattern": new_frequent_itemset, "support": support_for_combination, 
-                                             "combination_from_path": current_combination_fset},
-                                            notes=f"Tổ hợp {current_combination_fset} với support {support_for_combination} từ single path.")
-            self.metrics.end_step(additional_info={"is_single_path_optimization": True, "items_in_path": len(path_items_with_counts)})
-            return # Kết thúc đệ quy cho nhánh này
-        # [Kết thúc thêm vào]
-
-        for item_name, item_data in sorted_items_in_header:
-            # Tạo frequent itemset mới: prefix + item_name
-            new_frequent_itemset = prefix_path.union(frozenset([item_name]))
-            # Chỉ thêm nếu count này (là support của item_name trong cây hiện tại) >= min_sup_count
-            # Điều này đã được đảm bảo bởi vì item_data['count'] là từ header table của cây (có điều kiện)
-            # mà các item trong header table đó đã được lọc theo min_sup_count trong ngữ cảnh đó.
-            self.frequent_itemsets_final[new_frequent_itemset] = item_data['count'] 
-            self.metrics.start_step(f"FP-Growth: Khai phá cho '{item_name}' (tiền tố {list(prefix_path) if prefix_path else '{}'})")
-
-            # 1. Xây dựng Conditional Pattern Base (CPB)
-            conditional_pattern_base = []
-            path_node = item_data['node'] # Nút đầu tiên trong chuỗi liên kết của item_name
-            
-            while path_node is not None:
-                # Lấy đường đi từ nút này lên gốc (không bao gồm nút item_name hiện tại)
-                single_path_to_root = []
-                temp_parent_node = path_node.parent
-                # Điều kiện dừng được thay đổi để không phụ thuộc vào item_name cụ thể của root,
-                # mà dựa vào việc node cha của nó có phải là None không (tức là nó là root).
-                while temp_parent_node is not None and temp_parent_node.parent is not None:
-                    single_path_to_root.append(temp_parent_node.item_name)
-                    temp_parent_node = temp_parent_node.parent
-
-                
-                if single_path_to_root: # Chỉ thêm nếu đường đi không rỗng
-                    # Đường đi đang ngược (từ node lên root), đảo lại
-                    conditional_pattern_base.append({'path': list(reversed(single_path_to_root)), 'count': path_node.count})
-                path_node = path_node.next_node_link
-            
-            self._log_step_data(f"Conditional Pattern Base cho '{item_name}' (tiền tố: {prefix_path})",
-                                {"item": item_name, "prefix": list(prefix_path), "cpb": conditional_pattern_base},
-                                notes=f"Tìm thấy {len(conditional_pattern_base)} đường đi.")
+                self._record_maximal_itemset(head.union(item for item, _ in path_items_with_counts),
+                                             path_items_with_counts[-1][1])
+            return
 
-            # 2. Xây dựng Conditional FP-Tree từ CPB
-            # Đếm tần suất các item trong CPB
-            conditional_item_counts = Counter()
-            for entry in conditional_pattern_base:
-                for item_in_path in entry['path']:
-                    conditional_item_counts[item_in_path] += entry['count']
-            
-            # Lọc các item phổ biến trong CPB
+        for item_name in reversed(item_order):
+            item_data = header_table.get(item_name)
+            if item_data is None:
+                continue
+            new_head = head.union([item_name])
+            conditional_item_counts, conditional_pattern_base = self._conditional_item_counts(item_name, item_data)
             frequent_items_in_cpb = {
                 item: count for item, count in conditional_item_counts.items() if count >= min_sup_count
             }
-            
+            if self._maximal_itemset_tree.contains_superset_of(new_head.union(frequent_items_in_cpb)):
+                self.metrics.fp_maximal_subtrees_skipped += 1
+                continue
             if not frequent_items_in_cpb:
-                self._log_step_data(f"Kết thúc nhánh cho '{item_name}'", 
-                                    {"message": "Không có item phổ biến nào trong Conditional Pattern Base."},
-                                    notes="Không xây dựng Conditional FP-Tree.")
-                self.metrics.end_step(additional_info={"conditional_tree_items": 0})
-                continue # Chuyển sang item tiếp theo trong header table
-
-            # Sắp xếp lại các đường đi trong CPB theo thứ tự item phổ biến mới
-            ordered_conditional_paths = []
-            for entry in conditional_pattern_base:
-                ordered_path = [item for item in entry['path'] if item in frequent_items_in_cpb]
-                # Sắp xếp path theo thứ tự tần suất giảm dần của frequent_items_in_cpb
-                ordered_path.sort(key=lambda i: (frequent_items_in_cpb[i], i), reverse=True)
-                if ordered_path:
-                    ordered_conditional_paths.append({'path': ordered_path, 'count': entry['count']})
-            
-            # Xây dựng Conditional FP-Tree (tương tự _build_fp_tree)
-            if ordered_conditional_paths:
-                # Chuyển đổi ordered_conditional_paths sang dạng [(path_list, count)]
-                paths_for_tree_build = [(p['path'], p['count']) for p in ordered_conditional_paths]
-                
-                cond_tree_root, cond_header_table = self._build_fp_tree_for_conditional(
-                    paths_for_tree_build, frequent_items_in_cpb, 
-                    log_prefix=f"Conditional cho '{item_name}' (tiền tố: {prefix_path})"
-                )
-                self.metrics.fp_conditional_trees_built += 1
-                
-                if cond_tree_root.children: # Nếu conditional tree không rỗng
-                    # Đệ quy khai phá conditional tree
-                    self._mine_fp_tree_recursively(cond_tree_root, cond_header_table, new_frequent_itemset, min_sup_count)
-            
-            self.metrics.end_step(additional_info={"conditional_tree_items": len(frequent_items_in_cpb)})
+                self._record_maximal_itemset(new_head, item_data['count'])
+                continue
+            cond_tree_root, cond_header_table, conditional_item_order = self._build_ordered_conditional_tree(
+                conditional_pattern_base or self._item_pattern_base(item_data), frequent_items_in_cpb,
+                item_data['count'], log_prefix=f"Conditional (tập tối đại) cho '{item_name}' (head: {new_head})"
+            )
+            self._mine_maximal_itemsets(cond_tree_root, cond_header_table, conditional_item_order, new_head, min_sup_count)
+
+    # --- Khai phá ngoài bộ nhớ (projected DB trên đĩa) ---
+    @staticmethod
+    def _append_projection_chunks(spill_files, buffered_paths):
+        """Ghi nối các (đường đi, trọng số) đang gom trong bộ nhớ vào file của item cuối đường đi."""
+        for item, paths_with_weights in buffered_paths.items():
+            with open(spill_files[item], "ab") as spill_file:
+                pickle.dump(paths_with_weights, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        buffered_paths.clear()
+
+    @staticmethod
+    def _read_projection(spill_path):
+        """Đọc toàn bộ một projected DB (danh sách các chunk pickle được ghi nối)."""
+        paths_with_weights = []
+        if not os.path.exists(spill_path):
+            return paths_with_weights
+        with open(spill_path, "rb") as spill_file:
+            while True:
+                try:
+                    paths_with_weights.extend(pickle.load(spill_file))
+                except EOFError:
+                    break
+        os.remove(spill_path)
+        return paths_with_weights
+
+    def _mine_out_of_core(self, ordered_frequent_1_items):
+        """
+        FP-Growth bằng phép chiếu phân hoạch (partition projection) trên đĩa:
+        1. Mỗi giao dịch đã sắp xếp được ghi vào file của item cuối cùng (item ít phổ biến nhất) của nó.
+        2. Xử lý item theo count tăng dần: file của item x lúc này chứa mọi giao dịch có x, cắt tới x.
+           Các tiền tố (bỏ x) chính là Conditional Pattern Base của x, được khai phá bằng một FP-Tree trong
+           bộ nhớ; sau đó mỗi tiền tố được chuyển sang file của item cuối mới của nó.
+        Mỗi giao dịch chỉ nằm trong đúng một file tại mọi thời điểm; trong bộ nhớ chỉ có một projected DB
+        (cộng với đầu vào nếu transactions là list; nguồn chunk được đọc lại từng chunk).
+        """
+        self.metrics.start_step("FP-Growth: Chia giao dịch vào các projected DB trên đĩa")
+        with tempfile.TemporaryDirectory(prefix="fpgrowth_projections_", dir=self.spill_directory) as spill_dir:
+            spill_files = {item: os.path.join(spill_dir, f"{rank}.pkl")
+                           for rank, item in enumerate(ordered_frequent_1_items)}
+            buffered_paths = defaultdict(list)
+            buffered_count = 0
+            for transaction_items, weight in self._ordered_weighted_transactions(ordered_frequent_1_items):
+                buffered_paths[transaction_items[-1]].append((transaction_items, weight))
+                buffered_count += 1
+                if buffered_count >= _SPILL_CHUNK_SIZE:
+                    self._append_projection_chunks(spill_files, buffered_paths)
+                    buffered_count = 0
+            self._append_projection_chunks(spill_files, buffered_paths)
+            self._log_step_data("Projected DB trên đĩa",
+                                {"spill_directory": spill_dir, "projections": len(spill_files)},
+                                notes="Mỗi giao dịch được ghi vào file của item ít phổ biến nhất của nó.")
+            self.metrics.end_step()
+
+            self.metrics.start_step("FP-Growth: Khai phá từng projected DB (count tăng dần)")
+            for item in reversed(ordered_frequent_1_items):
+                spill_bytes = os.path.getsize(spill_files[item]) if os.path.exists(spill_files[item]) else 0
+                projection = self._read_projection(spill_files[item])
+                if not projection:
+                    continue
+                paths = [path_items[:-1] for path_items, _ in projection]
+                path_weights = [weight for _, weight in projection]
+                item_count = sum(path_weights)
+                non_empty = [index for index, path in enumerate(paths) if path]
+                projected_base = (item, item_count, [paths[index] for index in non_empty],
+                                  [path_weights[index] for index in non_empty])
+                itemsets, conditional_trees_built, duration, _ = _mine_projected_bases_worker(
+                    [projected_base], self.min_support_count, type(self.metrics),
+                    self.tree_representation, self.mining_strategy, self.use_fp_array)
+                self.frequent_itemsets_final.update(itemsets)
+                self.metrics.fp_conditional_trees_built += conditional_trees_built
+                self.metrics.record_fp_projection(item, len(projection), spill_bytes, duration)
+                del projection, paths, path_weights
+
+                # Chuyển các tiền tố sang file của item cuối mới (item này đã được khai phá xong)
+                for path_items, weight in zip(projected_base[2], projected_base[3]):
+                    buffered_paths[path_items[-1]].append((path_items, weight))
+                self._append_projection_chunks(spill_files, buffered_paths)
+            self.metrics.end_step()
+
+    # --- Chế độ top-k (không cần ngưỡng support) ---
+    def _current_top_k_threshold(self):
+        """Ngưỡng hiện tại: support của tập thứ top_k khi heap đã đầy, nếu chưa thì là ngưỡng sàn."""
+        if len(self._top_k_support_heap) < self.top_k:
+            return self.min_support_count
+        return max(self.min_support_count, self._top_k_support_heap[0])
+
+    def _apply_initial_top_k_threshold(self, frequent_1_item_counts, ordered_frequent_1_items):
+        """
+        Nếu chỉ cần tập mục từ 1 item, top_k item phổ biến nhất đã cho một ngưỡng ban đầu (support của item thứ
+        top_k); item dưới ngưỡng này không thể nằm trong kết quả nên bị loại ngay trước khi xây cây.
+        """
+        if self.min_itemset_length == 1 and len(ordered_frequent_1_items) >= self.top_k:
+            initial_threshold = frequent_1_item_counts[ordered_frequent_1_items[self.top_k - 1]]
+            self.metrics.record_fp_top_k_threshold(initial_threshold)
+            self._tree_min_support_count = max(self._tree_min_support_count, initial_threshold)
+            frequent_1_item_counts = {item: count for item, count in frequent_1_item_counts.items()
+                                      if count >= initial_threshold}
+            ordered_frequent_1_items = [item for item in ordered_frequent_1_items if item in frequent_1_item_counts]
+        return frequent_1_item_counts, ordered_frequent_1_items
+
+    def _offer_top_k_candidate(self, itemset, support):
+        """
+        Đưa một tập mục vào kết quả top-k (nếu đủ dài và đạt ngưỡng hiện tại), nâng ngưỡng khi heap đầy.
+        Tập ngắn hơn min_itemset_length không vào kết quả nhưng support được giữ lại để sinh luật.
+        """
+        if support < self._current_top_k_threshold():
+            return
+        if len(itemset) < self.min_itemset_length:
+            self._top_k_subset_supports[itemset] = support
+            return
+        self.frequent_itemsets_final[itemset] = support
+        threshold_before = self._current_top_k_threshold()
+        if len(self._top_k_support_heap) < self.top_k:
+            heapq.heappush(self._top_k_support_heap, support)
+        elif support > self._top_k_support_heap[0]:
+            heapq.heapreplace(self._top_k_support_heap, support)
+        if self._current_top_k_threshold() > threshold_before:
+            self.metrics.record_fp_top_k_threshold(self._current_top_k_threshold())
+
+    def _mine_top_k_itemsets(self, tree_root, header_table, prefix_path):
+        """
+        Khai phá top-k: giống FP-Growth nhưng mọi phép lọc dùng ngưỡng hiện tại (chỉ tăng dần). Item header được
+        duyệt theo count giảm dần để các tập có support cao được tìm trước, làm ngưỡng tăng sớm và tỉa nhiều hơn.
+        """
+        for item_name, item_data in reversed(self._sorted_header_items(header_table)):
+            if item_data['count'] < self._current_top_k_threshold():
+                continue
+            new_itemset = prefix_path.union([item_name])
+            self._offer_top_k_candidate(new_itemset, item_data['count'])
+
+            conditional_item_counts, conditional_pattern_base = self._conditional_item_counts(item_name, item_data)
+            threshold = self._current_top_k_threshold()
+            frequent_items_in_cpb = {
+                item: count for item, count in conditional_item_counts.items() if count >= threshold
+            }
+            if not frequent_items_in_cpb:
+                continue
+            cond_tree_root, cond_header_table, _ = self._build_ordered_conditional_tree(
+                conditional_pattern_base or self._item_pattern_base(item_data), frequent_items_in_cpb,
+                item_data['count'], log_prefix=f"Conditional (top-k) cho '{item_name}' (tiền tố: {prefix_path})"
+            )
+            self._mine_top_k_itemsets(cond_tree_root, cond_header_table, new_itemset)
+
+    def _finalize_top_k(self):
+        """
+        Bỏ các tập được nhận khi ngưỡng còn thấp; giữ mọi tập có support >= support của tập thứ top_k.
+        Mọi tập con của một tập trong kết quả có support >= ngưỡng cuối (>= ngưỡng tại mọi thời điểm) nên đều đã
+        được duyệt: các tập con ngắn hơn min_itemset_length nằm trong _top_k_subset_supports.
+        """
+        self.top_k_support_threshold = self._current_top_k_threshold()
+        self.frequent_itemsets_final = {
+            itemset: support for itemset, support in self.frequent_itemsets_final.items()
+            if support >= self.top_k_support_threshold
+        }
+        self._top_k_subset_supports = {
+            itemset: support for itemset, support in self._top_k_subset_supports.items()
+            if support >= self.top_k_support_threshold
+        }
+        self._log_step_data(f"Top-{self.top_k} tập mục", {"support_threshold": self.top_k_support_threshold,
+                                                          "itemsets": len(self.frequent_itemsets_final)},
+                            notes=f"Ngưỡng support cuối cùng: {self.top_k_support_threshold} "
+                                  f"(các tập hòa support với tập thứ {self.top_k} cũng được giữ)")
+
+    def _expand_closed_itemsets(self, closed_itemsets):
+        """
+        Suy ra support của mọi tập mục phổ biến từ các tập đóng: support(X) = support lớn nhất của các tập đóng
+        chứa X. Duyệt tập đóng theo support giảm dần, tập con nào gặp lần đầu nhận support của tập đóng đó.
+        """
+        all_frequent_itemsets = {}
+        for closed_itemset, support in sorted(closed_itemsets.items(), key=lambda pair: pair[1], reverse=True):
+            items = tuple(closed_itemset)
+            for size in range(1, len(items) + 1):
+                for subset in combinations(items, size):
+                    all_frequent_itemsets.setdefault(frozenset(subset), support)
+        return all_frequent_itemsets
+
+    def _release_oldest_conditional_tree(self, stack):
+        """
+        Bỏ Conditional FP-Tree của khung cũ nhất còn giữ cây. Khung chỉ còn nhớ 'source' (mục header của khung cha)
+        và 'item_rank'; CPB của từng item còn lại được dựng lại từ CPB của 'source' khi item được lấy ra
+        (_released_pattern_base). Mục 'source' của khung con đang trỏ vào cây này cũng được chuyển sang dạng đó.
+        FP-array của cây (nếu có) bị bỏ theo, count trong CPB khi đó được đếm trên CPB dựng lại.
+        """
+        for frame_index in range(1, len(stack)): # stack[0] là cây chính, không tính vào giới hạn
+            frame = stack[frame_index]
+            if frame['tree'] is not None:
+                released = {'source': frame['source'], 'item_rank': frame['item_rank']}
+                frame['pending'] = [(item_name, self._released_header_entry(item_name, item_data, released))
+                                    for item_name, item_data in frame['pending']]
+                if frame_index + 1 < len(stack):
+                    child_frame = stack[frame_index + 1]
+                    child_frame['source'] = (child_frame['source'][0],
+                                             self._released_header_entry(*child_frame['source'], released))
+                self._discard_conditional_tree(frame['tree'])
+                frame['tree'] = None
+                self.metrics.fp_conditional_trees_released += 1
+                return
+
+    def _discard_conditional_tree(self, tree_root):
+        """
+        Cây TreeNode có tham chiếu vòng (cha <-> con) nên khi bỏ đi chỉ được thu hồi lúc GC chạy; xóa children của
+        mọi nút để cây được giải phóng ngay khi hết tham chiếu. ArrayFPTree không có vòng nên không cần. Khi ghi
+        log các bước, cây còn được log giữ lại (để trực quan hóa) nên không được đụng vào.
+        """
+        if self.log_intermediate_steps or not isinstance(tree_root, TreeNode):
+            return
+        nodes = [tree_root]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.children.values())
+            node.children = {}
+
+    @staticmethod
+    def _released_header_entry(item_name, item_data, released):
+        """Mục header thay cho item_data khi cây chứa nó bị giải phóng: không còn tham chiếu tới nút hay FP-array."""
+        return {'count': item_data['count'], 'item': item_name, 'released': released}
 
+    def _build_fp_tree_for_conditional(self, ordered_paths_with_counts, frequent_items_in_paths, log_prefix="",
+                                       fp_array=None):
+        """
+        Hàm phụ để xây dựng FP-Tree (chính hoặc có điều kiện).
+        fp_array (FPArray, optional): FP-array (theo đúng thứ tự item của các đường đi) được cộng dồn khi chèn.
+        """
+        if self.tree_representation == "array":
+            array_tree = ArrayFPTree(fp_array.item_order if fp_array is not None else frequent_items_in_paths,
+                                     root_name='cond_root')
+            for path_items, path_count in ordered_paths_with_counts:
+                array_tree.insert(path_items, path_count, fp_array)
+            array_tree.finalize()
+            root, current_header_table = array_tree.root, array_tree.header_table(frequent_items_in_paths)
+            self._attach_fp_array(current_header_table, fp_array)
+            self._log_step_data(f"Xây dựng {log_prefix} FP-Tree",
+                                {"message": "Cây đã được xây dựng. Xem trực quan hóa."},
+                                notes=f"Số nút ước tính: {len(array_tree)}",
+                                tree_dot=root, header_table_data=current_header_table)
+            return root, current_header_table
 
-    def _build_fp_tree_for_conditional(self, ordered_paths_with_counts, frequent_items_in_paths, log_prefix=""):
-        """Hàm phụ để xây dựng FP-Tree (chính hoặc có điều kiện)."""
         # Header table cho cây này
         current_header_table = {
-            item: {'count': frequent_items_in_paths[item], 'node': None}
+            item: {'count': frequent_items_in_paths[item], 'node': None, 'tail': None}
             for item in frequent_items_in_paths
         }
         root = TreeNode(item_name='cond_root', count=1, parent_node=None) # Tên root khác để phân biệt
 
         for path_items, path_count in ordered_paths_with_counts:
+            if fp_array is not None:
+                fp_array.add_items(path_items, path_count)
             current_node = root
             for item in path_items: # Items đã được sắp xếp theo L (của conditional context)
                 child = current_node.children.get(item)
@@ -291,14 +1388,9 @@ class FPGrowthAlgorithm:
                     child = TreeNode(item_name=item, count=path_count, parent_node=current_node)
                     current_node.children[item] = child
                     
-                    if current_header_table[item]['node'] is None:
-                        current_header_table[item]['node'] = child
-                    else:
-                        temp_node = current_header_table[item]['node']
-                        while temp_node.next_node_link is not None:
-                            temp_node = temp_node.next_node_link
-                        temp_node.next_node_link = child
+                    self._append_node_link(current_header_table[item], child)
                 current_node = child
+        self._attach_fp_array(current_header_table, fp_array)
         
         num_nodes = 1 
         q = [root]; visited_nodes_count = set()
@@ -315,33 +1407,20 @@ class FPGrowthAlgorithm:
                             tree_dot=root, header_table_data=current_header_table)
         return root, current_header_table
 
-    def run(self):
-        self.metrics.start_overall_measurement()
+    def _reset_mining_state(self):
         self.intermediate_steps_data = []
+        # Mọi item có count >= ngưỡng này đều có trong FP-Tree chính (với "top_k" có thể cao hơn min_support_count)
+        self._tree_min_support_count = self.min_support_count
         self.frequent_itemsets_final = {}
+        self._closed_itemsets_by_support = defaultdict(list)
+        self._top_k_support_heap = []
+        self._top_k_subset_supports = {}
 
-        # 1. Quét DB lần 1: Tìm L1 và thứ tự
-        frequent_1_item_counts, ordered_frequent_1_items = self._scan1_find_frequent_1_itemsets_and_order()
-        if not ordered_frequent_1_items:
-            self._log_step_data("Kết thúc sớm", {"message": "Không có 1-itemset phổ biến nào."}, 
-                                notes="Thuật toán FP-Growth dừng.")
-            self.metrics.end_overall_measurement()
-            return {}, self.intermediate_steps_data
-
+    def _build_main_tree_from_items(self, frequent_1_item_counts, ordered_frequent_1_items):
+        """Bước 2-3: sắp xếp/lọc giao dịch theo thứ tự L rồi xây FP-Tree chính. Trả về (None, None) nếu cây rỗng."""
         # 2. Sắp xếp lại các giao dịch theo thứ tự L (ordered_frequent_1_items) và loại bỏ item không phổ biến
         self.metrics.start_step("FP-Growth: Chuẩn bị giao dịch cho xây dựng cây")
-        ordered_transactions_for_tree = []
-        for transaction in self.transactions:
-            # Lọc item không phổ biến và sắp xếp theo thứ tự L
-            filtered_transaction = [item for item in transaction if item in frequent_1_item_counts]
-            # Sắp xếp filtered_transaction theo thứ tự của ordered_frequent_1_items
-            # Tạo một map từ item sang index của nó trong ordered_frequent_1_items để sort
-            order_map = {item: i for i, item in enumerate(ordered_frequent_1_items)}
-            # Sắp xếp dựa trên index này (tức là theo count giảm dần, rồi theo tên)
-            filtered_transaction.sort(key=lambda item: order_map[item])
-            
-            if filtered_transaction:
-                ordered_transactions_for_tree.append((filtered_transaction, 1)) # (transaction_items, count=1)
+        ordered_transactions_for_tree = list(self._ordered_weighted_transactions(ordered_frequent_1_items))
         
         self._log_step_data("Giao dịch đã sắp xếp và lọc", 
                             {"count": len(ordered_transactions_for_tree), 
@@ -352,70 +1431,594 @@ class FPGrowthAlgorithm:
         if not ordered_transactions_for_tree:
              self._log_step_data("Kết thúc sớm", {"message": "Không có giao dịch nào sau khi lọc item không phổ biến."}, 
                                 notes="Thuật toán FP-Growth dừng.")
-             self.metrics.end_overall_measurement()
-             return {}, self.intermediate_steps_data
+             return None, None
 
         # 3. Xây dựng FP-Tree chính
-        main_fp_tree_root, main_header_table = self._build_fp_tree(ordered_transactions_for_tree, frequent_1_item_counts)
+        main_fp_tree_root, main_header_table = self._build_fp_tree(ordered_transactions_for_tree, frequent_1_item_counts,
+                                                                   ordered_frequent_1_items)
         if not main_fp_tree_root.children: # Cây rỗng
             self._log_step_data("Kết thúc sớm", {"message": "FP-Tree chính rỗng sau khi xây dựng."},
                                 notes="Thuật toán FP-Growth dừng.")
-            self.metrics.end_overall_measurement()
-            return {}, self.intermediate_steps_data
+            return None, None
+        return main_fp_tree_root, main_header_table
 
-        # 4. Khai phá FP-Tree đệ quy
-        self.metrics.start_step("FP-Growth: Bắt đầu khai phá đệ quy FP-Tree")
-        self._mine_fp_tree_recursively(main_fp_tree_root, main_header_table, frozenset(), self.min_support_count)
+    def _mine_main_tree(self, main_fp_tree_root, main_header_table, ordered_frequent_1_items):
+        """Bước 4: khai phá FP-Tree chính theo mining_mode / n_jobs / mining_strategy."""
+        if self.mining_mode == "closed":
+            self.metrics.start_step("FP-Growth: Khai phá tập mục đóng (CLOSET)")
+            self._mine_closed_itemsets(main_fp_tree_root, main_header_table, ordered_frequent_1_items,
+                                       frozenset(), self.min_support_count)
+        elif self.mining_mode == "top_k":
+            self.metrics.start_step(f"FP-Growth: Khai phá top-{self.top_k} tập mục (ngưỡng động)")
+            self._mine_top_k_itemsets(main_fp_tree_root, main_header_table, frozenset())
+            self._finalize_top_k()
+        elif self.mining_mode == "maximal":
+            self.metrics.start_step("FP-Growth: Khai phá tập mục tối đại (FPMax)")
+            self._maximal_itemset_tree = MaximalItemsetTree(ordered_frequent_1_items)
+            self._mine_maximal_itemsets(main_fp_tree_root, main_header_table, ordered_frequent_1_items,
+                                        frozenset(), self.min_support_count)
+            self.metrics.fp_maximal_tree_nodes = len(self._maximal_itemset_tree)
+        elif self.n_jobs > 1:
+            self.metrics.start_step(f"FP-Growth: Khai phá song song trên {self.n_jobs} tiến trình")
+            self._mine_fp_tree_in_parallel(main_fp_tree_root, main_header_table, self.min_support_count)
+        elif self.mining_strategy == "iterative":
+            self.metrics.start_step("FP-Growth: Bắt đầu khai phá FP-Tree (ngăn xếp tường minh)")
+            self._mine_fp_tree_iteratively(main_fp_tree_root, main_header_table, frozenset(), self.min_support_count)
+        else:
+            self.metrics.start_step("FP-Growth: Bắt đầu khai phá đệ quy FP-Tree")
+            self._mine_fp_tree_recursively(main_fp_tree_root, main_header_table, frozenset(), self.min_support_count)
         self.metrics.end_step()
         
         self._log_step_data("Hoàn thành khai phá", 
                             {"total_frequent_itemsets": len(self.frequent_itemsets_final)},
                             notes="Đã tìm thấy tất cả các tập mục phổ biến.")
+
+    def run(self):
+        self.metrics.start_overall_measurement()
+        self._reset_mining_state()
+
+        # 1. Quét DB lần 1: Tìm L1 và thứ tự
+        frequent_1_item_counts, ordered_frequent_1_items = self._scan1_find_frequent_1_itemsets_and_order()
+        if not ordered_frequent_1_items:
+            self._log_step_data("Kết thúc sớm", {"message": "Không có 1-itemset phổ biến nào."}, 
+                                notes="Thuật toán FP-Growth dừng.")
+            self.metrics.end_overall_measurement()
+            return {}, self.intermediate_steps_data
+        if self.mining_mode == "top_k":
+            frequent_1_item_counts, ordered_frequent_1_items = self._apply_initial_top_k_threshold(
+                frequent_1_item_counts, ordered_frequent_1_items)
+
+        if self.out_of_core:
+            self._mine_out_of_core(ordered_frequent_1_items)
+            self._log_step_data("Hoàn thành khai phá", 
+                                {"total_frequent_itemsets": len(self.frequent_itemsets_final)},
+                                notes="Đã tìm thấy tất cả các tập mục phổ biến (khai phá từng projected DB trên đĩa).")
+            self.metrics.end_overall_measurement()
+            return self.frequent_itemsets_final, self.intermediate_steps_data
+
+        # 2-3. Sắp xếp giao dịch và xây FP-Tree chính
+        main_fp_tree_root, main_header_table = self._build_main_tree_from_items(frequent_1_item_counts,
+                                                                                ordered_frequent_1_items)
+        if main_fp_tree_root is None:
+            self.metrics.end_overall_measurement()
+            return {}, self.intermediate_steps_data
+        self.main_tree_snapshot = self._make_tree_snapshot(main_fp_tree_root, main_header_table,
+                                                           ordered_frequent_1_items)
+
+        # 4. Khai phá FP-Tree đệ quy
+        self._mine_main_tree(main_fp_tree_root, main_header_table, ordered_frequent_1_items)
         
         self.metrics.end_overall_measurement()
         return self.frequent_itemsets_final, self.intermediate_steps_data
 
+    def build_tree_snapshot(self):
+        """
+        Chỉ chạy bước 1-3 (quét L1, sắp xếp giao dịch, xây FP-Tree chính) ở min_support_count của thuật toán.
+        Cây trả về có thể được lưu (save_fp_tree) và khai phá nhiều lần bằng mine_from_tree ở mọi ngưỡng
+        không thấp hơn ngưỡng lúc xây.
+        Returns:
+            FPTreeSnapshot | None: None nếu không có item phổ biến nào.
+        """
+        self._reset_mining_state()
+        frequent_1_item_counts, ordered_frequent_1_items = self._scan1_find_frequent_1_itemsets_and_order()
+        if not ordered_frequent_1_items:
+            return None
+        main_fp_tree_root, main_header_table = self._build_main_tree_from_items(frequent_1_item_counts,
+                                                                                ordered_frequent_1_items)
+        if main_fp_tree_root is None:
+            return None
+        self.main_tree_snapshot = self._make_tree_snapshot(main_fp_tree_root, main_header_table,
+                                                           ordered_frequent_1_items)
+        return self.main_tree_snapshot
+
+    def _make_tree_snapshot(self, main_fp_tree_root, main_header_table, ordered_frequent_1_items):
+        return FPTreeSnapshot(main_fp_tree_root, main_header_table, ordered_frequent_1_items,
+                              self._tree_min_support_count, self.num_transactions, self.metrics.fp_nodes_in_tree)
+
+    def mine_from_tree(self, snapshot):
+        """
+        Khai phá một FP-Tree đã xây (build_tree_snapshot) hoặc đã nạp (load_fp_tree) ở min_support_count của
+        thuật toán, không quét lại dữ liệu: item header dưới ngưỡng bị bỏ qua, và vì item được sắp theo count
+        giảm dần nên mọi nút nằm dưới một item không phổ biến cũng không phổ biến (không bao giờ được duyệt).
+        """
+        if self.min_support_count < snapshot.min_support_count:
+            raise ValueError(f"min_support_count ({self.min_support_count}) phải >= ngưỡng lúc xây cây "
+                             f"({snapshot.min_support_count}).")
+        self.metrics.start_overall_measurement()
+        self._reset_mining_state()
+        self.num_transactions = snapshot.num_transactions
+        header_table = {item: entry for item, entry in snapshot.header_table.items()
+                        if entry['count'] >= self.min_support_count}
+        ordered_items = [item for item in snapshot.item_order if item in header_table]
+        if self.mining_mode == "top_k":
+            item_counts, ordered_items = self._apply_initial_top_k_threshold(
+                {item: header_table[item]['count'] for item in ordered_items}, ordered_items)
+            header_table = {item: header_table[item] for item in item_counts}
+        self.main_tree_snapshot = snapshot
+        self.metrics.fp_nodes_in_tree = snapshot.num_nodes
+        self.metrics.fp_header_items_skipped = len(snapshot.header_table) - len(header_table)
+        self._log_step_data("FP-Tree đã xây sẵn", {"build_min_support_count": snapshot.min_support_count,
+                                                  "header_items_kept": len(header_table),
+                                                  "header_items_skipped": self.metrics.fp_header_items_skipped},
+                            notes=f"Khai phá lại ở ngưỡng {self.min_support_count}, không quét dữ liệu hay xây lại cây.",
+                            tree_dot=snapshot.root, header_table_data=header_table)
+        if header_table:
+            self._mine_main_tree(snapshot.root, header_table, ordered_items)
+        self.metrics.end_overall_measurement()
+        return self.frequent_itemsets_final, self.intermediate_steps_data
+
     def generate_association_rules(self, all_frequent_itemsets, min_confidence):
         """Sinh luật kết hợp (tương tự Apriori)."""
         if not all_frequent_itemsets:
             return []
 
-        self.metrics.start_step("FP-Growth: Sinh Luật Kết Hợp")
-        rules = []
-        
-        for itemset, support_itemset_count in all_frequent_itemsets.items():
-            if len(itemset) < 2:
+        if self.mining_mode == "maximal":
+            self._log_step_data("Luật Kết Hợp (FP-Growth)", [],
+                                notes="Chế độ tập tối đại không lưu support của các tập con nên không sinh luật.")
+            return []
+
+        if self.mining_mode == "closed":
+            # Kết quả chỉ gồm tập đóng: khôi phục support của các tập con (tiền đề/hậu quả) trước khi sinh luật
+            all_frequent_itemsets = self._expand_closed_itemsets(all_frequent_itemsets)
+        subset_supports = None
+        if self.mining_mode == "top_k" and self.min_itemset_length > 1:
+            # Kết quả bỏ các tập ngắn: support của chúng (tiền đề/hậu quả ngắn) được giữ lại lúc khai phá
+            subset_supports = self._top_k_subset_supports
+        return generate_association_rules(all_frequent_itemsets, self.num_transactions, min_confidence,
+                                          self.metrics, self._log_step_data, algorithm_name="FP-Growth",
+                                          subset_supports=subset_supports)
+
+class IncrementalFPTree:
+    """
+    FP-Tree cập nhật tăng dần kiểu CanTree: item được sắp theo một thứ tự chính tắc cố định (thứ tự xuất hiện
+    lần đầu) thay vì theo tần suất, và mọi item đều được giữ trong cây (không lọc theo support). Nhờ vậy thêm
+    giao dịch mới không bao giờ phải sắp xếp lại hay xây lại cây: chi phí add_transactions() chỉ tỉ lệ với
+    dữ liệu mới. Việc khai phá chỉ chạy khi gọi mine(), với ngưỡng support tùy ý tại thời điểm đó.
+    """
+    def __init__(self):
+        self.root = TreeNode(item_name='root', count=1, parent_node=None)
+        self.header_table = {} # item -> {'count', 'node', 'tail'}, cùng dạng header table của FPGrowthAlgorithm
+        self.item_rank = {} # item -> thứ tự chính tắc (không đổi khi tần suất thay đổi)
+        self.num_transactions = 0 # Tổng trọng số các giao dịch đang có trong cây
+        self.num_nodes = 1
+        self._detached_nodes = 0 # Nút count 0 đã tách khỏi cây nhưng còn nằm trong chuỗi node-link
+
+    def _canonical_order(self, transaction):
+        """Sắp các item (đã bỏ trùng) của giao dịch theo thứ tự chính tắc; item mới được cấp hạng tiếp theo."""
+        for item in transaction:
+            if item not in self.item_rank:
+                self.item_rank[item] = len(self.item_rank)
+        return sorted(set(transaction), key=self.item_rank.__getitem__)
+
+    def add_transactions(self, transactions, transaction_weights=None, metrics_collector=None):
+        """
+        Chèn các giao dịch mới vào cây theo thứ tự chính tắc.
+        Args:
+            transaction_weights (list[int], optional): Số lần lặp của từng giao dịch (None = 1).
+            metrics_collector (PerformanceMetrics, optional): Ghi lại số giao dịch, thời gian và số nút sau cập nhật.
+        """
+        if transaction_weights is not None and len(transaction_weights) != len(transactions):
+            raise ValueError("transaction_weights phải có cùng độ dài với transactions.")
+        started = time.perf_counter()
+        weights = repeat(1) if transaction_weights is None else transaction_weights
+        added = 0
+        for transaction, weight in zip(transactions, weights):
+            current_node = self.root
+            for item in self._canonical_order(transaction):
+                header_entry = self.header_table.setdefault(item, {'count': 0, 'node': None, 'tail': None})
+                header_entry['count'] += weight
+                child_node = current_node.children.get(item)
+                if child_node:
+                    child_node.increment_count(weight)
+                else:
+                    child_node = TreeNode(item_name=item, count=weight, parent_node=current_node)
+                    current_node.children[item] = child_node
+                    FPGrowthAlgorithm._append_node_link(header_entry, child_node)
+                    self.num_nodes += 1
+                current_node = child_node
+            self.num_transactions += weight
+            added += 1
+        if metrics_collector is not None:
+            metrics_collector.record_fp_incremental_update(added, time.perf_counter() - started, self.num_nodes)
+
+    def remove_transactions(self, transactions, transaction_weights=None, metrics_collector=None):
+        """
+        Xóa các giao dịch đã thêm trước đó: giảm count dọc theo đường đi chính tắc của mỗi giao dịch.
+        Cả lô được kiểm tra trước khi sửa cây: lượng giảm được cộng dồn theo từng nút (kể cả các giao dịch
+        trùng nhau trong lô), và sau khi trừ, mỗi nút vẫn phải có count >= tổng count các con
+        (tức đủ giao dịch kết thúc đúng tại nút đó). Nếu lô không hợp lệ thì cây giữ nguyên.
+        Nút về count 0 được tách khỏi cha; chuỗi node-link được dọn lại khi số nút đã tách vượt số nút còn sống.
+        Raises:
+            ValueError: Nếu có giao dịch (hoặc số lần lặp của nó) không có trong cây.
+        """
+        if transaction_weights is not None and len(transaction_weights) != len(transactions):
+            raise ValueError("transaction_weights phải có cùng độ dài với transactions.")
+        started = time.perf_counter()
+        weights = repeat(1) if transaction_weights is None else transaction_weights
+
+        # Lượt 1: tìm đường đi của mọi giao dịch và cộng dồn lượng giảm theo nút (root đại diện num_transactions)
+        decrements = {} # id(nút) -> [nút, tổng lượng giảm, giao dịch đầu tiên đi qua nút]
+        removed = 0
+        removed_weight = 0
+        for transaction, weight in zip(transactions, weights):
+            current_node = self.root
+            for item in sorted(set(transaction), key=lambda item: self.item_rank.get(item, -1)):
+                current_node = current_node.children.get(item)
+                if current_node is None:
+                    raise ValueError(f"Giao dịch cần xóa không có trong cây: {transaction}")
+                entry = decrements.setdefault(id(current_node), [current_node, 0, transaction])
+                entry[1] += weight
+            removed += 1
+            removed_weight += weight
+
+        def _remaining(node, decrement):
+            return (self.num_transactions if node is self.root else node.count) - decrement
+
+        for node, decrement, transaction in [(self.root, removed_weight, None), *decrements.values()]:
+            remaining = _remaining(node, decrement)
+            children_remaining = sum(
+                child.count - decrements.get(id(child), (None, 0))[1] for child in node.children.values()
+            )
+            if remaining < children_remaining:
+                if transaction is None:
+                    raise ValueError("Số giao dịch rỗng cần xóa nhiều hơn số giao dịch rỗng có trong cây.")
+                raise ValueError(f"Giao dịch cần xóa không có trong cây (hoặc bị xóa nhiều hơn số lần đã thêm): "
+                                 f"{transaction}")
+
+        # Lượt 2: lô đã hợp lệ, áp dụng các lượng giảm
+        for node, decrement, _ in decrements.values():
+            node.count -= decrement
+            self.header_table[node.item_name]['count'] -= decrement
+            if node.count == 0:
+                del node.parent.children[node.item_name]
+                self.num_nodes -= 1
+                self._detached_nodes += 1
+        self.num_transactions -= removed_weight
+        if self._detached_nodes > self.num_nodes:
+            self._compact_node_links()
+        if metrics_collector is not None:
+            metrics_collector.record_fp_incremental_update(0, time.perf_counter() - started, self.num_nodes,
+                                                           expired=removed)
+
+    def _compact_node_links(self):
+        """Nối lại chuỗi node-link chỉ với các nút còn trong cây; bỏ mục header của item không còn xuất hiện."""
+        self.header_table = {item: {'count': entry['count'], 'node': None, 'tail': None}
+                             for item, entry in self.header_table.items() if entry['count'] > 0}
+        stack = list(self.root.children.values())
+        while stack:
+            node = stack.pop()
+            node.next_node_link = None
+            FPGrowthAlgorithm._append_node_link(self.header_table[node.item_name], node)
+            stack.extend(node.children.values())
+        self._detached_nodes = 0
+
+    def mine(self, min_support_count, metrics_collector, tree_representation="object",
+             mining_strategy="recursive", use_fp_array=False):
+        """
+        Khai phá tập mục phổ biến trên cây hiện tại. Với mỗi item đạt ngưỡng, các đường đi tiền tố của nó
+        (Conditional Pattern Base theo thứ tự chính tắc) được khai phá như một DB có trọng số bằng FP-Growth
+        thông thường (cây có điều kiện được sắp theo tần suất như bình thường).
+        Returns:
+            dict: {frozenset: support_count}
+        """
+        metrics_collector.start_step("FP-Growth tăng dần: Khai phá cây chính tắc (CanTree)")
+        metrics_collector.fp_nodes_in_tree = self.num_nodes
+        frequent_itemsets = {}
+        for item, header_entry in self.header_table.items():
+            if header_entry['count'] < min_support_count:
                 continue
-            for i in range(1, len(itemset)):
-                for antecedent_tuple in combinations(itemset, i):
-                    antecedent = frozenset(antecedent_tuple)
-                    consequent = itemset.difference(antecedent)
-                    support_antecedent_count = all_frequent_itemsets.get(antecedent)
-                    if support_antecedent_count is None or support_antecedent_count == 0:
-                        continue
-                    confidence = support_itemset_count / support_antecedent_count
-                    if confidence >= min_confidence:
-                        support_itemset_frac = support_itemset_count / self.num_transactions
-                        support_antecedent_frac = support_antecedent_count / self.num_transactions
-                        support_consequent_count = all_frequent_itemsets.get(consequent, 0) # Lấy count, nếu không có thì là 0
-                        support_consequent_frac = support_consequent_count / self.num_transactions
-                        
-                        lift = 0
-                        if support_antecedent_frac > 0 and support_consequent_frac > 0:
-                            lift = support_itemset_frac / (support_antecedent_frac * support_consequent_frac)
-                        
-                        rules.append({
-                            "antecedent": tuple(sorted(list(antecedent))),
-                            "consequent": tuple(sorted(list(consequent))),
-                            "support": support_itemset_frac,
-                            "confidence": confidence,
-                            "lift": lift,
-                            "itemset_support_count": support_itemset_count,
-                            "antecedent_support_count": support_antecedent_count,
-                            "consequent_support_count": support_consequent_count
-                        })
-        
-        self._log_step_data("Luật Kết Hợp Đã Sinh (FP-Growth)", rules, 
-                            notes=f"Số luật: {len(rules)} với min_confidence={min_confidence:.2f}")
-        self.metrics.end_step(additional_info={"rules_generated": len(rules)})
-        return rules
+            paths, path_counts = [], []
+            path_node = header_entry['node']
+            while path_node is not None:
+                prefix = []
+                ancestor = path_node.parent
+                while ancestor is not None and ancestor.parent is not None:
+                    prefix.append(ancestor.item_name)
+                    ancestor = ancestor.parent
+                if prefix and path_node.count > 0:
+                    paths.append(prefix[::-1])
+                    path_counts.append(path_node.count)
+                path_node = path_node.next_node_link
+            itemsets, conditional_trees_built, _, _ = _mine_projected_bases_worker(
+                [(item, header_entry['count'], paths, path_counts)], min_support_count, type(metrics_collector),
+                tree_representation, mining_strategy, use_fp_array)
+            frequent_itemsets.update(itemsets)
+            metrics_collector.fp_conditional_trees_built += conditional_trees_built
+        metrics_collector.end_step(additional_info={"frequent_itemsets": len(frequent_itemsets)})
+        return frequent_itemsets
+
+class SlidingWindowFPMiner:
+    """
+    Khai phá luồng giao dịch (theo thứ tự InvoiceDate) trên cửa sổ trượt: N giao dịch gần nhất hoặc
+    N ngày gần nhất. Giao dịch mới được chèn vào một IncrementalFPTree, giao dịch rơi khỏi cửa sổ được xóa
+    khỏi cây, nên không bao giờ phải xây lại từ đầu. Kết quả của cửa sổ hiện tại được khai phá khi hỏi
+    (chi phí chỉ phụ thuộc kích thước cửa sổ) và được nhớ lại cho tới khi cửa sổ thay đổi.
+    """
+    def __init__(self, window_transactions=None, window_days=None):
+        if (window_transactions is None) == (window_days is None):
+            raise ValueError("Cần đặt đúng một trong window_transactions hoặc window_days.")
+        if window_transactions is not None and window_transactions < 1:
+            raise ValueError(f"window_transactions phải >= 1, nhận được: {window_transactions}")
+        if window_days is not None and window_days <= 0:
+            raise ValueError(f"window_days phải > 0, nhận được: {window_days}")
+        self.window_transactions = window_transactions
+        self.window_days = window_days
+        self.tree = IncrementalFPTree()
+        self.window = deque() # (timestamp, items, trọng số) theo thứ tự thời gian
+        self.latest_timestamp = None
+        self._cached_itemsets = {} # min_support_count -> kết quả của cửa sổ hiện tại
+
+    def __len__(self):
+        return len(self.window)
+
+    def add_transactions(self, timestamped_transactions, transaction_weights=None, metrics_collector=None):
+        """
+        Thêm các giỏ hàng mới (timestamp, items) rồi loại các giỏ đã ra khỏi cửa sổ.
+        Timestamp phải không giảm (luồng đã sắp theo InvoiceDate). Cả lô được kiểm tra trước khi chèn:
+        lô bị từ chối không làm thay đổi cửa sổ, cây hay latest_timestamp.
+        """
+        timestamped_transactions = list(timestamped_transactions)
+        weights = [1] * len(timestamped_transactions) if transaction_weights is None else list(transaction_weights)
+        previous_timestamp = self.latest_timestamp
+        for timestamp, _ in timestamped_transactions:
+            if previous_timestamp is not None and timestamp < previous_timestamp:
+                raise ValueError(f"Giao dịch không theo thứ tự thời gian: {timestamp} < {previous_timestamp}")
+            previous_timestamp = timestamp
+        self.tree.add_transactions([items for _, items in timestamped_transactions], weights, metrics_collector)
+        self.window.extend((timestamp, items, weight)
+                           for (timestamp, items), weight in zip(timestamped_transactions, weights))
+        self.latest_timestamp = previous_timestamp
+        self._expire(metrics_collector)
+        self._cached_itemsets.clear()
+
+    def _expire(self, metrics_collector=None):
+        """Xóa khỏi cây các giỏ hàng nằm ngoài cửa sổ (theo số giao dịch hoặc theo số ngày)."""
+        expired = []
+        if self.window_transactions is not None:
+            while len(self.window) > self.window_transactions:
+                expired.append(self.window.popleft())
+        else:
+            oldest_allowed = self.latest_timestamp - timedelta(days=self.window_days)
+            while self.window and self.window[0][0] <= oldest_allowed:
+                expired.append(self.window.popleft())
+        if expired:
+            self.tree.remove_transactions([items for _, items, _ in expired],
+                                          [weight for _, _, weight in expired], metrics_collector)
+
+    def frequent_itemsets(self, min_support_count, metrics_collector, **mine_options):
+        """Tập mục phổ biến của cửa sổ hiện tại ({frozenset: support_count})."""
+        if min_support_count not in self._cached_itemsets:
+            self._cached_itemsets[min_support_count] = self.tree.mine(min_support_count, metrics_collector,
+                                                                      **mine_options)
+        return self._cached_itemsets[min_support_count]
+
+def fingerprint_transactions(transactions, transaction_weights=None):
+    """SHA-256 của dữ liệu nguồn (các giao dịch đã sắp item và trọng số), dùng để kiểm tra cây đã lưu có khớp dữ liệu."""
+    digest = hashlib.sha256()
+    weights = repeat(1) if transaction_weights is None else transaction_weights
+    for transaction, weight in zip(transactions, weights):
+        digest.update("\x1f".join(sorted(map(str, transaction))).encode("utf-8"))
+        digest.update(f"\x1e{weight}\x1d".encode("utf-8"))
+    return digest.hexdigest()
+
+def _is_json_item(item):
+    """Item lưu được vào metadata JSON và đọc lại y nguyên: str hoặc int (không nhận bool)."""
+    return isinstance(item, str) or (isinstance(item, int) and not isinstance(item, bool))
+
+def _is_count(value):
+    """Số đếm hợp lệ trong metadata: int không âm (không nhận bool)."""
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+def _decode_tree_metadata(metadata_bytes):
+    """
+    Giải mã metadata JSON của file FP-Tree. File có thể do người dùng tải lên nên chỉ đọc JSON
+    (không bao giờ unpickle) và kiểm tra kiểu từng trường; sai định dạng thì báo ValueError.
+    """
+    try:
+        metadata = json.loads(metadata_bytes.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Metadata của FP-Tree đã lưu không hợp lệ: {e}") from e
+    if not isinstance(metadata, dict):
+        raise ValueError("Metadata của FP-Tree đã lưu không hợp lệ: không phải object JSON.")
+    items, item_counts = metadata.get("items"), metadata.get("item_counts")
+    vocabulary = metadata.get("vocabulary")
+    if (not isinstance(items, list) or not all(_is_json_item(item) for item in items)
+            or len(set(items)) != len(items)):
+        raise ValueError("Metadata của FP-Tree đã lưu không hợp lệ: 'items' phải là danh sách str/int không trùng.")
+    if (not isinstance(item_counts, list) or len(item_counts) != len(items)
+            or not all(_is_count(count) for count in item_counts)):
+        raise ValueError("Metadata của FP-Tree đã lưu không hợp lệ: 'item_counts' không khớp 'items'.")
+    for key in ("min_support_count", "num_transactions"):
+        if not _is_count(metadata.get(key)):
+            raise ValueError(f"Metadata của FP-Tree đã lưu không hợp lệ: '{key}' phải là số nguyên không âm.")
+    if vocabulary is not None and (not isinstance(vocabulary, list)
+                                   or not all(_is_json_item(item) for item in vocabulary)):
+        raise ValueError("Metadata của FP-Tree đã lưu không hợp lệ: 'vocabulary' phải là danh sách str/int.")
+    if not isinstance(metadata.get("build_parameters", {}), dict):
+        raise ValueError("Metadata của FP-Tree đã lưu không hợp lệ: 'build_parameters' phải là object.")
+    if metadata.get("byteorder") not in ("little", "big"):
+        raise ValueError("Metadata của FP-Tree đã lưu không hợp lệ: 'byteorder' phải là 'little' hoặc 'big'.")
+    if not isinstance(metadata.get("source_fingerprint"), (str, type(None))):
+        raise ValueError("Metadata của FP-Tree đã lưu không hợp lệ: 'source_fingerprint' phải là chuỗi.")
+    return metadata
+
+def _validate_tree_nodes(parents, node_items, node_counts, item_counts):
+    """
+    Kiểm tra 3 mảng nút đọc từ file trước khi dựng cây: nút cha phải đứng trước con (parents[i] < i, -1 là root),
+    id item nằm trong danh sách item, count dương, không có hai con cùng item dưới một nút cha, và mỗi nút con
+    có id item lớn hơn nút cha (đường đi theo đúng thứ tự hạng của header). Count header được cộng lại từ các nút
+    và phải khớp item_counts trong metadata.
+    """
+    num_items = len(item_counts)
+    child_keys = set()
+    node_item_counts = [0] * num_items
+    for node_index, (parent_index, item_id, count) in enumerate(zip(parents, node_items, node_counts)):
+        if not -1 <= parent_index < node_index:
+            raise ValueError(f"File FP-Tree bị hỏng: nút {node_index} có nút cha {parent_index} không hợp lệ.")
+        if not 0 <= item_id < num_items:
+            raise ValueError(f"File FP-Tree bị hỏng: nút {node_index} có id item {item_id} ngoài {num_items} item.")
+        if count <= 0:
+            raise ValueError(f"File FP-Tree bị hỏng: nút {node_index} có count {count}.")
+        if parent_index >= 0 and item_id <= node_items[parent_index]:
+            raise ValueError(f"File FP-Tree bị hỏng: nút {node_index} có hạng item không lớn hơn nút cha.")
+        child_key = (parent_index, item_id)
+        if child_key in child_keys:
+            raise ValueError(f"File FP-Tree bị hỏng: nút {node_index} trùng item với một nút anh em.")
+        child_keys.add(child_key)
+        node_item_counts[item_id] += count
+    for item_id, (expected_count, node_count) in enumerate(zip(item_counts, node_item_counts)):
+        if expected_count != node_count:
+            raise ValueError(f"File FP-Tree bị hỏng: item {item_id} có count header {expected_count} "
+                             f"nhưng tổng count các nút là {node_count}.")
+
+def save_fp_tree(snapshot, destination, vocabulary=None, source_fingerprint=None, build_parameters=None, metrics=None):
+    """
+    Lưu FP-Tree chính ra file nhị phân gọn:
+    magic | độ dài + metadata (JSON UTF-8: item, count header, tham số xây, fingerprint, bảng mã item)
+          | số nút | 3 mảng theo thứ tự duyệt trước: chỉ số nút cha ('i'), id item ('i'), count ('q').
+    Args:
+        snapshot (FPTreeSnapshot): Cây cần lưu (TreeNode hoặc ArrayTreeNode đều được).
+        destination: Đường dẫn file hoặc file nhị phân đã mở (ví dụ io.BytesIO).
+        vocabulary (ItemVocabulary, optional): Bảng mã nếu cây được xây trên item đã mã hóa.
+        source_fingerprint (str, optional): fingerprint_transactions của dữ liệu nguồn.
+        build_parameters (dict, optional): Tham số khác cần ghi lại (lọc dữ liệu, trọng số...), phải ghi được ra JSON.
+    Raises:
+        ValueError: Nếu item hoặc bảng mã không phải str/int (metadata chỉ lưu dạng JSON).
+    """
+    started = time.perf_counter()
+    item_ids = {item: item_id for item_id, item in enumerate(snapshot.item_order)}
+    parents, node_items, node_counts = array('i'), array('i'), array('q')
+    stack = [(child, -1) for child in reversed(list(snapshot.root.children.values()))]
+    while stack: # Duyệt trước: nút cha luôn được ghi trước các con
+        node, parent_index = stack.pop()
+        node_index = len(parents)
+        parents.append(parent_index)
+        node_items.append(item_ids[node.item_name])
+        node_counts.append(node.count)
+        stack.extend((child, node_index) for child in reversed(list(node.children.values())))
+
+    for item in list(snapshot.item_order) + (list(vocabulary.id_to_item) if vocabulary is not None else []):
+        if not _is_json_item(item):
+            raise ValueError(f"Chỉ lưu được FP-Tree có item kiểu str hoặc int, nhận được: {item!r}")
+    metadata = {
+        "items": list(snapshot.item_order),
+        "item_counts": [snapshot.header_table[item]['count'] for item in snapshot.item_order],
+        "min_support_count": snapshot.min_support_count,
+        "num_transactions": snapshot.num_transactions,
+        "build_parameters": dict(build_parameters or {}),
+        "source_fingerprint": source_fingerprint,
+        "vocabulary": list(vocabulary.id_to_item) if vocabulary is not None else None,
+        "byteorder": sys.byteorder,
+    }
+    metadata_bytes = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+    payload = b"".join([_FP_TREE_FILE_MAGIC, struct.pack("<Q", len(metadata_bytes)), metadata_bytes,
+                        struct.pack("<Q", len(parents)), parents.tobytes(), node_items.tobytes(), node_counts.tobytes()])
+    if hasattr(destination, "write"):
+        destination.write(payload)
+    else:
+        with open(destination, "wb") as tree_file:
+            tree_file.write(payload)
+    if metrics is not None:
+        metrics.record_fp_tree_persistence("save", time.perf_counter() - started, len(payload))
+    return len(payload)
+
+def load_fp_tree(source, tree_representation="object", expected_fingerprint=None, metrics=None):
+    """
+    Nạp cây đã lưu bởi save_fp_tree, dựng lại dạng TreeNode ("object") hoặc ArrayFPTree ("array").
+    Args:
+        expected_fingerprint (str, optional): Nếu có và khác fingerprint trong file thì báo lỗi (cây của dữ liệu khác).
+    Returns:
+        tuple: (FPTreeSnapshot, metadata dict). metadata["vocabulary"] là danh sách id -> item của bảng mã
+            (ItemVocabulary(metadata["vocabulary"]) dựng lại bảng mã) hoặc None nếu cây không mã hóa item.
+    Raises:
+        ValueError: File sai định dạng, bị cắt cụt hoặc hỏng (độ dài, nút cha, id item, thứ tự hạng, count header
+            không khớp các nút...), hay sai fingerprint.
+    """
+    if tree_representation not in FP_TREE_REPRESENTATIONS:
+        raise ValueError(f"tree_representation phải là một trong {FP_TREE_REPRESENTATIONS}, "
+                         f"nhận được: {tree_representation!r}")
+    started = time.perf_counter()
+    if hasattr(source, "read"):
+        payload = source.read()
+    else:
+        with open(source, "rb") as tree_file:
+            payload = tree_file.read()
+    if not payload.startswith(_FP_TREE_FILE_MAGIC):
+        raise ValueError("File không phải FP-Tree đã lưu (sai magic hoặc phiên bản).")
+    offset = len(_FP_TREE_FILE_MAGIC)
+    if len(payload) < offset + 8:
+        raise ValueError("File FP-Tree bị cắt cụt (thiếu độ dài metadata).")
+    (metadata_length,) = struct.unpack_from("<Q", payload, offset)
+    offset += 8
+    if len(payload) < offset + metadata_length + 8:
+        raise ValueError("File FP-Tree bị cắt cụt (thiếu metadata hoặc số nút).")
+    metadata = _decode_tree_metadata(payload[offset:offset + metadata_length])
+    offset += metadata_length
+    if expected_fingerprint is not None and metadata["source_fingerprint"] != expected_fingerprint:
+        raise ValueError("FP-Tree đã lưu được xây từ dữ liệu khác (fingerprint không khớp).")
+    (num_nodes,) = struct.unpack_from("<Q", payload, offset)
+    offset += 8
+    node_bytes = array('i').itemsize * 2 + array('q').itemsize # parent + item + count của mỗi nút
+    if len(payload) != offset + num_nodes * node_bytes:
+        raise ValueError(f"File FP-Tree bị hỏng: {len(payload)} byte, cần đúng {offset + num_nodes * node_bytes} "
+                         f"byte cho {num_nodes} nút.")
+    node_arrays = []
+    for typecode in ("i", "i", "q"):
+        node_array = array(typecode)
+        node_array.frombytes(payload[offset:offset + num_nodes * node_array.itemsize])
+        if metadata["byteorder"] != sys.byteorder:
+            node_array.byteswap()
+        offset += num_nodes * node_array.itemsize
+        node_arrays.append(node_array)
+    parents, node_items, node_counts = node_arrays
+    _validate_tree_nodes(parents, node_items, node_counts, metadata["item_counts"])
+
+    item_order = metadata["items"]
+    item_counts = dict(zip(item_order, metadata["item_counts"]))
+    if tree_representation == "array":
+        array_tree = ArrayFPTree(item_order, root_name='root')
+        array_tree.finalize() # Các nút trong file đã duy nhất theo (cha, item): không cần bảng băm tra con
+        tree_indices = array('i', [0]) * num_nodes # chỉ số trong file -> chỉ số nút của ArrayFPTree
+        for node_index in range(num_nodes):
+            parent_index = parents[node_index]
+            tree_indices[node_index] = array_tree.add_child(0 if parent_index < 0 else tree_indices[parent_index],
+                                                            node_items[node_index], node_counts[node_index])
+        root, header_table = array_tree.root, array_tree.header_table(item_counts)
+    else:
+        root = TreeNode(item_name='root', count=1, parent_node=None)
+        header_table = {item: {'count': item_counts[item], 'node': None, 'tail': None} for item in item_order}
+        tree_nodes = []
+        for node_index in range(num_nodes):
+            parent_index = parents[node_index]
+            parent_node = root if parent_index < 0 else tree_nodes[parent_index]
+            item = item_order[node_items[node_index]]
+            node = TreeNode(item_name=item, count=node_counts[node_index], parent_node=parent_node)
+            parent_node.children[item] = node
+            FPGrowthAlgorithm._append_node_link(header_table[item], node)
+            tree_nodes.append(node)
+
+    snapshot = FPTreeSnapshot(root, header_table, item_order, metadata["min_support_count"],
+                              metadata["num_transactions"], num_nodes + 1)
+    if metrics is not None:
+        metrics.record_fp_tree_persistence("load", time.perf_counter() - started, len(payload))
+    return snapshot, metadata
@@ -0,0 +1,116 @@
+# algorithms/partition_logic.py
+import math
+from algorithms.apriori_logic import AprioriAlgorithm, _count_candidates_with_trie
+from algorithms.fp_growth_logic import FPGrowthAlgorithm
+from algorithms.rule_generation import generate_association_rules
+# PerformanceMetrics sẽ được truyền vào từ main visualizer script
+# from utils.metrics_collector import PerformanceMetrics
+
+LOCAL_ENGINES = {
+    "apriori": AprioriAlgorithm,
+    "fp_growth": FPGrowthAlgorithm,
+}
+
+class PartitionAlgorithm:
+    """
+    Khai phá theo phân vùng (SON / Partition) cho dữ liệu lớn hơn bộ nhớ.
+    Lượt 1: khai phá từng chunk với ngưỡng tỷ lệ tương ứng, hợp các kết quả cục bộ thành ứng viên toàn cục.
+    Lượt 2: quét lại các chunk để đếm support chính xác của ứng viên.
+    Bộ nhớ bị chặn bởi kích thước một chunk (cộng với tập ứng viên), kết quả chính xác sau đúng hai lượt I/O.
+    """
+    def __init__(self, transaction_chunks_source, min_support_ratio, metrics_collector, local_engine="apriori"):
+        """
+        Args:
+            transaction_chunks_source (callable): Hàm không tham số, mỗi lần gọi trả về một iterable
+                các chunk (mỗi chunk là list các giao dịch). Được gọi hai lần (mỗi lượt một lần).
+            min_support_ratio (float): Ngưỡng support tối thiểu dạng tỷ lệ (0, 1].
+            metrics_collector: Đối tượng PerformanceMetrics.
+            local_engine (str): Thuật toán khai phá cục bộ cho lượt 1: "apriori" hoặc "fp_growth".
+        """
+        if local_engine not in LOCAL_ENGINES:
+            raise ValueError(f"local_engine phải là một trong {tuple(LOCAL_ENGINES)}, nhận được: {local_engine!r}")
+        if not 0 < min_support_ratio <= 1:
+            raise ValueError(f"min_support_ratio phải nằm trong (0, 1], nhận được: {min_support_ratio}")
+        self.transaction_chunks_source = transaction_chunks_source
+        self.min_support_ratio = min_support_ratio
+        self.metrics = metrics_collector
+        self.local_engine = local_engine
+        self.num_transactions = 0 # Chỉ biết sau lượt 1
+        self.min_support_count = None # Ngưỡng tuyệt đối toàn cục, tính sau lượt 1
+        self.intermediate_steps_data = []
+
+    def _log_step_data(self, step_name, data_dict, k=None, notes=None):
+        """Ghi lại dữ liệu của một bước."""
+        log_entry = {"step_name": step_name, "data": data_dict}
+        if k is not None:
+            log_entry["k"] = k
+        if notes is not None:
+            log_entry["notes"] = notes
+        self.intermediate_steps_data.append(log_entry)
+
+    def _mine_chunks_locally(self):
+        """Lượt 1: khai phá từng chunk tại ngưỡng cục bộ ceil(ratio * |chunk|), hợp kết quả thành ứng viên toàn cục."""
+        global_candidates = set()
+        engine_class = LOCAL_ENGINES[self.local_engine]
+        for chunk_index, chunk in enumerate(self.transaction_chunks_source()):
+            if not chunk:
+                continue
+            self.metrics.start_step(f"Partition: Lượt 1 - Khai phá cục bộ chunk {chunk_index + 1}")
+            local_min_support_count = max(1, math.ceil(self.min_support_ratio * len(chunk)))
+            # Mỗi chunk dùng một bộ đo riêng để không ghi đè số liệu tổng thể của lần chạy này
+            local_engine = engine_class(chunk, local_min_support_count, type(self.metrics)())
+            local_itemsets, _ = local_engine.run()
+            new_candidates = len(set(local_itemsets) - global_candidates)
+            global_candidates.update(local_itemsets)
+            self.num_transactions += len(chunk)
+
+            self.metrics.record_partition_chunk(chunk_index, len(chunk), local_min_support_count, len(local_itemsets))
+            self.metrics.end_step(additional_info={"chunk_transactions": len(chunk),
+                                                   "local_min_support_count": local_min_support_count,
+                                                   "local_frequent_count": len(local_itemsets),
+                                                   "new_candidates": new_candidates})
+            del local_engine, local_itemsets, chunk # Giải phóng chunk trước khi đọc chunk tiếp theo
+        return global_candidates
+
+    def _count_candidates_exactly(self, global_candidates):
+        """Lượt 2: quét lại từng chunk, đếm support chính xác của mọi ứng viên toàn cục qua prefix trie."""
+        self.metrics.start_step("Partition: Lượt 2 - Đếm support toàn cục")
+        global_counts = dict.fromkeys(global_candidates, 0)
+        for chunk in self.transaction_chunks_source():
+            chunk_counts = _count_candidates_with_trie(global_candidates, [set(t) for t in chunk])
+            for candidate, count in chunk_counts.items():
+                global_counts[candidate] += count
+        self.metrics.end_step(additional_info={"candidate_count": len(global_candidates)})
+        return global_counts
+
+    def run(self):
+        """Chạy khai phá phân vùng hai lượt."""
+        self.metrics.start_overall_measurement()
+        self.intermediate_steps_data = []
+        self.num_transactions = 0
+
+        global_candidates = self._mine_chunks_locally()
+        self.min_support_count = max(1, math.ceil(self.min_support_ratio * self.num_transactions))
+        self._log_step_data("Lượt 1 - Ứng viên toàn cục (hợp các kết quả cục bộ)", list(global_candidates),
+                            notes=f"{len(global_candidates)} ứng viên từ {self.num_transactions} giao dịch, "
+                                  f"ngưỡng toàn cục = {self.min_support_count}")
+        if not global_candidates:
+            self.metrics.end_overall_measurement()
+            return {}, self.intermediate_steps_data
+
+        global_counts = self._count_candidates_exactly(global_candidates)
+        frequent_itemsets = {
+            itemset: count for itemset, count in global_counts.items() if count >= self.min_support_count
+        }
+        self.metrics.partition_false_positives = len(global_candidates) - len(frequent_itemsets)
+        self._log_step_data("Lượt 2 - Tập mục phổ biến toàn cục", frequent_itemsets,
+                            notes=f"Số tập mục phổ biến: {len(frequent_itemsets)}, "
+                                  f"ứng viên bị loại ở lượt 2: {self.metrics.partition_false_positives}")
+
+        self.metrics.end_overall_measurement()
+        return frequent_itemsets, self.intermediate_steps_data
+
+    def generate_association_rules(self, all_frequent_itemsets, min_confidence):
+        """Sinh luật kết hợp (dùng chung rule_generation.generate_association_rules)."""
+        return generate_association_rules(all_frequent_itemsets, self.num_transactions, min_confidence,
+                                          self.metrics, self._log_step_data, algorithm_name="Partition")
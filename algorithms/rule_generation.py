@@ -0,0 +1,75 @@
+# algorithms/rule_generation.py
+from itertools import combinations
+# PerformanceMetrics sẽ được truyền vào từ thuật toán gọi (self.metrics)
+# from utils.metrics_collector import PerformanceMetrics
+
+def generate_association_rules(itemsets, num_transactions, min_confidence, metrics=None, log_fn=None,
+                               algorithm_name="Apriori", subset_supports=None):
+    """
+    Sinh luật kết hợp từ các tập mục phổ biến (dùng chung cho Apriori, FP-Growth, Eclat, Partition, Sampling).
+    Args:
+        itemsets (dict): {frozenset: support_count}, phải chứa support của mọi tập con phổ biến
+            (hoặc các tập còn thiếu nằm trong subset_supports).
+        num_transactions (int): Số giao dịch (tổng trọng số) để tính support tương đối.
+        min_confidence (float): Ngưỡng confidence tối thiểu.
+        metrics (PerformanceMetrics, optional): Đo bước "<algorithm_name>: Sinh Luật Kết Hợp".
+        log_fn (callable, optional): _log_step_data của thuật toán gọi, nhận (tên bước, dữ liệu, notes=...).
+        algorithm_name (str): Tên thuật toán trong tên bước đo/log.
+        subset_supports (dict, optional): {frozenset: support_count} của các tập con không nằm trong itemsets
+            (chỉ dùng để tra support của tiền đề/hậu quả, không sinh luật từ chúng), ví dụ top-k có độ dài tối thiểu.
+    Returns:
+        list: Danh sách các luật, mỗi luật là một dict.
+    """
+    if not itemsets:
+        return []
+
+    if metrics is not None:
+        metrics.start_step(f"{algorithm_name}: Sinh Luật Kết Hợp")
+    rules = []
+    support_lookup = itemsets if not subset_supports else {**subset_supports, **itemsets}
+
+    for itemset, support_itemset_count in itemsets.items():
+        if len(itemset) < 2: # Luật cần ít nhất 2 item
+            continue
+
+        # Sinh tất cả các tập con không rỗng của itemset để làm tiền đề (antecedent)
+        # Chỉ cần duyệt các tập con có độ dài từ 1 đến len(itemset)-1
+        for i in range(1, len(itemset)):
+            for antecedent_tuple in combinations(itemset, i):
+                antecedent = frozenset(antecedent_tuple)
+                consequent = itemset.difference(antecedent)
+
+                support_antecedent_count = support_lookup.get(antecedent)
+                if not support_antecedent_count:
+                    # Không nên xảy ra nếu itemsets (và subset_supports) chứa tất cả các tập con phổ biến
+                    continue
+
+                confidence = support_itemset_count / support_antecedent_count
+                if confidence >= min_confidence:
+                    support_itemset_frac = support_itemset_count / num_transactions
+                    support_antecedent_frac = support_antecedent_count / num_transactions
+                    # Lấy support count của consequent để tính lift (0 nếu không có)
+                    support_consequent_count = support_lookup.get(consequent, 0)
+                    support_consequent_frac = support_consequent_count / num_transactions
+
+                    lift = 0 # Tránh chia cho 0 nếu support của consequent là 0
+                    if support_antecedent_frac > 0 and support_consequent_frac > 0:
+                        lift = support_itemset_frac / (support_antecedent_frac * support_consequent_frac)
+
+                    rules.append({
+                        "antecedent": tuple(sorted(list(antecedent))),
+                        "consequent": tuple(sorted(list(consequent))),
+                        "support": support_itemset_frac,
+                        "confidence": confidence,
+                        "lift": lift,
+                        "itemset_support_count": support_itemset_count,
+                        "antecedent_support_count": support_antecedent_count,
+                        "consequent_support_count": support_consequent_count
+                    })
+
+    if log_fn is not None:
+        log_fn(f"Luật Kết Hợp Đã Sinh ({algorithm_name})", rules,
+               notes=f"Số luật: {len(rules)} với min_confidence={min_confidence:.2f}")
+    if metrics is not None:
+        metrics.end_step(additional_info={"rules_generated": len(rules)})
+    return rules
@@ -0,0 +1,166 @@
+# algorithms/sampling_logic.py
+import math
+import random
+from collections import defaultdict, Counter
+from itertools import combinations
+from algorithms.apriori_logic import AprioriAlgorithm, _count_candidates_with_trie
+from algorithms.fp_growth_logic import FPGrowthAlgorithm
+from algorithms.rule_generation import generate_association_rules
+# PerformanceMetrics sẽ được truyền vào từ main visualizer script
+# from utils.metrics_collector import PerformanceMetrics
+
+SAMPLE_ENGINES = {
+    "apriori": AprioriAlgorithm,
+    "fp_growth": FPGrowthAlgorithm,
+}
+
+def _negative_border(sample_itemsets, all_items):
+    """
+    Tính biên âm (negative border) của tập S các itemset phổ biến trên mẫu:
+    các itemset không thuộc S nhưng mọi tập con trực tiếp (bớt 1 item) đều thuộc S.
+    Gồm các 1-itemset không thuộc S và các k-itemset được join từ S(k-1) theo tiền tố.
+    """
+    border = {frozenset([item]) for item in all_items if frozenset([item]) not in sample_itemsets}
+
+    itemsets_by_size = defaultdict(list)
+    for itemset in sample_itemsets:
+        itemsets_by_size[len(itemset)].append(itemset)
+
+    for size in sorted(itemsets_by_size):
+        last_items_by_prefix = defaultdict(list)
+        for itemset in itemsets_by_size[size]:
+            sorted_items = tuple(sorted(itemset))
+            last_items_by_prefix[sorted_items[:-1]].append(sorted_items[-1])
+        for prefix, last_items in last_items_by_prefix.items():
+            last_items.sort()
+            for i in range(len(last_items)):
+                for j in range(i + 1, len(last_items)):
+                    candidate = frozenset(prefix + (last_items[i], last_items[j]))
+                    if candidate in sample_itemsets:
+                        continue
+                    if all(frozenset(subset) in sample_itemsets for subset in combinations(candidate, size)):
+                        border.add(candidate)
+    return border
+
+class SamplingAlgorithm:
+    """
+    Khai phá chính xác dựa trên lấy mẫu (Toivonen):
+    1. Khai phá một mẫu ngẫu nhiên với ngưỡng support hạ thấp (bằng Apriori hoặc FP-Growth).
+    2. Tính biên âm của kết quả trên mẫu.
+    3. Quét toàn bộ DB một lần để đếm support của (kết quả mẫu + biên âm).
+    Nếu không itemset nào của biên âm là phổ biến thì kết quả là chính xác. Ngược lại (biên âm bị trượt),
+    chạy lại bước kiểm chứng chỉ cho biên âm mới của tập phổ biến đã mở rộng, tới khi không còn trượt.
+    """
+    def __init__(self, transactions, min_support_count, metrics_collector, sample_engine="apriori",
+                 sample_ratio=0.1, support_lowering=0.8, random_seed=None):
+        """
+        Args:
+            sample_engine (str): Thuật toán khai phá mẫu: "apriori" hoặc "fp_growth".
+            sample_ratio (float): Tỷ lệ giao dịch được lấy vào mẫu.
+            support_lowering (float): Hệ số (<= 1) hạ ngưỡng support tương đối khi khai phá mẫu.
+            random_seed (int, optional): Seed cho việc lấy mẫu.
+        """
+        if sample_engine not in SAMPLE_ENGINES:
+            raise ValueError(f"sample_engine phải là một trong {tuple(SAMPLE_ENGINES)}, nhận được: {sample_engine!r}")
+        if not 0 < sample_ratio <= 1:
+            raise ValueError(f"sample_ratio phải nằm trong (0, 1], nhận được: {sample_ratio}")
+        self.transactions_list_of_sets = [set(t) for t in transactions]
+        self.num_transactions = len(transactions)
+        self.min_support_count = min_support_count
+        self.metrics = metrics_collector
+        self.sample_engine = sample_engine
+        self.sample_ratio = sample_ratio
+        self.support_lowering = support_lowering
+        self.random_generator = random.Random(random_seed)
+        self.intermediate_steps_data = []
+
+    def _log_step_data(self, step_name, data_dict, k=None, notes=None):
+        """Ghi lại dữ liệu của một bước."""
+        log_entry = {"step_name": step_name, "data": data_dict}
+        if k is not None:
+            log_entry["k"] = k
+        if notes is not None:
+            log_entry["notes"] = notes
+        self.intermediate_steps_data.append(log_entry)
+
+    def _mine_sample(self):
+        """Lấy mẫu ngẫu nhiên và khai phá mẫu với ngưỡng đã hạ."""
+        self.metrics.start_step("Sampling: Khai phá mẫu")
+        sample_size = max(1, min(self.num_transactions, round(self.sample_ratio * self.num_transactions)))
+        sample = self.random_generator.sample(self.transactions_list_of_sets, sample_size)
+        relative_support = self.min_support_count / self.num_transactions
+        lowered_support_count = max(1, math.floor(self.support_lowering * relative_support * sample_size))
+
+        engine = SAMPLE_ENGINES[self.sample_engine](sample, lowered_support_count, type(self.metrics)())
+        sample_itemsets, _ = engine.run()
+        self.metrics.record_sampling_sample(sample_size, lowered_support_count, len(sample_itemsets))
+        self._log_step_data("Khai phá mẫu", {"sample_size": sample_size,
+                                             "lowered_min_support_count": lowered_support_count,
+                                             "sample_frequent_itemsets": len(sample_itemsets)},
+                            notes=f"Mẫu {sample_size}/{self.num_transactions} giao dịch, ngưỡng hạ = {lowered_support_count}")
+        self.metrics.end_step(additional_info={"sample_size": sample_size,
+                                               "lowered_min_support_count": lowered_support_count,
+                                               "sample_frequent_count": len(sample_itemsets)})
+        return set(sample_itemsets)
+
+    def _count_on_full_database(self, candidates, count_all_items):
+        """Một lần quét toàn bộ DB: đếm các itemset (>= 2 item) qua prefix trie, kèm mọi item đơn nếu cần."""
+        multi_item_candidates = [itemset for itemset in candidates if len(itemset) > 1]
+        full_counts = _count_candidates_with_trie(multi_item_candidates, self.transactions_list_of_sets,
+                                                  min_candidate_length=2)
+        if count_all_items:
+            item_counts = Counter()
+            for transaction in self.transactions_list_of_sets:
+                item_counts.update(transaction)
+            for item, count in item_counts.items():
+                full_counts[frozenset([item])] = count
+        return full_counts
+
+    def run(self):
+        """Chạy khai phá dựa trên lấy mẫu."""
+        self.metrics.start_overall_measurement()
+        self.intermediate_steps_data = []
+        if not self.transactions_list_of_sets:
+            self._log_step_data("Kết thúc sớm", {}, notes="Không có giao dịch nào để lấy mẫu.")
+            self.metrics.end_overall_measurement()
+            return {}, self.intermediate_steps_data
+
+        all_items = set().union(*self.transactions_list_of_sets)
+        sample_itemsets = self._mine_sample()
+
+        counted = {} # {itemset: support toàn DB} của mọi itemset đã được đếm
+        frequent_itemsets = {}
+        to_count = sample_itemsets | _negative_border(sample_itemsets, all_items)
+        scan_index = 0
+        while to_count:
+            scan_index += 1
+            self.metrics.start_step(f"Sampling: Quét toàn bộ DB lần {scan_index} để kiểm chứng")
+            # Lần quét đầu đếm mọi item đơn (1-itemset của biên âm + kết quả mẫu)
+            full_counts = self._count_on_full_database(to_count, count_all_items=(scan_index == 1))
+            for itemset in to_count:
+                counted[itemset] = full_counts.get(itemset, 0)
+            newly_frequent = {itemset for itemset in to_count if counted[itemset] >= self.min_support_count}
+            frequent_itemsets.update((itemset, counted[itemset]) for itemset in newly_frequent)
+
+            border_misses = newly_frequent - sample_itemsets
+            self.metrics.record_sampling_scan(scan_index, len(to_count), len(border_misses))
+            self._log_step_data(f"Kiểm chứng trên toàn DB (lần quét {scan_index})",
+                                {"itemsets_counted": len(to_count),
+                                 "border_misses": [sorted(itemset) for itemset in border_misses]},
+                                notes=f"{len(border_misses)} itemset ngoài kết quả mẫu là phổ biến trên toàn DB")
+            self.metrics.end_step(additional_info={"candidate_count": len(to_count),
+                                                   "border_misses": len(border_misses)})
+            if not border_misses:
+                break
+            # Biên âm bị trượt: chỉ cần đếm thêm biên âm mới của tập phổ biến đã mở rộng
+            to_count = _negative_border(set(frequent_itemsets), all_items) - counted.keys()
+
+        self._log_step_data("Tập mục phổ biến (chính xác)", frequent_itemsets,
+                            notes=f"Số tập mục phổ biến: {len(frequent_itemsets)} sau {scan_index} lần quét toàn DB")
+        self.metrics.end_overall_measurement()
+        return frequent_itemsets, self.intermediate_steps_data
+
+    def generate_association_rules(self, all_frequent_itemsets, min_confidence):
+        """Sinh luật kết hợp (dùng chung rule_generation.generate_association_rules)."""
+        return generate_association_rules(all_frequent_itemsets, self.num_transactions, min_confidence,
+                                          self.metrics, self._log_step_data, algorithm_name="Sampling")
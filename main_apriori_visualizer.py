@@ -1,11 +1,16 @@
 # main_apriori_visualizer.py
 import streamlit as st
 import math
+import os
 import pandas as pd
-from algorithms.apriori_logic import AprioriAlgorithm
-from utils.data_loader import load_transactions_from_file, get_unique_items_from_transactions, parse_text_area_transactions, parse_tx_format_transactions
+from algorithms.apriori_logic import AprioriAlgorithm, COUNTING_BACKENDS
+from algorithms.eclat_logic import EclatAlgorithm
+from algorithms.partition_logic import PartitionAlgorithm, LOCAL_ENGINES
+from algorithms.sampling_logic import SamplingAlgorithm, SAMPLE_ENGINES
+from utils.data_loader import load_transactions_from_file, get_unique_items_from_transactions, parse_text_area_transactions, parse_tx_format_transactions, compress_duplicate_transactions
 from utils.metrics_collector import PerformanceMetrics
-from utils.visualizers import display_itemsets_table, display_rules_table
+from utils.item_encoding import ItemVocabulary
+from utils.visualizers import display_itemsets_table, display_rules_table, display_item_encoding_summary
 
 st.set_page_config(layout="wide", page_title="Apriori Visualizer")
 st.title("📊 Trình Trực Quan Hóa Thuật Toán Apriori")
@@ -91,6 +96,89 @@ min_support_percentage = st.sidebar.slider("Ngưỡng Support Tối Thiểu (%)"
                                            help="Tỷ lệ phần trăm giao dịch tối thiểu mà một itemset phải xuất hiện.")
 min_confidence_percentage = st.sidebar.slider("Ngưỡng Confidence Tối Thiểu (%)", 1.0, 100.0, 50.0, 1.0,
                                      help="Độ tin cậy tối thiểu của một luật kết hợp.")
+MINING_ENGINE_LABELS = {"apriori": "Apriori", "eclat": "Eclat", "partition": "Partition (SON)",
+                        "sampling": "Sampling (Toivonen)"}
+mining_engine = st.sidebar.selectbox(
+    "Thuật toán khai phá",
+    tuple(MINING_ENGINE_LABELS),
+    index=0,
+    format_func=MINING_ENGINE_LABELS.get,
+    help="'Apriori': sinh và đếm ứng viên theo từng mức. 'Eclat': DFS trên TID-set dạng bitset. "
+         "'Partition (SON)': khai phá từng chunk rồi đếm lại ứng viên toàn cục (hai lượt, bộ nhớ chặn theo chunk). "
+         "'Sampling (Toivonen)': khai phá một mẫu với ngưỡng hạ rồi kiểm chứng bằng biên âm trên toàn DB. "
+         "Cả bốn cho cùng kết quả; các tùy chọn hiệu năng của Apriori chỉ dùng với 'Apriori'."
+)
+partition_chunk_size = st.sidebar.number_input(
+    "Số giao dịch mỗi chunk (Partition)",
+    min_value=1, value=5000, step=1000,
+    disabled=(mining_engine != "partition"),
+    help="Chunk càng nhỏ thì bộ nhớ lượt 1 càng thấp nhưng ngưỡng cục bộ càng nhiễu, sinh nhiều ứng viên bị loại ở lượt 2."
+)
+sub_engine_help = "Thuật toán khai phá cục bộ trên từng chunk (Partition) hoặc trên mẫu (Sampling)."
+partition_local_engine = st.sidebar.selectbox(
+    "Thuật toán cục bộ (Partition)", tuple(LOCAL_ENGINES), index=0,
+    disabled=(mining_engine != "partition"), help=sub_engine_help
+)
+sampling_ratio_percentage = st.sidebar.slider(
+    "Tỷ lệ mẫu (%) (Sampling)", 1.0, 100.0, 10.0, 1.0,
+    disabled=(mining_engine != "sampling"),
+    help="Tỷ lệ giao dịch được lấy ngẫu nhiên vào mẫu."
+)
+sampling_support_lowering = st.sidebar.slider(
+    "Hệ số hạ ngưỡng support trên mẫu (Sampling)", 0.1, 1.0, 0.8, 0.05,
+    disabled=(mining_engine != "sampling"),
+    help="Ngưỡng trên mẫu = hệ số × support tương đối × kích thước mẫu. Thấp hơn: ít lần quét bổ sung hơn nhưng mẫu sinh nhiều ứng viên hơn."
+)
+sampling_engine = st.sidebar.selectbox(
+    "Thuật toán khai phá mẫu (Sampling)", tuple(SAMPLE_ENGINES), index=0,
+    disabled=(mining_engine != "sampling"), help=sub_engine_help
+)
+
+st.sidebar.markdown("---")
+st.sidebar.subheader("Tùy Chọn Hiệu Năng")
+apriori_only = (mining_engine != "apriori")
+counting_backend = st.sidebar.selectbox(
+    "Backend đếm support",
+    COUNTING_BACKENDS,
+    index=0,
+    disabled=apriori_only,
+    help="'python': đếm bằng prefix trie (bản tham chiếu). 'numpy': mã hóa one-hot một lần và đếm bằng phép AND theo cột (cần numpy)."
+)
+use_transaction_reduction = st.sidebar.checkbox(
+    "Rút gọn DB giữa các mức (AprioriTid)",
+    value=False,
+    disabled=apriori_only,
+    help="Sau mỗi Lk, bỏ các item không thuộc k-itemset phổ biến nào và các giao dịch không thể chứa ứng viên (k+1)."
+)
+apriori_n_jobs = st.sidebar.number_input(
+    "Số tiến trình đếm support",
+    min_value=1, max_value=os.cpu_count() or 1, value=1, step=1,
+    disabled=apriori_only,
+    help="Lớn hơn 1: chia DB thành các shard và đếm song song trên nhiều lõi CPU (ProcessPoolExecutor)."
+)
+dhp_buckets = st.sidebar.number_input(
+    "Số bucket DHP cho C2 (0 = tắt)",
+    min_value=0, value=0, step=10000,
+    disabled=apriori_only,
+    help="Khi đếm L1, băm mọi cặp item vào các bucket; ứng viên C2 có bucket chưa đạt min_support bị loại trước khi quét."
+)
+use_triangular_l2 = st.sidebar.checkbox(
+    "Đếm L2 bằng mảng tam giác",
+    value=False,
+    disabled=apriori_only,
+    help="Đếm trực tiếp mọi cặp item phổ biến trong một mảng phẳng, không tạo ứng viên C2 (bỏ qua DHP)."
+)
+use_item_encoding = st.sidebar.checkbox(
+    "Mã hóa item thành số nguyên",
+    value=False,
+    help="Ánh xạ mỗi item sang một id số nguyên (xếp theo tần suất) trước khi chạy; kết quả được giải mã ở bước cuối."
+)
+use_duplicate_compression = st.sidebar.checkbox(
+    "Gộp giao dịch trùng lặp",
+    value=False,
+    disabled=apriori_only,
+    help="Gộp các giỏ hàng giống hệt nhau thành một giao dịch có trọng số (số lần lặp), mỗi giỏ chỉ được quét một lần."
+)
 
 # --- Main Area ---
 transactions = None
@@ -157,8 +245,8 @@ if transactions is not None:
         min_confidence_threshold = min_confidence_percentage / 100.0
         st.sidebar.write(f"**Ngưỡng Confidence:** `{min_confidence_threshold:.2f}`")
 
-        # Hiển thị nút Chạy Thuật Toán Apriori
-        run_apriori_button = st.sidebar.button("🚀 Chạy Thuật Toán Apriori", type="primary", use_container_width=True)
+        # Hiển thị nút Chạy Thuật Toán (theo thuật toán khai phá đã chọn)
+        run_apriori_button = st.sidebar.button(f"🚀 Chạy Thuật Toán {MINING_ENGINE_LABELS[mining_engine]}", type="primary", use_container_width=True)
         
         # Thêm một khoảng trống nhỏ phía trên nút Reset
         st.sidebar.markdown("<div style='margin-top: 8px;'></div>", unsafe_allow_html=True)
@@ -182,25 +270,67 @@ if transactions is not None:
                 st.session_state.apriori_intermediate_steps = []
                 st.session_state.apriori_rules = []
                 st.session_state.apriori_metrics = None
+                st.session_state.apriori_vocabulary = None
 
                 metrics_collector = PerformanceMetrics()
-                apriori_algo = AprioriAlgorithm(transactions, min_support_count, metrics_collector)
+                vocabulary = None
+                algo_transactions = transactions
+                if use_item_encoding:
+                    vocabulary = ItemVocabulary.from_transactions(transactions)
+                    algo_transactions = vocabulary.encode_transactions(transactions, metrics_collector)
+                if mining_engine == "eclat":
+                    apriori_algo = EclatAlgorithm(algo_transactions, min_support_count, metrics_collector)
+                elif mining_engine == "partition":
+                    # Dữ liệu đã nằm trong bộ nhớ: chia list thành các chunk liên tiếp cho hai lượt SON.
+                    # Cùng biểu thức ngưỡng với min_support_count để ngưỡng toàn cục khớp với các thuật toán khác.
+                    chunk_size = int(partition_chunk_size)
+                    apriori_algo = PartitionAlgorithm(
+                        lambda: (algo_transactions[start:start + chunk_size]
+                                 for start in range(0, len(algo_transactions), chunk_size)),
+                        min_support_percentage / 100.0, metrics_collector, local_engine=partition_local_engine)
+                elif mining_engine == "sampling":
+                    apriori_algo = SamplingAlgorithm(algo_transactions, min_support_count, metrics_collector,
+                                                     sample_engine=sampling_engine,
+                                                     sample_ratio=sampling_ratio_percentage / 100.0,
+                                                     support_lowering=sampling_support_lowering)
+                else:
+                    # Giao dịch có trọng số chỉ được AprioriAlgorithm hỗ trợ
+                    transaction_weights = None
+                    if use_duplicate_compression:
+                        compressed = compress_duplicate_transactions(algo_transactions, metrics_collector)
+                        algo_transactions = [items for items, _ in compressed]
+                        transaction_weights = [multiplicity for _, multiplicity in compressed]
+                    apriori_algo = AprioriAlgorithm(algo_transactions, min_support_count, metrics_collector,
+                                                    counting_backend=counting_backend,
+                                                    transaction_reduction=use_transaction_reduction,
+                                                    n_jobs=int(apriori_n_jobs),
+                                                    dhp_buckets=int(dhp_buckets),
+                                                    triangular_l2=use_triangular_l2,
+                                                    transaction_weights=transaction_weights)
+                engine_label = MINING_ENGINE_LABELS[mining_engine]
                 
-                with st.spinner("⏳ Đang chạy thuật toán Apriori... Vui lòng chờ."):
+                with st.spinner(f"⏳ Đang chạy thuật toán {engine_label}... Vui lòng chờ."):
                     frequent_itemsets, intermediate_steps = apriori_algo.run()
-                    
-                    st.session_state.apriori_frequent_itemsets = frequent_itemsets
-                    st.session_state.apriori_intermediate_steps = intermediate_steps
-                    st.session_state.apriori_metrics = metrics_collector 
 
                     if frequent_itemsets:
                         rules = apriori_algo.generate_association_rules(frequent_itemsets, min_confidence_threshold)
-                        st.session_state.apriori_rules = rules
                     else:
-                        st.session_state.apriori_rules = []
+                        rules = []
+
+                    # Chỉ giải mã kết quả cuối; các bước trung gian giữ nguyên id
+                    if vocabulary is not None:
+                        frequent_itemsets = vocabulary.decode_itemsets(frequent_itemsets, metrics_collector)
+                        rules = vocabulary.decode_rules(rules, metrics_collector)
+
+                    st.session_state.apriori_frequent_itemsets = frequent_itemsets
+                    st.session_state.apriori_intermediate_steps = intermediate_steps
+                    st.session_state.apriori_rules = rules
+                    st.session_state.apriori_metrics = metrics_collector
+                    st.session_state.apriori_vocabulary = vocabulary
+                    st.session_state.apriori_engine = mining_engine
                 
                 st.session_state.apriori_run_completed = True
-                st.success("✅ Thuật toán Apriori đã chạy xong!")
+                st.success(f"✅ Thuật toán {engine_label} đã chạy xong!")
 
         # --- Hiển thị kết quả ---
         if st.session_state.get("apriori_run_completed", False):
@@ -223,18 +353,69 @@ if transactions is not None:
                     col_mem2.metric(label="Bộ Nhớ Cuối Cùng", value=f"{overall_summary['final_memory_MB']} MB")
                     col_mem3.metric(label="Bộ Nhớ Đỉnh (ước tính)", value=f"{overall_summary['peak_memory_usage_MB']} MB")
 
-                    st.subheader("Số liệu chi tiết của Apriori:")
-                    apriori_specific_metrics = metrics.get_apriori_metrics_summary()
-                    st.write(f"- Tổng số ứng viên đã tạo: `{apriori_specific_metrics['total_candidates_generated']}`")
-                    st.write(f"- Tổng số tập mục phổ biến đã tìm thấy: `{apriori_specific_metrics['total_frequent_itemsets_found']}`")
+                    run_engine = st.session_state.get("apriori_engine", "apriori")
+                    if run_engine == "eclat":
+                        st.subheader("Số liệu chi tiết của Eclat:")
+                        eclat_metrics = metrics.get_eclat_metrics_summary()
+                        st.write(f"- Tổng số tập mục phổ biến đã tìm thấy: `{eclat_metrics['total_frequent_itemsets_found']}`")
+                        st.write(f"- Số phép giao TID-set: `{eclat_metrics['tidset_intersections']}`")
+                        st.write(f"- Độ sâu DFS lớn nhất: `{eclat_metrics['max_depth']}`")
+                        if eclat_metrics['frequent_itemsets_per_k']:
+                            st.write("Chi tiết tập mục phổ biến theo k:")
+                            st.json(eclat_metrics['frequent_itemsets_per_k'])
+                    elif run_engine == "partition":
+                        st.subheader("Số liệu chi tiết của Partition (SON):")
+                        partition_metrics = metrics.get_partition_metrics_summary()
+                        st.write(f"- Số chunk: `{partition_metrics['chunks']}` "
+                                 f"(chunk lớn nhất: `{partition_metrics['max_chunk_transactions']}` giao dịch)")
+                        st.write(f"- Ứng viên toàn cục bị loại ở lượt 2: `{partition_metrics['candidates_rejected_in_pass_2']}`")
+                        if partition_metrics['chunk_stats']:
+                            st.write("Số liệu lượt 1 của từng chunk:")
+                            st.dataframe(pd.DataFrame(partition_metrics['chunk_stats']), hide_index=True)
+                    elif run_engine == "sampling":
+                        st.subheader("Số liệu chi tiết của Sampling (Toivonen):")
+                        sampling_metrics = metrics.get_sampling_metrics_summary()
+                        st.write(f"- Kích thước mẫu: `{sampling_metrics['sample_size']}` giao dịch, "
+                                 f"ngưỡng hạ trên mẫu: `{sampling_metrics['lowered_min_support_count']}`")
+                        st.write(f"- Số lần quét toàn DB: `{sampling_metrics['full_database_scans']}` "
+                                 f"(itemset trượt biên âm: `{sampling_metrics['total_border_misses']}`)")
+                        if sampling_metrics['scan_stats']:
+                            st.write("Số liệu từng lần quét kiểm chứng:")
+                            st.dataframe(pd.DataFrame(sampling_metrics['scan_stats']), hide_index=True)
+
+                    if run_engine == "apriori":
+                        apriori_specific_metrics = metrics.get_apriori_metrics_summary()
+                        st.subheader("Số liệu chi tiết của Apriori:")
+                        st.write(f"- Tổng số ứng viên đã tạo: `{apriori_specific_metrics['total_candidates_generated']}`")
+                        st.write(f"- Tổng số tập mục phổ biến đã tìm thấy: `{apriori_specific_metrics['total_frequent_itemsets_found']}`")
                     
-                    if apriori_specific_metrics['candidates_per_k']:
-                         st.write("Chi tiết ứng viên theo k:")
-                         st.json(apriori_specific_metrics['candidates_per_k'])
-                    if apriori_specific_metrics['frequent_itemsets_per_k']:
-                         st.write("Chi tiết tập mục phổ biến theo k:")
-                         st.json(apriori_specific_metrics['frequent_itemsets_per_k'])
+                        if apriori_specific_metrics['candidates_per_k']:
+                             st.write("Chi tiết ứng viên theo k:")
+                             st.json(apriori_specific_metrics['candidates_per_k'])
+                        if apriori_specific_metrics['frequent_itemsets_per_k']:
+                             st.write("Chi tiết tập mục phổ biến theo k:")
+                             st.json(apriori_specific_metrics['frequent_itemsets_per_k'])
+                        if apriori_specific_metrics['db_size_per_k']:
+                             st.write("Số giao dịch còn lại khi quét mức k (rút gọn DB):")
+                             st.json(apriori_specific_metrics['db_size_per_k'])
+                        if apriori_specific_metrics['hash_pruned_per_k']:
+                             st.write("Số ứng viên bị loại bởi bucket DHP (và tỷ lệ loại) theo k:")
+                             st.json({k: f"{pruned} ({apriori_specific_metrics['hash_pruning_ratio_per_k'][k]:.1%})"
+                                      for k, pruned in apriori_specific_metrics['hash_pruned_per_k'].items()})
+                        if apriori_specific_metrics['worker_timings']:
+                             st.write("Thời gian đếm của từng worker (chế độ song song):")
+                             st.dataframe(pd.DataFrame(apriori_specific_metrics['worker_timings']), hide_index=True)
+
+                    compression_summary = metrics.get_transaction_compression_summary()
+                    if compression_summary:
+                        st.write(f"- Gộp giao dịch trùng lặp: `{compression_summary['original_transactions']}` → "
+                                 f"`{compression_summary['unique_transactions']}` giao dịch "
+                                 f"(tỷ lệ trùng `{compression_summary['duplication_rate']:.1%}`, "
+                                 f"`{compression_summary['compress_seconds']:.4f}` giây)")
 
+                    encoding_summary = metrics.get_item_encoding_summary()
+                    if encoding_summary:
+                        display_item_encoding_summary(st, encoding_summary, st.session_state.get("apriori_vocabulary"))
 
                     st.subheader("Thời Gian và Bộ Nhớ Từng Bước Chính:")
                     step_metrics_df = pd.DataFrame(metrics.get_step_metrics_table())
@@ -243,18 +424,29 @@ if transactions is not None:
                         step_metrics_df['memory_before_MB'] = step_metrics_df['memory_before_MB'].apply(lambda x: f"{x:.2f}")
                         step_metrics_df['memory_after_MB'] = step_metrics_df['memory_after_MB'].apply(lambda x: f"{x:.2f}")
                         step_metrics_df['memory_change_MB'] = step_metrics_df['memory_change_MB'].apply(lambda x: f"{x:+.2f}")
-                        st.dataframe(step_metrics_df[[
-                            "step_name", "duration_seconds", 
-                            "memory_before_MB", "memory_after_MB", "memory_change_MB",
-                            "candidate_count", "frequent_count" 
-                        ]], hide_index=True)
+                        step_columns = [
+                            "step_name", "duration_seconds",
+                            "memory_before_MB", "memory_after_MB", "memory_change_MB"
+                        ]
+                        # Các cột phụ chỉ có ở một số bước (ví dụ: bước Join) hoặc một số thuật toán
+                        optional_step_columns = ["candidate_count", "frequent_count",
+                                                 "candidates_after_join", "pairs_joined", "pruned_by_hash",
+                                                 "transactions_remaining", "items_remaining",
+                                                 "tidset_intersections",
+                                                 "chunk_transactions", "local_min_support_count",
+                                                 "local_frequent_count", "new_candidates",
+                                                 "sample_size", "lowered_min_support_count",
+                                                 "sample_frequent_count", "border_misses",
+                                                 "rules_generated"]
+                        step_columns += [col for col in optional_step_columns if col in step_metrics_df.columns]
+                        st.dataframe(step_metrics_df[step_columns], hide_index=True)
                     else:
                         st.info("Không có dữ liệu chi tiết từng bước.")
                 else:
                     st.warning("Không có số liệu hiệu năng để hiển thị.")
 
             with tab2:
-                st.header("Các Bước Trung Gian của Thuật Toán Apriori")
+                st.header(f"Các Bước Trung Gian của Thuật Toán {MINING_ENGINE_LABELS[st.session_state.get('apriori_engine', 'apriori')]}")
                 intermediate_steps = st.session_state.get("apriori_intermediate_steps", [])
                 if not intermediate_steps:
                     st.info("Không có bước trung gian nào được ghi lại hoặc thuật toán chưa chạy.")
@@ -268,7 +460,7 @@ if transactions is not None:
                                 st.caption(f"Ghi chú: {step_log['notes']}")
                             
                             data_content = step_log['data']
-                            if isinstance(data_content, dict): 
+                            if isinstance(data_content, dict) and all(isinstance(key, frozenset) for key in data_content): 
                                 display_itemsets_table(st, "Dữ liệu bước:", data_content, k=step_log.get('k'))
                             elif isinstance(data_content, list) and data_content and isinstance(data_content[0], frozenset): 
                                 display_itemsets_table(st, "Dữ liệu bước (ứng viên):", data_content, k=step_log.get('k'))
@@ -1,11 +1,15 @@
 # main_fp_growth_visualizer.py
 import streamlit as st
+import io
 import math
+import os
+import time
 import pandas as pd
-from algorithms.fp_growth_logic import FPGrowthAlgorithm, TreeNode
-from utils.data_loader import load_transactions_from_file, get_unique_items_from_transactions, parse_text_area_transactions, parse_tx_format_transactions
+from algorithms.fp_growth_logic import FPGrowthAlgorithm, TreeNode, FP_TREE_REPRESENTATIONS, FP_MINING_STRATEGIES, FP_MINING_MODES, save_fp_tree, load_fp_tree, fingerprint_transactions
+from utils.data_loader import load_transactions_from_file, get_unique_items_from_transactions, parse_text_area_transactions, parse_tx_format_transactions, compress_duplicate_transactions
 from utils.metrics_collector import PerformanceMetrics
-from utils.visualizers import display_itemsets_table, display_rules_table, visualize_fp_tree_interactive
+from utils.item_encoding import ItemVocabulary
+from utils.visualizers import display_itemsets_table, display_rules_table, visualize_fp_tree_interactive, display_item_encoding_summary
 
 st.set_page_config(layout="wide", page_title="FP-Growth Visualizer")
 st.title("🌳 Trình Trực Quan Hóa Thuật Toán FP-Growth")
@@ -92,9 +96,123 @@ st.sidebar.markdown("---")
 st.sidebar.subheader("Tham Số Thuật Toán")
 min_support_percentage = st.sidebar.slider("Ngưỡng Support Tối Thiểu (%)", 0.1, 50.0, 5.0, 0.1,
                                            help="Tỷ lệ phần trăm giao dịch tối thiểu mà một itemset phải xuất hiện.")
+mining_mode = st.sidebar.selectbox(
+    "Loại tập mục cần khai phá",
+    FP_MINING_MODES,
+    index=0,
+    help="'all': mọi tập mục phổ biến. 'closed': chỉ tập mục đóng (không có tập cha cùng support), ít hơn nhiều ở ngưỡng thấp; luật vẫn được sinh đầy đủ. "
+         "'maximal': chỉ tập mục tối đại (không có tập cha phổ biến), nhanh nhất nhưng không sinh luật. "
+         "'top_k': k tập mục có support cao nhất, không cần chọn ngưỡng support."
+)
+top_k = st.sidebar.number_input(
+    "Số tập mục cần lấy (k)",
+    min_value=1, value=100, step=10,
+    disabled=(mining_mode != "top_k"),
+    help="Chỉ dùng với 'top_k'. Ngưỡng support được nâng dần trong lúc khai phá; các tập hòa support với tập thứ k cũng được giữ. "
+         "Thanh trượt Ngưỡng Support bị bỏ qua ở chế độ này."
+)
+min_itemset_length = st.sidebar.number_input(
+    "Số item tối thiểu của tập mục",
+    min_value=1, value=1, step=1,
+    disabled=(mining_mode != "top_k"),
+    help="Chỉ dùng với 'top_k': chỉ xếp hạng các tập mục có ít nhất chừng này item (ví dụ 2 để bỏ qua các item đơn lẻ). "
+         "Luật vẫn có đủ support của tiền đề/hậu quả ngắn hơn."
+)
 min_confidence_percentage = st.sidebar.slider("Ngưỡng Confidence Tối Thiểu (%)", 1.0, 100.0, 50.0, 1.0,
                                      help="Độ tin cậy tối thiểu của một luật kết hợp.")
 
+st.sidebar.markdown("---")
+st.sidebar.subheader("Tùy Chọn Hiệu Năng")
+tree_representation = st.sidebar.selectbox(
+    "Cách lưu FP-Tree",
+    FP_TREE_REPRESENTATIONS,
+    index=0,
+    help="'object': mỗi nút là một đối tượng TreeNode. 'array': các mảng song song (parent, item, count, node-link), ít bộ nhớ hơn cho cây lớn."
+)
+mining_strategy = st.sidebar.selectbox(
+    "Cách khai phá FP-Tree",
+    FP_MINING_STRATEGIES,
+    index=0,
+    help="'recursive': đệ quy theo từng Conditional FP-Tree. 'iterative': ngăn xếp tường minh, cùng kết quả, không bị giới hạn độ sâu đệ quy."
+)
+max_alive_trees = st.sidebar.number_input(
+    "Số Conditional FP-Tree tối đa giữ cùng lúc (0 = không giới hạn)",
+    min_value=0, value=0, step=1,
+    disabled=(mining_strategy != "iterative"),
+    help="Chỉ dùng với 'iterative'. Khi vượt ngưỡng, cây cũ nhất bị bỏ; CPB của các item còn lại của nó được dựng lại từ khung cha khi cần (chậm hơn, ít bộ nhớ hơn)."
+)
+fp_n_jobs = st.sidebar.number_input(
+    "Số tiến trình khai phá",
+    min_value=1, max_value=os.cpu_count() or 1, value=1, step=1,
+    disabled=(mining_mode != "all"),
+    help="Lớn hơn 1: Conditional Pattern Base của từng item được chia nhóm theo kích thước và khai phá song song trên nhiều lõi CPU (chỉ với 'all')."
+)
+out_of_core = st.sidebar.checkbox(
+    "Khai phá ngoài bộ nhớ (projected DB trên đĩa)",
+    value=False,
+    disabled=(mining_mode != "all"),
+    help="Không xây FP-Tree chính: giao dịch được chia vào các file tạm (mỗi item một file) và khai phá lần lượt, "
+         "phần bộ nhớ dành cho khai phá chỉ phụ thuộc projected DB lớn nhất (dữ liệu đã nạp vẫn nằm trong bộ nhớ). "
+         "Chỉ với 'all' và 1 tiến trình."
+)
+# FPGrowthAlgorithm chỉ nhận n_jobs > 1 và out_of_core với 'all', và không nhận cả hai cùng lúc. Widget bị vô hiệu hóa
+# vẫn giữ lựa chọn cũ, nên tổ hợp không hợp lệ được quy về khai phá tuần tự (kèm cảnh báo) thay vì lỗi lúc chạy.
+fp_n_jobs = int(fp_n_jobs)
+if mining_mode != "all" and (fp_n_jobs > 1 or out_of_core):
+    st.sidebar.warning(f"Chế độ '{mining_mode}' chỉ khai phá tuần tự trong bộ nhớ: "
+                       "bỏ qua số tiến trình và khai phá ngoài bộ nhớ.")
+    fp_n_jobs, out_of_core = 1, False
+elif out_of_core and fp_n_jobs > 1:
+    st.sidebar.warning("Khai phá ngoài bộ nhớ xử lý từng projected DB lần lượt: chạy với 1 tiến trình.")
+    fp_n_jobs = 1
+if mining_mode != "all" and mining_strategy == "iterative":
+    st.sidebar.warning(f"Chế độ '{mining_mode}' chỉ có bản khai phá đệ quy: bỏ qua 'iterative' và số cây giữ cùng lúc.")
+    mining_strategy, max_alive_trees = "recursive", 0
+use_fp_array = st.sidebar.checkbox(
+    "Dùng FP-array khi xây cây",
+    value=False,
+    help="Đếm số lần đồng xuất hiện của các cặp item ngay khi xây mỗi cây thưa, nhờ đó header của Conditional FP-Tree "
+         "kế tiếp có sẵn mà không phải duyệt node-link (tốn thêm bộ nhớ; cây dày tự bỏ qua)."
+)
+log_intermediate_steps = st.sidebar.checkbox(
+    "Ghi lại các bước trung gian",
+    value=True,
+    help="Tắt để không giữ các cây có điều kiện và CPB trong bộ nhớ (tab Bước Trung Gian sẽ trống)."
+)
+use_item_encoding = st.sidebar.checkbox(
+    "Mã hóa item thành số nguyên",
+    value=False,
+    help="Ánh xạ mỗi item sang một id số nguyên (xếp theo tần suất) trước khi chạy; kết quả được giải mã ở bước cuối."
+)
+use_duplicate_compression = st.sidebar.checkbox(
+    "Gộp giao dịch trùng lặp",
+    value=False,
+    help="Gộp các giỏ hàng giống hệt nhau thành một giao dịch có trọng số (số lần lặp), mỗi giỏ chỉ được quét một lần."
+)
+keep_tree_for_download = st.sidebar.checkbox(
+    "Cho phép tải FP-Tree chính về máy",
+    value=False,
+    help="Sau khi chạy, FP-Tree chính được lưu thành file nhị phân gọn (.fptree) để nạp lại lần sau mà không cần xây lại cây."
+)
+saved_tree_file = st.sidebar.file_uploader(
+    "Nạp FP-Tree đã lưu (.fptree)",
+    type=["fptree"],
+    help="Cây phải được xây từ cùng dữ liệu (kiểm tra bằng fingerprint) ở ngưỡng support không cao hơn ngưỡng hiện tại; "
+         "khi đó bỏ qua bước quét dữ liệu và xây cây, chỉ khai phá lại."
+)
+reuse_built_tree = st.sidebar.checkbox(
+    "Xây FP-Tree một lần, khai phá lại khi đổi ngưỡng",
+    value=False,
+    help="Cây chính được xây một lần ở ngưỡng support bên dưới và giữ lại trong phiên; khi kéo thanh trượt Ngưỡng Support "
+         "(không thấp hơn ngưỡng xây cây), kết quả được khai phá lại ngay trên cây đó, không quét lại dữ liệu."
+)
+tree_build_support_percentage = st.sidebar.number_input(
+    "Ngưỡng support khi xây cây (%)",
+    min_value=0.01, max_value=50.0, value=1.0, step=0.1,
+    disabled=not reuse_built_tree,
+    help="Nên đặt bằng ngưỡng thấp nhất bạn định thử: ngưỡng thấp hơn cho cây lớn hơn nhưng dùng được cho nhiều ngưỡng khai phá hơn."
+)
+
 st.sidebar.markdown("---")
 st.sidebar.subheader("Tùy Chọn Trực Quan Hóa Cây")
 MAX_NODES_FOR_GRAPHICAL_VIEW = st.sidebar.number_input(
@@ -102,6 +220,9 @@ MAX_NODES_FOR_GRAPHICAL_VIEW = st.sidebar.number_input(
     min_value=10, value=100, step=10, 
     help="Nếu cây (chính hoặc điều kiện) có nhiều hơn số nút này, chỉ Header Table sẽ được hiển thị cùng thông báo."
 )
+MINING_MODE_LABELS = {"all": "tập mục phổ biến", "closed": "tập mục đóng", "maximal": "tập mục tối đại",
+                      "top_k": "tập mục có support cao nhất"}
+
 # --- Main Area ---
 transactions = None
 initial_trans_count = 0
@@ -157,7 +278,11 @@ if transactions is not None:
         """)
 
         min_support_count = 0
-        if num_total_transactions > 0:
+        tree_build_support_count = max(1, math.ceil((tree_build_support_percentage / 100.0) * num_total_transactions))
+        if mining_mode == "top_k" and num_total_transactions > 0:
+            # Ngưỡng sàn; ngưỡng thực do thuật toán tự nâng (khi dùng lại cây, sàn là ngưỡng xây cây)
+            min_support_count = tree_build_support_count if reuse_built_tree else 1
+        elif num_total_transactions > 0:
             min_support_count = math.ceil((min_support_percentage / 100.0) * num_total_transactions)
         
         actual_min_support_percentage = (min_support_count / num_total_transactions) * 100 if num_total_transactions > 0 else 0
@@ -183,7 +308,16 @@ if transactions is not None:
                 del st.session_state[key]
             st.rerun()
 
-        if run_fpgrowth_button:
+        # Đã có cây dựng sẵn trong phiên: đổi ngưỡng support là đủ để khai phá lại, không cần bấm chạy
+        if not reuse_built_tree:
+            st.session_state.pop("fpgrowth_cached_tree", None) # Không giữ cây trong phiên khi tắt tùy chọn
+        cached_tree = st.session_state.get("fpgrowth_cached_tree")
+        auto_remine = (reuse_built_tree and cached_tree is not None
+                       and st.session_state.get("fpgrowth_run_completed", False)
+                       and st.session_state.get("fpgrowth_mined_support") != min_support_count
+                       and min_support_count >= cached_tree["build_support_count"])
+
+        if run_fpgrowth_button or auto_remine:
             if num_total_transactions == 0 and not transactions : 
                 st.error("Không có giao dịch nào để xử lý. Vui lòng kiểm tra lại dữ liệu đầu vào.")
             elif min_support_count == 0 and num_total_transactions > 0 : 
@@ -194,22 +328,115 @@ if transactions is not None:
                 st.session_state.fpgrowth_intermediate_steps = []
                 st.session_state.fpgrowth_rules = []
                 st.session_state.fpgrowth_metrics = None
+                st.session_state.fpgrowth_vocabulary = None
+                st.session_state.fpgrowth_tree_file = None
+                st.session_state.fpgrowth_tree_source = None
 
                 metrics_collector = PerformanceMetrics()
-                fpgrowth_algo = FPGrowthAlgorithm(transactions, min_support_count, metrics_collector)
+                source_fingerprint = None
+                tree_snapshot = None # Cây chính có sẵn (nạp từ file hoặc giữ trong phiên) thì chỉ cần khai phá lại
+                tree_source = None # "file" | "cache" | "built"
+                vocabulary = None
+                if saved_tree_file is not None or keep_tree_for_download or reuse_built_tree:
+                    source_fingerprint = fingerprint_transactions(transactions)
+                if saved_tree_file is not None:
+                    try:
+                        tree_snapshot, saved_tree_metadata = load_fp_tree(
+                            io.BytesIO(saved_tree_file.getvalue()), tree_representation,
+                            expected_fingerprint=source_fingerprint, metrics=metrics_collector)
+                        if min_support_count < tree_snapshot.min_support_count:
+                            raise ValueError(f"cây được xây ở ngưỡng {tree_snapshot.min_support_count}, "
+                                             f"cao hơn ngưỡng hiện tại {min_support_count}")
+                        tree_source = "file"
+                        if saved_tree_metadata["vocabulary"] is not None:
+                            vocabulary = ItemVocabulary(saved_tree_metadata["vocabulary"])
+                    except ValueError as e:
+                        tree_snapshot = None
+                        st.warning(f"Không dùng được FP-Tree đã nạp ({e}); cây sẽ được xây lại từ dữ liệu.")
+
+                tree_cache_key = (source_fingerprint, tree_build_support_count, tree_representation,
+                                  use_item_encoding, use_duplicate_compression, use_fp_array)
+                use_tree_cache = reuse_built_tree and tree_snapshot is None
+                if use_tree_cache and min_support_count < tree_build_support_count:
+                    st.info(f"Ngưỡng hiện tại ({min_support_count}) thấp hơn ngưỡng xây cây ({tree_build_support_count}): "
+                            "chạy đầy đủ, không dùng cây đã xây.")
+                    use_tree_cache = False
+                if use_tree_cache and cached_tree is not None and cached_tree["key"] == tree_cache_key:
+                    tree_snapshot, vocabulary, tree_source = cached_tree["snapshot"], cached_tree["vocabulary"], "cache"
+
+                algo_transactions = transactions
+                transaction_weights = None
+                if tree_snapshot is None:
+                    if use_item_encoding:
+                        vocabulary = ItemVocabulary.from_transactions(transactions)
+                        algo_transactions = vocabulary.encode_transactions(transactions, metrics_collector)
+                    if use_duplicate_compression:
+                        compressed = compress_duplicate_transactions(algo_transactions, metrics_collector)
+                        algo_transactions = [items for items, _ in compressed]
+                        transaction_weights = [multiplicity for _, multiplicity in compressed]
+                    if use_tree_cache:
+                        with st.spinner("⏳ Đang xây FP-Tree chính (một lần cho các ngưỡng)..."):
+                            build_started = time.perf_counter()
+                            tree_snapshot = FPGrowthAlgorithm(algo_transactions, tree_build_support_count, PerformanceMetrics(),
+                                                              transaction_weights=transaction_weights,
+                                                              tree_representation=tree_representation,
+                                                              log_intermediate_steps=False,
+                                                              use_fp_array=use_fp_array).build_tree_snapshot()
+                        if tree_snapshot is not None:
+                            tree_source = "built"
+                            st.session_state.fpgrowth_cached_tree = {
+                                "key": tree_cache_key, "snapshot": tree_snapshot, "vocabulary": vocabulary,
+                                "build_support_count": tree_build_support_count,
+                                "build_seconds": time.perf_counter() - build_started,
+                            }
+                if out_of_core and tree_snapshot is not None:
+                    st.info("Đã có FP-Tree chính: khai phá lại trên cây đó, không khai phá ngoài bộ nhớ.")
+                fpgrowth_algo = FPGrowthAlgorithm(algo_transactions, min_support_count, metrics_collector,
+                                                  transaction_weights=transaction_weights,
+                                                  tree_representation=tree_representation,
+                                                  mining_strategy=mining_strategy,
+                                                  max_alive_trees=int(max_alive_trees) or None,
+                                                  log_intermediate_steps=log_intermediate_steps,
+                                                  n_jobs=fp_n_jobs,
+                                                  mining_mode=mining_mode,
+                                                  top_k=int(top_k), min_itemset_length=int(min_itemset_length),
+                                                  use_fp_array=use_fp_array,
+                                                  out_of_core=out_of_core and tree_snapshot is None)
                 
                 with st.spinner("⏳ Đang chạy thuật toán FP-Growth... Vui lòng chờ."):
-                    frequent_itemsets, intermediate_steps = fpgrowth_algo.run()
-                    
-                    st.session_state.fpgrowth_frequent_itemsets = frequent_itemsets
-                    st.session_state.fpgrowth_intermediate_steps = intermediate_steps
-                    st.session_state.fpgrowth_metrics = metrics_collector
+                    if tree_snapshot is not None:
+                        frequent_itemsets, intermediate_steps = fpgrowth_algo.mine_from_tree(tree_snapshot)
+                    else:
+                        frequent_itemsets, intermediate_steps = fpgrowth_algo.run()
+                    if keep_tree_for_download and tree_source != "file" and fpgrowth_algo.main_tree_snapshot is not None:
+                        tree_buffer = io.BytesIO()
+                        save_fp_tree(fpgrowth_algo.main_tree_snapshot, tree_buffer, vocabulary=vocabulary,
+                                     source_fingerprint=source_fingerprint,
+                                     build_parameters={"tree_representation": tree_representation,
+                                                       "duplicate_compression": use_duplicate_compression,
+                                                       "customer_id": target_customer_id_input,
+                                                       "country": target_country_input},
+                                     metrics=metrics_collector)
+                        st.session_state.fpgrowth_tree_file = tree_buffer.getvalue()
 
                     if frequent_itemsets:
                         rules = fpgrowth_algo.generate_association_rules(frequent_itemsets, min_confidence_threshold)
-                        st.session_state.fpgrowth_rules = rules
                     else:
-                        st.session_state.fpgrowth_rules = []
+                        rules = []
+
+                    # Chỉ giải mã kết quả cuối; các bước trung gian (và FP-Tree) giữ nguyên id
+                    if vocabulary is not None:
+                        frequent_itemsets = vocabulary.decode_itemsets(frequent_itemsets, metrics_collector)
+                        rules = vocabulary.decode_rules(rules, metrics_collector)
+
+                    st.session_state.fpgrowth_frequent_itemsets = frequent_itemsets
+                    st.session_state.fpgrowth_intermediate_steps = intermediate_steps
+                    st.session_state.fpgrowth_rules = rules
+                    st.session_state.fpgrowth_metrics = metrics_collector
+                    st.session_state.fpgrowth_vocabulary = vocabulary
+                    st.session_state.fpgrowth_mining_mode = mining_mode
+                    st.session_state.fpgrowth_mined_support = min_support_count
+                    st.session_state.fpgrowth_tree_source = tree_source
                 
                 st.session_state.fpgrowth_run_completed = True
                 st.success("✅ Thuật toán FP-Growth đã chạy xong!")
@@ -239,7 +466,68 @@ if transactions is not None:
                     fpgrowth_specific_metrics = metrics.get_fp_growth_metrics_summary()
                     st.write(f"- Số nút trong FP-Tree chính (ước tính): `{fpgrowth_specific_metrics['nodes_in_fp_tree']}`")
                     st.write(f"- Số Conditional FP-Tree đã xây dựng: `{fpgrowth_specific_metrics['conditional_fp_trees_built']}`")
-
+                    if fpgrowth_specific_metrics['conditional_fp_trees_released']:
+                        st.write(f"- Số Conditional FP-Tree được giải phóng sớm (giới hạn cây giữ cùng lúc): "
+                                 f"`{fpgrowth_specific_metrics['conditional_fp_trees_released']}`")
+                    if fpgrowth_specific_metrics['peak_alive_conditional_trees']:
+                        st.write(f"- Số Conditional FP-Tree giữ cùng lúc nhiều nhất: "
+                                 f"`{fpgrowth_specific_metrics['peak_alive_conditional_trees']}`")
+                    st.write(f"- Thời gian lấy và đếm CPB: `{fpgrowth_specific_metrics['cpb_seconds']}` giây; "
+                             f"xây Conditional FP-Tree: `{fpgrowth_specific_metrics['conditional_build_seconds']}` giây"
+                             + (f", `{fpgrowth_specific_metrics['fp_array_scans_skipped']}` lần quét CPB được thay bằng FP-array"
+                                if fpgrowth_specific_metrics['fp_array_scans_skipped'] else "")
+                             + (f", `{fpgrowth_specific_metrics['fp_array_dense_trees']}` cây quá dày nên không dựng FP-array"
+                                if fpgrowth_specific_metrics['fp_array_dense_trees'] else ""))
+                    if fpgrowth_specific_metrics['closed_items_merged'] or fpgrowth_specific_metrics['closed_candidates_pruned']:
+                        st.write(f"- Tập đóng: `{fpgrowth_specific_metrics['closed_items_merged']}` item được gộp vào tiền tố, "
+                                 f"`{fpgrowth_specific_metrics['closed_candidates_pruned']}` ứng viên bị loại do đã có tập cha cùng support")
+                    if fpgrowth_specific_metrics['maximal_tree_nodes']:
+                        st.write(f"- Tập tối đại: MFI-tree có `{fpgrowth_specific_metrics['maximal_tree_nodes']}` nút, "
+                                 f"`{fpgrowth_specific_metrics['maximal_subtrees_skipped']}` nhánh được bỏ qua nhờ lookahead")
+                    if fpgrowth_specific_metrics['top_k_final_threshold'] is not None:
+                        st.write(f"- Top-k: ngưỡng support cuối cùng `{fpgrowth_specific_metrics['top_k_final_threshold']}` "
+                                 f"(được nâng `{fpgrowth_specific_metrics['top_k_threshold_raises']}` lần)")
+                    if fpgrowth_specific_metrics['projected_databases']:
+                        st.write(f"- Ngoài bộ nhớ: `{fpgrowth_specific_metrics['projected_databases']}` projected DB, "
+                                 f"`{fpgrowth_specific_metrics['spilled_MB']}` MB ghi ra đĩa, lớn nhất "
+                                 f"`{fpgrowth_specific_metrics['largest_projection_transactions']}` giao dịch")
+                    tree_source = st.session_state.get("fpgrowth_tree_source")
+                    cached_tree = st.session_state.get("fpgrowth_cached_tree")
+                    if tree_source in ("cache", "built") and cached_tree is not None:
+                        reuse_note = "vừa được xây" if tree_source == "built" else "được dùng lại, không quét dữ liệu hay xây lại cây"
+                        st.write(f"- FP-Tree chính xây ở ngưỡng `{cached_tree['build_support_count']}` "
+                                 f"(mất `{cached_tree['build_seconds']:.3f}` giây) {reuse_note}; "
+                                 f"`{fpgrowth_specific_metrics['header_items_skipped']}` item header dưới ngưỡng hiện tại bị bỏ qua")
+                    elif tree_source == "file":
+                        st.write(f"- Khai phá lại FP-Tree đã nạp từ file; `{fpgrowth_specific_metrics['header_items_skipped']}` item header dưới ngưỡng bị bỏ qua")
+                    for persistence in fpgrowth_specific_metrics['tree_persistence']:
+                        action = "Lưu" if persistence['operation'] == "save" else "Nạp"
+                        st.write(f"- {action} FP-Tree: `{persistence['file_MB']}` MB trong `{persistence['duration_seconds']:.3f}` giây")
+                    if st.session_state.get("fpgrowth_tree_file"):
+                        st.download_button("💾 Tải FP-Tree chính (.fptree)", st.session_state.fpgrowth_tree_file,
+                                           file_name="fp_tree.fptree", mime="application/octet-stream")
+                    if fpgrowth_specific_metrics['worker_timings']:
+                        st.write("Thời gian khai phá của từng nhóm CPB (chế độ song song):")
+                        st.dataframe(pd.DataFrame(fpgrowth_specific_metrics['worker_timings']), hide_index=True)
+                    if fpgrowth_specific_metrics['tree_representation']:
+                        st.write(f"- Bộ nhớ FP-Tree chính ({fpgrowth_specific_metrics['tree_representation']}, ước tính): "
+                                 f"`{fpgrowth_specific_metrics['tree_memory_MB']:.2f} MB`, "
+                                 f"`{fpgrowth_specific_metrics['memory_per_node_bytes']:.1f}` byte/nút")
+                        if fpgrowth_specific_metrics['tree_build_peak_MB'] != fpgrowth_specific_metrics['tree_memory_MB']:
+                            st.write(f"- Bộ nhớ FP-Tree chính lúc xây (còn bảng băm tra con, ước tính): "
+                                     f"`{fpgrowth_specific_metrics['tree_build_peak_MB']:.2f} MB`, "
+                                     f"`{fpgrowth_specific_metrics['build_peak_per_node_bytes']:.1f}` byte/nút")
+
+                    compression_summary = metrics.get_transaction_compression_summary()
+                    if compression_summary:
+                        st.write(f"- Gộp giao dịch trùng lặp: `{compression_summary['original_transactions']}` → "
+                                 f"`{compression_summary['unique_transactions']}` giao dịch "
+                                 f"(tỷ lệ trùng `{compression_summary['duplication_rate']:.1%}`, "
+                                 f"`{compression_summary['compress_seconds']:.4f}` giây)")
+
+                    encoding_summary = metrics.get_item_encoding_summary()
+                    if encoding_summary:
+                        display_item_encoding_summary(st, encoding_summary, st.session_state.get("fpgrowth_vocabulary"))
 
                     st.subheader("Thời Gian và Bộ Nhớ Từng Bước Chính:")
                     step_metrics_df = pd.DataFrame(metrics.get_step_metrics_table())
@@ -330,13 +618,17 @@ if transactions is not None:
                 if not frequent_itemsets:
                     st.info(f"Không tìm thấy tập mục phổ biến nào với ngưỡng support = {min_support_count} ({actual_min_support_percentage:.2f}%).")
                 else:
-                    st.success(f"Tìm thấy tổng cộng {len(frequent_itemsets)} tập mục phổ biến.")
-                    display_itemsets_table(st, "Tất cả các tập mục phổ biến", frequent_itemsets)
+                    result_label = MINING_MODE_LABELS[st.session_state.get("fpgrowth_mining_mode", "all")]
+                    st.success(f"Tìm thấy tổng cộng {len(frequent_itemsets)} {result_label}.")
+                    display_itemsets_table(st, f"Tất cả các {result_label}", frequent_itemsets)
             
             with tab4:
                 st.header("📜 Luật Kết Hợp")
                 rules = st.session_state.get("fpgrowth_rules", [])
-                if not rules:
+                if st.session_state.get("fpgrowth_mining_mode") == "maximal":
+                    st.info("Chế độ tập mục tối đại chỉ giữ các tập tối đại (không có support của các tập con) nên không sinh luật kết hợp. "
+                            "Hãy chọn 'all' hoặc 'closed' để xem luật.")
+                elif not rules:
                     st.info(f"Không có luật kết hợp nào được tạo ra với min_confidence = {min_confidence_threshold:.2f} (hoặc không có tập mục phổ biến nào để sinh luật).")
                 else:
                     st.success(f"Tìm thấy {len(rules)} luật kết hợp.")
@@ -0,0 +1,53 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Cho phép chạy `pytest` từ thư mục gốc: các module được import như trong các app Streamlit (algorithms.*, utils.*)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from reference_miner import reference_frequent_itemsets  # noqa: E402
+from utils.data_loader import parse_text_area_transactions, parse_tx_format_transactions  # noqa: E402
+
+GROCERIES_CSV = os.path.join(REPO_ROOT, "data", "groceries - groceries.csv")
+
+# Ví dụ kinh điển (Han & Kamber) ở định dạng "Tx: [...]" của ô nhập trực tiếp
+TEXTBOOK_TX_DATA = """T100: [I1, I2, I5]
+T200: [I2, I4]
+T300: [I2, I3]
+T400: [I1, I2, I4]
+T500: [I1, I3]
+T600: [I2, I3]
+T700: [I1, I3]
+T800: [I1, I2, I3, I5]
+T900: [I1, I2, I3]"""
+
+
+@pytest.fixture(scope="session")
+def groceries_transactions():
+    """Bộ groceries đi kèm repo, đọc đúng như ô nhập trực tiếp (có header, bỏ cột số lượng item)."""
+    with open(GROCERIES_CSV, encoding="utf-8") as groceries_file:
+        transactions, errors, _, _ = parse_text_area_transactions(groceries_file.read(), True, ",", True)
+    assert not errors
+    return transactions
+
+
+@pytest.fixture(scope="session")
+def groceries_reference(groceries_transactions):
+    """Hàm min_support_count -> tập mục phổ biến tham chiếu của groceries (tính một lần cho mỗi ngưỡng)."""
+    cache = {}
+
+    def reference(min_support_count):
+        if min_support_count not in cache:
+            cache[min_support_count] = reference_frequent_itemsets(groceries_transactions, min_support_count)
+        return cache[min_support_count]
+    return reference
+
+
+@pytest.fixture(scope="session")
+def textbook_transactions():
+    transactions, errors, _, _ = parse_tx_format_transactions(TEXTBOOK_TX_DATA)
+    assert not errors
+    return transactions
@@ -0,0 +1,38 @@
+# tests/reference_miner.py
+"""Bộ khai phá tham chiếu cho các test: đơn giản tới mức đúng hiển nhiên, không dùng code của algorithms/."""
+from collections import Counter
+from itertools import combinations, repeat
+
+
+def reference_frequent_itemsets(transactions, min_support_count, transaction_weights=None):
+    """
+    Tập mục phổ biến tham chiếu bằng liệt kê vét cạn: ở mỗi mức k, đếm mọi tổ hợp k item phổ biến của từng
+    giao dịch (không sinh ứng viên, không tỉa, không cấu trúc đếm nào của các thuật toán đang kiểm tra).
+    Returns:
+        dict: {frozenset: support_count}
+    """
+    weights = repeat(1) if transaction_weights is None else transaction_weights
+    weighted_baskets = [(set(transaction), weight) for transaction, weight in zip(transactions, weights)]
+    item_counts = Counter()
+    for basket, weight in weighted_baskets:
+        for item in basket:
+            item_counts[item] += weight
+    frequent_items = {item for item, count in item_counts.items() if count >= min_support_count}
+    frequent_itemsets = {frozenset([item]): item_counts[item] for item in frequent_items}
+    weighted_baskets = [(list(basket & frequent_items), weight) for basket, weight in weighted_baskets]
+    size = 2
+    while True:
+        level_counts = Counter()
+        for basket, weight in weighted_baskets:
+            for combination in combinations(basket, size):
+                level_counts[frozenset(combination)] += weight
+        level = {itemset: count for itemset, count in level_counts.items() if count >= min_support_count}
+        if not level:
+            return frequent_itemsets
+        frequent_itemsets.update(level)
+        # Item không thuộc k-itemset phổ biến nào thì không thể thuộc (k+1)-itemset phổ biến nào
+        level_items = set().union(*level)
+        weighted_baskets = [(basket, weight) for basket, weight in
+                            ((list(level_items.intersection(basket)), weight) for basket, weight in weighted_baskets)
+                            if len(basket) > size]
+        size += 1
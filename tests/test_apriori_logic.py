@@ -0,0 +1,203 @@
+# tests/test_apriori_logic.py
+"""Các tùy chọn của AprioriAlgorithm so với tập mục phổ biến tham chiếu (liệt kê vét cạn trong reference_miner)."""
+from itertools import combinations
+
+import pytest
+
+import algorithms.apriori_logic as apriori_logic
+from algorithms.apriori_logic import AprioriAlgorithm, _count_candidates_with_trie
+from reference_miner import reference_frequent_itemsets
+from utils.data_loader import compress_duplicate_transactions
+from utils.metrics_collector import PerformanceMetrics
+
+
+def run_apriori(transactions, min_support_count, **options):
+    """Chạy AprioriAlgorithm và trả về {frozenset: support_count}."""
+    return AprioriAlgorithm(transactions, min_support_count, PerformanceMetrics(), **options).run()[0]
+
+
+@pytest.mark.parametrize("min_support_count", (30, 100))
+def test_apriori_matches_reference(groceries_transactions, groceries_reference, min_support_count):
+    assert run_apriori(groceries_transactions, min_support_count) == groceries_reference(min_support_count)
+
+
+@pytest.mark.parametrize("transaction_reduction", (False, True))
+def test_numpy_backend_matches_reference(groceries_transactions, groceries_reference, transaction_reduction):
+    # Với transaction_reduction, các cột của ma trận one-hot bị cắt theo những giao dịch còn lại
+    pytest.importorskip("numpy")
+    assert run_apriori(groceries_transactions, 30, counting_backend="numpy",
+                       transaction_reduction=transaction_reduction) == groceries_reference(30)
+
+
+@pytest.mark.parametrize("transaction_reduction", (False, True))
+def test_numpy_backend_with_transaction_weights(groceries_transactions, groceries_reference, transaction_reduction):
+    # Support có trọng số được tính bằng tích (ma trận bool @ vector trọng số)
+    pytest.importorskip("numpy")
+    compressed = compress_duplicate_transactions(groceries_transactions)
+    assert run_apriori([items for items, _ in compressed], 30, counting_backend="numpy",
+                       transaction_reduction=transaction_reduction,
+                       transaction_weights=[multiplicity for _, multiplicity in compressed]) == groceries_reference(30)
+
+
+def test_numpy_backend_on_textbook_example(textbook_transactions):
+    pytest.importorskip("numpy")
+    weights = list(range(1, len(textbook_transactions) + 1))
+    for min_support_count in (2, 4):
+        assert (run_apriori(textbook_transactions, min_support_count, counting_backend="numpy")
+                == reference_frequent_itemsets(textbook_transactions, min_support_count))
+        assert (run_apriori(textbook_transactions, 3 * min_support_count, counting_backend="numpy",
+                            transaction_reduction=True, transaction_weights=weights)
+                == reference_frequent_itemsets(textbook_transactions, 3 * min_support_count, weights))
+
+
+def test_prefix_join_gives_the_candidates_of_the_all_pairs_join(groceries_reference):
+    # Sau bước prune, join theo tiền tố (k-2) phải cho đúng tập ứng viên của cách hợp mọi cặp (k-1)-itemset
+    frequent_itemsets = groceries_reference(30)
+    algorithm = AprioriAlgorithm([], 30, PerformanceMetrics())
+    for k in range(2, max(map(len, frequent_itemsets)) + 2):
+        level = {itemset for itemset in frequent_itemsets if len(itemset) == k - 1}
+        all_pairs = {first | second for first, second in combinations(level, 2) if len(first | second) == k}
+        joined = algorithm._generate_candidates_Ck(level, k)
+        assert joined <= all_pairs
+        pruned = algorithm._prune_candidates_Ck(joined, level, k)
+        assert pruned == algorithm._prune_candidates_Ck(all_pairs, level, k)
+        assert pruned >= {itemset for itemset in frequent_itemsets if len(itemset) == k}
+
+
+def test_textbook_candidates_after_join_and_prune(textbook_transactions):
+    # Ví dụ Han & Kamber (ngưỡng 2): C3 sau prune chỉ còn {I1, I2, I3} và {I1, I2, I5}
+    frequent_itemsets = run_apriori(textbook_transactions, 2)
+    level_2 = {itemset for itemset in frequent_itemsets if len(itemset) == 2}
+    algorithm = AprioriAlgorithm(textbook_transactions, 2, PerformanceMetrics())
+    pruned = algorithm._prune_candidates_Ck(algorithm._generate_candidates_Ck(level_2, 3), level_2, 3)
+    assert pruned == {frozenset({"I1", "I2", "I3"}), frozenset({"I1", "I2", "I5"})}
+    assert {itemset: support for itemset, support in frequent_itemsets.items() if len(itemset) == 3} == {
+        frozenset({"I1", "I2", "I3"}): 2, frozenset({"I1", "I2", "I5"}): 2}
+
+
+def test_trie_counts_match_subset_checks(groceries_transactions, groceries_reference):
+    # Ứng viên dài ngắn lẫn lộn (có ứng viên là tiền tố của ứng viên khác) và vài ứng viên không xuất hiện
+    candidates = list(groceries_reference(100)) + [frozenset({"whole milk", "no such item"}),
+                                                   frozenset({"no such item"})]
+    transactions = [set(transaction) for transaction in groceries_transactions]
+    counts = _count_candidates_with_trie(candidates, transactions)
+    for candidate in candidates:
+        assert counts.get(candidate, 0) == sum(candidate <= transaction for transaction in transactions)
+
+
+def test_trie_counting_skips_transactions_shorter_than_the_candidates(textbook_transactions):
+    candidates = [frozenset({"I1", "I2"}), frozenset({"I2", "I3"}), frozenset({"I1", "I2", "I5"})]
+    counts = _count_candidates_with_trie(candidates, [set(transaction) for transaction in textbook_transactions],
+                                         min_candidate_length=2)
+    assert dict(counts) == {frozenset({"I1", "I2"}): 4, frozenset({"I2", "I3"}): 4, frozenset({"I1", "I2", "I5"}): 2}
+
+
+@pytest.mark.parametrize("transaction_reduction", (False, True))
+def test_parallel_counting_matches_reference(groceries_transactions, groceries_reference, transaction_reduction):
+    # Với transaction_reduction, từ k=2 các shard của DB đã rút gọn được gửi kèm (worker không còn dùng bản gốc)
+    metrics = PerformanceMetrics()
+    frequent_itemsets, _ = AprioriAlgorithm(groceries_transactions, 50, metrics, n_jobs=2,
+                                            transaction_reduction=transaction_reduction).run()
+    assert frequent_itemsets == groceries_reference(50)
+    worker_timings = metrics.get_apriori_metrics_summary()["worker_timings"]
+    levels = sorted({timing["k"] for timing in worker_timings})
+    assert levels == list(range(1, max(map(len, frequent_itemsets)) + 1))
+    for k in levels:
+        shards = [timing for timing in worker_timings if timing["k"] == k]
+        assert [timing["shard"] for timing in shards] == [0, 1]
+        assert all(timing["duration_seconds"] >= 0 for timing in shards)
+    shard_sizes = {k: sum(timing["transactions"] for timing in worker_timings if timing["k"] == k) for k in levels}
+    assert shard_sizes[1] == len(groceries_transactions)
+    if transaction_reduction:
+        assert shard_sizes[2] == metrics.get_apriori_metrics_summary()["db_size_per_k"][2] < len(groceries_transactions)
+    else:
+        assert set(shard_sizes.values()) == {len(groceries_transactions)}
+
+
+@pytest.mark.parametrize("n_jobs", (1, 2))
+@pytest.mark.parametrize("dhp_buckets", (64, 1 << 16))
+def test_dhp_never_drops_a_frequent_pair(groceries_transactions, groceries_reference, dhp_buckets, n_jobs):
+    # 64 bucket: va chạm nhiều, gần như không loại được gì; 65536 bucket: loại phần lớn C2 mà không mất cặp phổ biến nào
+    metrics = PerformanceMetrics()
+    frequent_itemsets, _ = AprioriAlgorithm(groceries_transactions, 50, metrics, dhp_buckets=dhp_buckets,
+                                            n_jobs=n_jobs).run()
+    assert frequent_itemsets == groceries_reference(50)
+    summary = metrics.get_apriori_metrics_summary()
+    if dhp_buckets > 64:
+        assert summary["hash_pruned_per_k"][2] > summary["candidates_per_k"][2]
+        assert 0 < summary["hash_pruning_ratio_per_k"][2] < 1
+    assert set(summary["hash_pruned_per_k"]) <= {2}
+
+
+@pytest.fixture(params=("numpy", "python"))
+def l2_extraction(request, monkeypatch):
+    """Chạy test với cả hai nhánh lấy L2 từ mảng tam giác: qua NumPy và vòng lặp Python thuần (np = None)."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(apriori_logic, "np", None)
+    return request.param
+
+
+@pytest.mark.parametrize("min_support_count", (30, 100))
+def test_triangular_l2_matches_reference(groceries_transactions, groceries_reference, l2_extraction,
+                                         min_support_count):
+    metrics = PerformanceMetrics()
+    frequent_itemsets, _ = AprioriAlgorithm(groceries_transactions, min_support_count, metrics,
+                                            triangular_l2=True).run()
+    assert frequent_itemsets == groceries_reference(min_support_count)
+    num_frequent_items = metrics.get_apriori_metrics_summary()["frequent_itemsets_per_k"][1]
+    assert metrics.get_apriori_metrics_summary()["candidates_per_k"][2] == num_frequent_items * (num_frequent_items - 1) // 2
+
+
+@pytest.mark.parametrize("options", ({"transaction_reduction": True}, {"counting_backend": "numpy"},
+                                     {"counting_backend": "numpy", "transaction_reduction": True}))
+def test_triangular_l2_with_weights_and_other_options(groceries_transactions, groceries_reference, l2_extraction,
+                                                      options):
+    if options.get("counting_backend") == "numpy" and l2_extraction == "python":
+        pytest.skip("counting_backend='numpy' cần NumPy")
+    compressed = compress_duplicate_transactions(groceries_transactions)
+    assert run_apriori([items for items, _ in compressed], 30, triangular_l2=True,
+                       transaction_weights=[multiplicity for _, multiplicity in compressed],
+                       **options) == groceries_reference(30)
+
+
+def test_triangular_l2_covers_every_cell_on_textbook_example(textbook_transactions, l2_extraction):
+    # Ngưỡng 1: mọi cặp cùng xuất hiện đều phổ biến, nên mọi ô khác 0 (kể cả ô đầu và cuối mỗi hàng) được đọc ra
+    for min_support_count in (1, 2, 4):
+        assert (run_apriori(textbook_transactions, min_support_count, triangular_l2=True)
+                == reference_frequent_itemsets(textbook_transactions, min_support_count))
+    weights = [1, 2, 3, 1, 2, 3, 1, 2, 3]
+    assert (run_apriori(textbook_transactions, 4, triangular_l2=True, transaction_weights=weights)
+            == reference_frequent_itemsets(textbook_transactions, 4, weights))
+
+
+def test_triangular_l2_with_a_single_frequent_item(l2_extraction):
+    # n = 1: mảng tam giác rỗng, không có 2-itemset nào
+    transactions = [["a", "b"], ["a", "c"], ["a"]]
+    metrics = PerformanceMetrics()
+    frequent_itemsets, _ = AprioriAlgorithm(transactions, 2, metrics, triangular_l2=True).run()
+    assert frequent_itemsets == {frozenset(["a"]): 3}
+    assert metrics.get_apriori_metrics_summary()["candidates_per_k"][2] == 0
+
+
+def test_transaction_reduction_gives_the_same_result_on_a_shrinking_db(groceries_transactions, groceries_reference):
+    metrics = PerformanceMetrics()
+    reduced_itemsets, _ = AprioriAlgorithm(groceries_transactions, 30, metrics, transaction_reduction=True).run()
+    assert reduced_itemsets == run_apriori(groceries_transactions, 30) == groceries_reference(30)
+    db_size_per_k = metrics.get_apriori_metrics_summary()["db_size_per_k"]
+    sizes = [len(groceries_transactions)] + [db_size_per_k[k] for k in sorted(db_size_per_k)]
+    assert sorted(db_size_per_k) == list(range(2, max(map(len, reduced_itemsets)) + 2))
+    assert all(later <= earlier for earlier, later in zip(sizes, sizes[1:]))
+    assert sizes[-1] < sizes[1] < sizes[0]
+
+
+@pytest.mark.parametrize("options", ({}, {"dhp_buckets": 1 << 16}, {"triangular_l2": True},
+                                     {"transaction_reduction": True}))
+def test_compressed_baskets_give_the_uncompressed_supports(groceries_transactions, groceries_reference, options):
+    compressed = compress_duplicate_transactions(groceries_transactions)
+    assert len(compressed) < len(groceries_transactions)
+    algorithm = AprioriAlgorithm([items for items, _ in compressed], 30, PerformanceMetrics(),
+                                 transaction_weights=[multiplicity for _, multiplicity in compressed], **options)
+    assert algorithm.num_transactions == len(groceries_transactions)
+    assert algorithm.run()[0] == groceries_reference(30)
@@ -0,0 +1,83 @@
+# tests/test_data_loader.py
+"""Các hàm nạp/tiền xử lý giao dịch của utils.data_loader."""
+import csv
+import math
+
+import pytest
+
+from algorithms.partition_logic import PartitionAlgorithm
+from reference_miner import reference_frequent_itemsets
+from utils.data_loader import compress_duplicate_transactions, iter_transaction_chunks_from_file
+from utils.metrics_collector import PerformanceMetrics
+
+
+def write_invoice_csv(path, rows, header=("InvoiceNo", "Description", "Quantity", "StockCode")):
+    with open(path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_invoice_spanning_read_boundary_stays_one_transaction(tmp_path):
+    # Mỗi lần chỉ đọc 2 dòng: hóa đơn A (3 dòng) và C (2 dòng) bị cắt ngang giữa hai khối đọc
+    file_path = write_invoice_csv(tmp_path / "invoices.csv", [
+        ("A", "milk", 1, "10"), ("A", "bread", 1, "11"), ("A", "eggs", 2, "12"),
+        ("B", "milk", 1, "10"), ("B", "milk", 3, "10"),
+        ("C", "bread", 1, "11"), ("C", "", 1, "13"),
+        ("D", "eggs", 1, "12"),
+    ])
+    chunks = list(iter_transaction_chunks_from_file(file_path, transactions_per_chunk=2, csv_rows_per_read=2))
+    assert chunks == [[["bread", "eggs", "milk"], ["milk"]], [["bread"], ["eggs"]]]
+
+
+def test_cleaning_is_applied_per_read_block(tmp_path):
+    file_path = write_invoice_csv(tmp_path / "invoices.csv", [
+        ("A", "milk", 1, "10"), ("A", "POSTAGE", 1, "POST"),
+        ("C9", "milk", -1, "10"),
+        ("B", "bread", 0, "11"), ("B", "eggs", 1, "12"),
+    ])
+    chunks = list(iter_transaction_chunks_from_file(file_path, csv_rows_per_read=2,
+                                                    perform_online_retail_cleaning=True))
+    assert chunks == [[["milk"], ["eggs"]]]
+
+
+@pytest.mark.parametrize("invoices_sorted", (False, True))
+@pytest.mark.parametrize("csv_rows_per_read", (1, 3, 100))
+def test_non_contiguous_invoice_raises(tmp_path, csv_rows_per_read, invoices_sorted):
+    file_path = write_invoice_csv(tmp_path / "invoices.csv", [
+        ("A", "milk", 1, "10"), ("B", "bread", 1, "11"), ("B", "eggs", 1, "12"), ("A", "eggs", 1, "12"),
+    ])
+    with pytest.raises(ValueError, match="'A'"):
+        list(iter_transaction_chunks_from_file(file_path, csv_rows_per_read=csv_rows_per_read,
+                                               invoices_sorted=invoices_sorted))
+
+
+def test_sorted_mode_rejects_grouped_but_unsorted_invoices(tmp_path):
+    # B trước A: các dòng vẫn liền nhau (chế độ mặc định nhận), nhưng không tăng dần
+    file_path = write_invoice_csv(tmp_path / "invoices.csv", [
+        ("B", "milk", 1, "10"), ("B", "bread", 1, "11"), ("A", "eggs", 1, "12"),
+    ])
+    assert list(iter_transaction_chunks_from_file(file_path)) == [[["bread", "milk"], ["eggs"]]]
+    with pytest.raises(ValueError, match="invoices_sorted"):
+        list(iter_transaction_chunks_from_file(file_path, invoices_sorted=True))
+
+
+@pytest.mark.parametrize("invoices_sorted", (False, True))
+def test_partition_over_chunked_file_matches_reference(tmp_path, groceries_transactions, invoices_sorted):
+    file_path = write_invoice_csv(tmp_path / "groceries.csv", [
+        (f"{index:05d}", item) for index, transaction in enumerate(groceries_transactions) for item in transaction
+    ], header=("InvoiceNo", "Description"))
+    algorithm = PartitionAlgorithm(
+        lambda: iter_transaction_chunks_from_file(file_path, transactions_per_chunk=2000, csv_rows_per_read=3000,
+                                                  invoices_sorted=invoices_sorted),
+        0.01, PerformanceMetrics())
+    frequent_itemsets, _ = algorithm.run()
+    assert algorithm.num_transactions == len(groceries_transactions)
+    min_support_count = math.ceil(0.01 * len(groceries_transactions))
+    assert frequent_itemsets == reference_frequent_itemsets(groceries_transactions, min_support_count)
+
+
+def test_compress_treats_repeated_items_as_one_basket():
+    compressed = compress_duplicate_transactions([["b", "a", "a"], ["a", "b"], ["c"], ["c", "c"], ["a", "b", "c"]])
+    assert compressed == [(["a", "b"], 2), (["c"], 2), (["a", "b", "c"], 1)]
@@ -0,0 +1,35 @@
+# tests/test_eclat_logic.py
+"""EclatAlgorithm (TID-set dạng bitset) so với tập mục phổ biến tham chiếu và với Apriori."""
+import pytest
+
+from algorithms.apriori_logic import AprioriAlgorithm
+from algorithms.eclat_logic import EclatAlgorithm
+from reference_miner import reference_frequent_itemsets
+from utils.metrics_collector import PerformanceMetrics
+
+
+@pytest.mark.parametrize("min_support_count", (20, 50, 300))
+def test_eclat_matches_reference(groceries_transactions, groceries_reference, min_support_count):
+    metrics = PerformanceMetrics()
+    frequent_itemsets, _ = EclatAlgorithm(groceries_transactions, min_support_count, metrics).run()
+    assert frequent_itemsets == groceries_reference(min_support_count)
+    summary = metrics.get_eclat_metrics_summary()
+    assert summary["total_frequent_itemsets_found"] == len(frequent_itemsets)
+    assert summary["max_depth"] == max(map(len, frequent_itemsets))
+
+
+@pytest.mark.parametrize("min_support_count", (1, 2, 7, 8))
+def test_eclat_on_textbook_example(textbook_transactions, min_support_count):
+    # Ngưỡng 8: không item nào đủ support (I2 xuất hiện 7 lần)
+    frequent_itemsets, _ = EclatAlgorithm(textbook_transactions, min_support_count, PerformanceMetrics()).run()
+    assert frequent_itemsets == reference_frequent_itemsets(textbook_transactions, min_support_count)
+
+
+def test_eclat_rules_equal_apriori_rules(groceries_transactions):
+    eclat = EclatAlgorithm(groceries_transactions, 50, PerformanceMetrics())
+    apriori = AprioriAlgorithm(groceries_transactions, 50, PerformanceMetrics())
+    eclat_rules = eclat.generate_association_rules(eclat.run()[0], 0.2)
+    apriori_rules = apriori.generate_association_rules(apriori.run()[0], 0.2)
+    assert eclat_rules
+    assert (sorted(eclat_rules, key=lambda rule: (rule["antecedent"], rule["consequent"]))
+            == sorted(apriori_rules, key=lambda rule: (rule["antecedent"], rule["consequent"])))
@@ -0,0 +1,478 @@
+# tests/test_fp_growth_logic.py
+"""Các chế độ của FPGrowthAlgorithm so với tập mục phổ biến tham chiếu (liệt kê vét cạn trong conftest)."""
+import io
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+
+from algorithms.fp_growth_logic import (
+    FPGrowthAlgorithm, IncrementalFPTree, SlidingWindowFPMiner, FP_TREE_REPRESENTATIONS,
+    fingerprint_transactions, load_fp_tree, save_fp_tree,
+)
+from reference_miner import reference_frequent_itemsets
+from utils.data_loader import compress_duplicate_transactions
+from utils.metrics_collector import PerformanceMetrics
+
+
+def run_fp_growth(transactions, min_support_count, **options):
+    """Chạy FPGrowthAlgorithm (không ghi bước trung gian) và trả về {frozenset: support_count}."""
+    algorithm = FPGrowthAlgorithm(transactions, min_support_count, PerformanceMetrics(),
+                                  log_intermediate_steps=False, **options)
+    return algorithm.run()[0]
+
+
+def closed_itemsets(frequent_itemsets):
+    """Tập đóng: không có tập cha cùng support (chỉ cần xét các tập cha hơn đúng một item)."""
+    items = set().union(*frequent_itemsets)
+    return {itemset: support for itemset, support in frequent_itemsets.items()
+            if all(frequent_itemsets.get(itemset | {item}) != support for item in items - itemset)}
+
+
+def rule_keys(rules):
+    return sorted((rule["antecedent"], rule["consequent"], rule["itemset_support_count"]) for rule in rules)
+
+
+@pytest.mark.parametrize("tree_representation", FP_TREE_REPRESENTATIONS)
+@pytest.mark.parametrize("min_support_count", (50, 100))
+def test_closed_mode_matches_reference(groceries_transactions, groceries_reference, min_support_count,
+                                       tree_representation):
+    closed = run_fp_growth(groceries_transactions, min_support_count, mining_mode="closed",
+                           tree_representation=tree_representation)
+    assert closed == closed_itemsets(groceries_reference(min_support_count))
+
+
+def test_closed_mode_on_textbook_example(textbook_transactions):
+    closed = run_fp_growth(textbook_transactions, 2, mining_mode="closed")
+    assert closed == closed_itemsets(reference_frequent_itemsets(textbook_transactions, 2))
+    assert frozenset(["I2"]) in closed and frozenset(["I5"]) not in closed # {I5} luôn đi cùng {I1, I2}
+
+
+def test_closed_mode_generates_the_same_rules_as_all_mode(groceries_transactions):
+    rules_by_mode = {}
+    for mining_mode in ("all", "closed"):
+        algorithm = FPGrowthAlgorithm(groceries_transactions, 100, PerformanceMetrics(), mining_mode=mining_mode,
+                                      log_intermediate_steps=False)
+        itemsets, _ = algorithm.run()
+        rules_by_mode[mining_mode] = rule_keys(algorithm.generate_association_rules(itemsets, 0.2))
+    assert rules_by_mode["all"]
+    assert rules_by_mode["closed"] == rules_by_mode["all"]
+
+
+@pytest.mark.parametrize("tree_representation", FP_TREE_REPRESENTATIONS)
+def test_tree_memory_includes_the_build_peak(groceries_transactions, tree_representation):
+    # Cây mảng bỏ bảng băm tra con sau finalize(): bộ nhớ lúc xây phải được báo riêng
+    metrics = PerformanceMetrics()
+    FPGrowthAlgorithm(groceries_transactions, 50, metrics, tree_representation=tree_representation).build_tree_snapshot()
+    summary = metrics.get_fp_growth_metrics_summary()
+    assert summary["tree_representation"] == tree_representation
+    assert summary["memory_per_node_bytes"] > 0
+    if tree_representation == "array":
+        assert summary["build_peak_per_node_bytes"] > summary["memory_per_node_bytes"]
+    else:
+        assert summary["build_peak_per_node_bytes"] == summary["memory_per_node_bytes"]
+
+
+@pytest.mark.parametrize("tree_representation", FP_TREE_REPRESENTATIONS)
+@pytest.mark.parametrize("max_alive_trees", (None, 1, 2))
+def test_iterative_miner_keeps_alive_trees_within_the_bound(groceries_transactions, groceries_reference,
+                                                             tree_representation, max_alive_trees):
+    # Ngưỡng 20: không giới hạn thì miner giữ tới 4 Conditional FP-Tree cùng lúc (tính cả cây đang xây)
+    metrics = PerformanceMetrics()
+    itemsets, _ = FPGrowthAlgorithm(groceries_transactions, 20, metrics, tree_representation=tree_representation,
+                                    mining_strategy="iterative", max_alive_trees=max_alive_trees,
+                                    log_intermediate_steps=False).run()
+    assert itemsets == groceries_reference(20)
+    summary = metrics.get_fp_growth_metrics_summary()
+    if max_alive_trees is None:
+        assert summary["peak_alive_conditional_trees"] > 2
+        assert summary["conditional_fp_trees_released"] == 0
+    else:
+        assert summary["peak_alive_conditional_trees"] == max_alive_trees
+        assert summary["conditional_fp_trees_released"] > 0
+
+
+def test_smaller_alive_tree_bound_lowers_the_mining_peak():
+    # Dữ liệu dày (15 item, mỗi item có mặt với xác suất 0.65): Conditional FP-Tree ở tầng sâu vẫn lớn gần bằng
+    # cây cha, nên chỉ giữ một cây làm đỉnh bộ nhớ lúc khai phá (không tính cây chính) thấp hơn hẳn
+    rng = random.Random(7)
+    transactions = [[f"I{item}" for item in range(15) if rng.random() < 0.65] for _ in range(1200)]
+    snapshot = FPGrowthAlgorithm(transactions, 300, PerformanceMetrics()).build_tree_snapshot()
+    itemsets, peak_bytes = {}, {}
+    for max_alive_trees in (None, 1):
+        algorithm = FPGrowthAlgorithm([], 300, PerformanceMetrics(), mining_strategy="iterative",
+                                      max_alive_trees=max_alive_trees, log_intermediate_steps=False)
+        tracemalloc.start()
+        try:
+            itemsets[max_alive_trees] = algorithm.mine_from_tree(snapshot)[0]
+            peak_bytes[max_alive_trees] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    assert itemsets[1] == itemsets[None]
+    assert peak_bytes[1] < 0.9 * peak_bytes[None]
+
+
+@pytest.mark.parametrize("options", ({"mining_mode": "closed"}, {"mining_mode": "maximal"},
+                                     {"mining_mode": "top_k", "top_k": 10}))
+def test_iterative_strategy_rejects_other_mining_modes(textbook_transactions, options):
+    with pytest.raises(ValueError):
+        FPGrowthAlgorithm(textbook_transactions, 2, PerformanceMetrics(), mining_strategy="iterative", **options)
+
+
+@pytest.mark.parametrize("tree_representation", FP_TREE_REPRESENTATIONS)
+def test_parallel_mining_matches_reference(groceries_transactions, groceries_reference, tree_representation):
+    metrics = PerformanceMetrics()
+    algorithm = FPGrowthAlgorithm(groceries_transactions, 50, metrics, tree_representation=tree_representation,
+                                  n_jobs=2)
+    assert algorithm.run()[0] == groceries_reference(50)
+    worker_timings = metrics.get_fp_growth_metrics_summary()["worker_timings"]
+    assert [timing["group"] for timing in worker_timings] == [0, 1]
+    assert all(timing["items"] > 0 and timing["duration_seconds"] >= 0 for timing in worker_timings)
+    assert metrics.fp_conditional_trees_built > 0
+    # Mỗi worker nhận đúng nhóm CPB đã log (LPT), và mọi CPB được gửi đi đều nằm trong một nhóm
+    groups = next(entry["data"]["groups"] for entry in algorithm.intermediate_steps_data
+                  if entry["step_name"] == "Phân nhóm Conditional Pattern Base cho các worker")
+    assert [group["estimated_size"] for group in groups] == [timing["estimated_size"] for timing in worker_timings]
+    assert sum(len(group["items"]) for group in groups) == sum(timing["items"] for timing in worker_timings)
+
+
+def test_closed_mode_rejects_parallel_workers(textbook_transactions):
+    with pytest.raises(ValueError):
+        FPGrowthAlgorithm(textbook_transactions, 2, PerformanceMetrics(), mining_mode="closed", n_jobs=2)
+
+
+def maximal_itemsets(frequent_itemsets):
+    """Tập tối đại: không có tập cha phổ biến (chỉ cần xét các tập cha hơn đúng một item)."""
+    items = set().union(*frequent_itemsets)
+    return {itemset: support for itemset, support in frequent_itemsets.items()
+            if not any(itemset | {item} in frequent_itemsets for item in items - itemset)}
+
+
+@pytest.mark.parametrize("tree_representation", FP_TREE_REPRESENTATIONS)
+@pytest.mark.parametrize("min_support_count", (50, 100))
+def test_maximal_mode_matches_reference(groceries_transactions, groceries_reference, min_support_count,
+                                        tree_representation):
+    maximal = run_fp_growth(groceries_transactions, min_support_count, mining_mode="maximal",
+                            tree_representation=tree_representation)
+    assert maximal == maximal_itemsets(groceries_reference(min_support_count))
+
+
+def test_maximal_mode_on_textbook_example(textbook_transactions):
+    maximal = run_fp_growth(textbook_transactions, 2, mining_mode="maximal")
+    assert set(maximal) == {frozenset(["I1", "I2", "I3"]), frozenset(["I1", "I2", "I5"]), frozenset(["I2", "I4"])}
+
+
+def test_maximal_mode_generates_no_rules(textbook_transactions):
+    algorithm = FPGrowthAlgorithm(textbook_transactions, 2, PerformanceMetrics(), mining_mode="maximal")
+    itemsets, _ = algorithm.run()
+    assert algorithm.generate_association_rules(itemsets, 0.1) == []
+
+
+def top_k_itemsets(frequent_itemsets, top_k, min_itemset_length):
+    """top_k tập mục (đủ dài) có support cao nhất, giữ cả các tập hòa support với tập thứ top_k."""
+    candidates = {itemset: support for itemset, support in frequent_itemsets.items()
+                  if len(itemset) >= min_itemset_length}
+    if not candidates:
+        return {}
+    kth_support = sorted(candidates.values(), reverse=True)[min(top_k, len(candidates)) - 1]
+    return {itemset: support for itemset, support in candidates.items() if support >= kth_support}
+
+
+@pytest.mark.parametrize("top_k, min_itemset_length", ((10, 1), (100, 1), (100, 2), (30, 3)))
+def test_top_k_mode_matches_reference(groceries_transactions, groceries_reference, top_k, min_itemset_length):
+    # Ngưỡng 50 chỉ là ngưỡng sàn: tập thứ top_k của các cấu hình này có support cao hơn nhiều
+    top_itemsets = run_fp_growth(groceries_transactions, 50, mining_mode="top_k", top_k=top_k,
+                                 min_itemset_length=min_itemset_length)
+    assert top_itemsets == top_k_itemsets(groceries_reference(50), top_k, min_itemset_length)
+
+
+@pytest.mark.parametrize("top_k", (1, 4, 100))
+def test_top_k_mode_keeps_ties_on_textbook_example(textbook_transactions, top_k):
+    top_itemsets = run_fp_growth(textbook_transactions, 1, mining_mode="top_k", top_k=top_k)
+    assert top_itemsets == top_k_itemsets(reference_frequent_itemsets(textbook_transactions, 1), top_k, 1)
+
+
+def test_top_k_mode_requires_positive_k(textbook_transactions):
+    with pytest.raises(ValueError):
+        FPGrowthAlgorithm(textbook_transactions, 1, PerformanceMetrics(), mining_mode="top_k", top_k=0)
+
+
+@pytest.mark.parametrize("top_k, min_itemset_length", ((100, 1), (100, 2), (30, 3)))
+def test_top_k_rules_match_all_mode_rules_of_the_top_itemsets(groceries_transactions, top_k, min_itemset_length):
+    # Tiền đề/hậu quả ngắn hơn min_itemset_length vẫn có support (và lift) như ở chế độ 'all'
+    all_mode = FPGrowthAlgorithm(groceries_transactions, 50, PerformanceMetrics(), log_intermediate_steps=False)
+    all_rules = all_mode.generate_association_rules(all_mode.run()[0], 0.1)
+    top_mode = FPGrowthAlgorithm(groceries_transactions, 50, PerformanceMetrics(), log_intermediate_steps=False,
+                                 mining_mode="top_k", top_k=top_k, min_itemset_length=min_itemset_length)
+    top_itemsets = top_mode.run()[0]
+    top_rules = top_mode.generate_association_rules(top_itemsets, 0.1)
+    expected = [rule for rule in all_rules if frozenset(rule["antecedent"] + rule["consequent"]) in top_itemsets]
+    assert expected
+    assert (sorted(top_rules, key=lambda rule: (rule["antecedent"], rule["consequent"]))
+            == sorted(expected, key=lambda rule: (rule["antecedent"], rule["consequent"])))
+
+
+@pytest.mark.parametrize("tree_representation", FP_TREE_REPRESENTATIONS)
+@pytest.mark.parametrize("mining_mode", ("all", "closed", "maximal"))
+def test_fp_array_does_not_change_results(groceries_transactions, tree_representation, mining_mode):
+    options = {"mining_mode": mining_mode, "tree_representation": tree_representation}
+    assert (run_fp_growth(groceries_transactions, 100, use_fp_array=True, **options)
+            == run_fp_growth(groceries_transactions, 100, **options))
+
+
+def test_fp_array_matches_reference(groceries_transactions, groceries_reference):
+    assert run_fp_growth(groceries_transactions, 50, use_fp_array=True) == groceries_reference(50)
+
+
+def test_fp_array_is_skipped_for_dense_trees(textbook_transactions):
+    transactions = [["I1", "I2", "I3", "I4", "I5"]] * 10 + textbook_transactions
+    metrics = PerformanceMetrics()
+    itemsets, _ = FPGrowthAlgorithm(transactions, 3, metrics, use_fp_array=True).run()
+    assert itemsets == reference_frequent_itemsets(transactions, 3)
+    assert metrics.get_fp_growth_metrics_summary()["fp_array_dense_trees"] > 0
+
+
+@pytest.mark.parametrize("use_fp_array", (False, True))
+def test_cpb_time_and_conditional_build_time_are_recorded_separately(textbook_transactions, use_fp_array):
+    # Ngưỡng 5: CPB vẫn được lấy/đếm nhưng không có Conditional FP-Tree nào được xây
+    metrics = PerformanceMetrics()
+    FPGrowthAlgorithm(textbook_transactions, 5, metrics, use_fp_array=use_fp_array).run()
+    summary = metrics.get_fp_growth_metrics_summary()
+    assert summary["conditional_fp_trees_built"] == 0
+    assert metrics.fp_cpb_seconds > 0 and metrics.fp_conditional_build_seconds == 0
+    metrics = PerformanceMetrics()
+    FPGrowthAlgorithm(textbook_transactions, 2, metrics, use_fp_array=use_fp_array).run()
+    assert metrics.get_fp_growth_metrics_summary()["conditional_fp_trees_built"] > 0
+    assert metrics.fp_cpb_seconds > 0 and metrics.fp_conditional_build_seconds > 0
+
+
+@pytest.mark.parametrize("tree_representation", FP_TREE_REPRESENTATIONS)
+def test_out_of_core_matches_reference(groceries_transactions, groceries_reference, tree_representation, tmp_path):
+    # Giỏ trùng được gộp thành giao dịch có trọng số để kiểm tra cả trọng số trong các projected DB
+    compressed = compress_duplicate_transactions(groceries_transactions)
+    itemsets = run_fp_growth([items for items, _ in compressed], 50,
+                             transaction_weights=[multiplicity for _, multiplicity in compressed],
+                             out_of_core=True, spill_directory=str(tmp_path),
+                             tree_representation=tree_representation)
+    assert itemsets == groceries_reference(50)
+    assert not any(tmp_path.iterdir()) # Các file projected DB đã được xóa
+
+
+@pytest.mark.parametrize("options", ({"mining_mode": "closed"}, {"n_jobs": 2}))
+def test_out_of_core_rejects_unsupported_options(textbook_transactions, options):
+    with pytest.raises(ValueError):
+        FPGrowthAlgorithm(textbook_transactions, 2, PerformanceMetrics(), out_of_core=True, **options)
+
+
+def test_out_of_core_streams_a_chunk_source(groceries_transactions, groceries_reference, tmp_path):
+    calls = []
+
+    def transaction_chunks():
+        calls.append(len(calls))
+        for start in range(0, len(groceries_transactions), 1000):
+            yield groceries_transactions[start:start + 1000]
+
+    algorithm = FPGrowthAlgorithm(transaction_chunks, 50, PerformanceMetrics(), log_intermediate_steps=False,
+                                  out_of_core=True, spill_directory=str(tmp_path))
+    assert algorithm.run()[0] == groceries_reference(50)
+    assert algorithm.num_transactions == len(groceries_transactions)
+    assert len(calls) == 2 # Quét lần 1 và lượt chia vào projected DB
+
+
+@pytest.mark.parametrize("options", ({}, {"out_of_core": True, "transaction_weights": [1]}))
+def test_chunk_source_requires_out_of_core_without_weights(textbook_transactions, options):
+    with pytest.raises(ValueError):
+        FPGrowthAlgorithm(lambda: [textbook_transactions], 2, PerformanceMetrics(), **options)
+
+
+def test_incremental_tree_matches_reference_after_each_batch(groceries_transactions):
+    tree = IncrementalFPTree()
+    for end in range(2500, len(groceries_transactions) + 2500, 2500):
+        tree.add_transactions(groceries_transactions[end - 2500:end])
+        assert tree.num_transactions == min(end, len(groceries_transactions))
+        assert tree.mine(100, PerformanceMetrics()) == reference_frequent_itemsets(groceries_transactions[:end], 100)
+
+
+def test_incremental_tree_matches_reference_after_removals(groceries_transactions):
+    tree = IncrementalFPTree()
+    tree.add_transactions(groceries_transactions)
+    tree.remove_transactions(groceries_transactions[:4000])
+    remaining = groceries_transactions[4000:]
+    assert tree.num_transactions == len(remaining)
+    for min_support_count in (60, 150):
+        assert (tree.mine(min_support_count, PerformanceMetrics())
+                == reference_frequent_itemsets(remaining, min_support_count))
+
+
+def test_incremental_tree_rejects_removing_unknown_transactions(textbook_transactions):
+    tree = IncrementalFPTree()
+    tree.add_transactions(textbook_transactions)
+    for missing in (["I4", "I5"], ["I9"]):
+        with pytest.raises(ValueError):
+            tree.remove_transactions([missing])
+
+
+@pytest.mark.parametrize("batch, weights", (
+    ([["I2", "I4"], ["I2", "I4"]], None), # Mỗi giỏ đều có trong cây, nhưng cả lô vượt count của nút
+    ([["I1", "I2"]], None), # Tiền tố của một giỏ đã thêm, không phải một giỏ đã thêm
+    ([["I1", "I3"], ["I1", "I3"], ["I1", "I3"]], None),
+    ([["I2", "I3"]], [3]),
+    ([[]], None),
+))
+def test_incremental_tree_rejects_invalid_batches_without_changes(textbook_transactions, batch, weights):
+    tree = IncrementalFPTree()
+    tree.add_transactions(textbook_transactions)
+    before = tree.mine(1, PerformanceMetrics())
+    with pytest.raises(ValueError):
+        tree.remove_transactions(batch, transaction_weights=weights)
+    assert tree.num_transactions == len(textbook_transactions)
+    assert tree.mine(1, PerformanceMetrics()) == before
+
+
+@pytest.fixture(scope="module")
+def timestamped_groceries(groceries_transactions):
+    """Các giỏ groceries theo thứ tự, cách nhau 1-3 giờ (luồng đã sắp theo InvoiceDate)."""
+    started = datetime(2011, 1, 1)
+    return [(started + timedelta(hours=2 * index + index % 3), transaction)
+            for index, transaction in enumerate(groceries_transactions[:5000])]
+
+
+@pytest.mark.parametrize("window", ({"window_transactions": 1000}, {"window_days": 30}))
+def test_sliding_window_matches_reference(timestamped_groceries, window):
+    miner = SlidingWindowFPMiner(**window)
+    for end in range(700, len(timestamped_groceries) + 700, 700):
+        miner.add_transactions(timestamped_groceries[end - 700:end])
+        seen = timestamped_groceries[:end]
+        if "window_transactions" in window:
+            expected_window = [transaction for _, transaction in seen[-1000:]]
+        else:
+            oldest_allowed = seen[-1][0] - timedelta(days=30)
+            expected_window = [transaction for timestamp, transaction in seen if timestamp > oldest_allowed]
+        assert len(miner) == len(expected_window)
+        assert miner.frequent_itemsets(20, PerformanceMetrics()) == reference_frequent_itemsets(expected_window, 20)
+
+
+def test_sliding_window_rejects_out_of_order_timestamps():
+    miner = SlidingWindowFPMiner(window_transactions=10)
+    miner.add_transactions([(datetime(2011, 1, 2), ["I1"])])
+    with pytest.raises(ValueError):
+        miner.add_transactions([(datetime(2011, 1, 1), ["I2"])])
+
+
+@pytest.mark.parametrize("batch, weights", (
+    ([(datetime(2011, 1, 3), ["I1", "I2"]), (datetime(2011, 1, 1), ["I2"])], None),
+    ([(datetime(2011, 1, 3), ["I1", "I2"]), (datetime(2011, 1, 4), ["I2"])], [1]),
+))
+def test_sliding_window_rejected_batch_leaves_state_unchanged(textbook_transactions, batch, weights):
+    miner = SlidingWindowFPMiner(window_days=2)
+    started = datetime(2011, 1, 2)
+    miner.add_transactions((started, transaction) for transaction in textbook_transactions)
+    before = miner.frequent_itemsets(2, PerformanceMetrics())
+    with pytest.raises(ValueError):
+        miner.add_transactions(batch, weights)
+    assert miner.latest_timestamp == started
+    assert len(miner) == len(textbook_transactions)
+    assert miner.tree.num_transactions == len(textbook_transactions)
+    assert miner.frequent_itemsets(2, PerformanceMetrics()) == before == reference_frequent_itemsets(
+        textbook_transactions, 2)
+    # Lô hợp lệ sau đó vẫn được nhận, với đồng hồ tính từ giao dịch cuối đã được chấp nhận
+    miner.add_transactions([(started + timedelta(days=1), ["I1"])])
+    assert len(miner) == len(textbook_transactions) + 1
+
+
+def saved_tree_bytes(transactions, min_support_count, tree_representation="object"):
+    snapshot = FPGrowthAlgorithm(transactions, min_support_count, PerformanceMetrics(),
+                                 tree_representation=tree_representation).build_tree_snapshot()
+    tree_buffer = io.BytesIO()
+    save_fp_tree(snapshot, tree_buffer, source_fingerprint=fingerprint_transactions(transactions))
+    return tree_buffer.getvalue()
+
+
+@pytest.mark.parametrize("load_representation", FP_TREE_REPRESENTATIONS)
+@pytest.mark.parametrize("save_representation", FP_TREE_REPRESENTATIONS)
+def test_saved_tree_round_trip_matches_reference(groceries_transactions, groceries_reference, save_representation,
+                                                 load_representation):
+    tree_bytes = saved_tree_bytes(groceries_transactions, 50, save_representation)
+    snapshot, metadata = load_fp_tree(io.BytesIO(tree_bytes), load_representation,
+                                      expected_fingerprint=fingerprint_transactions(groceries_transactions))
+    assert (metadata["min_support_count"], snapshot.num_transactions) == (50, len(groceries_transactions))
+    algorithm = FPGrowthAlgorithm([], 50, PerformanceMetrics(), tree_representation=load_representation,
+                                  log_intermediate_steps=False)
+    assert algorithm.mine_from_tree(snapshot)[0] == groceries_reference(50)
+
+
+def test_load_rejects_tree_of_other_data(textbook_transactions):
+    tree_bytes = saved_tree_bytes(textbook_transactions, 2)
+    with pytest.raises(ValueError):
+        load_fp_tree(io.BytesIO(tree_bytes), expected_fingerprint=fingerprint_transactions(textbook_transactions[1:]))
+
+
+def test_mine_from_tree_rejects_threshold_below_build_threshold(textbook_transactions):
+    snapshot = FPGrowthAlgorithm(textbook_transactions, 3, PerformanceMetrics()).build_tree_snapshot()
+    with pytest.raises(ValueError):
+        FPGrowthAlgorithm([], 2, PerformanceMetrics()).mine_from_tree(snapshot)
+
+
+def test_save_rejects_items_not_representable_in_json():
+    snapshot = FPGrowthAlgorithm([[("I1", 1), ("I2", 2)]] * 3, 2, PerformanceMetrics()).build_tree_snapshot()
+    with pytest.raises(ValueError):
+        save_fp_tree(snapshot, io.BytesIO())
+
+
+@pytest.mark.parametrize("load_representation", FP_TREE_REPRESENTATIONS)
+def test_load_rejects_truncated_or_corrupt_files(textbook_transactions, load_representation):
+    tree_bytes = saved_tree_bytes(textbook_transactions, 2)
+    for damaged in [tree_bytes[:length] for length in (0, 4, len(tree_bytes) // 2, len(tree_bytes) - 1)] + \
+                   [tree_bytes + b"\x00"]:
+        with pytest.raises(ValueError):
+            load_fp_tree(io.BytesIO(damaged), load_representation)
+    # Lật từng bit: file phải nạp được hoặc báo ValueError, không bao giờ lỗi khác (IndexError, KeyError...)
+    for byte_index in range(len(tree_bytes)):
+        for bit in range(8):
+            damaged = bytearray(tree_bytes)
+            damaged[byte_index] ^= 1 << bit
+            try:
+                load_fp_tree(io.BytesIO(bytes(damaged)), load_representation)
+            except ValueError:
+                pass
+
+
+@pytest.mark.parametrize("load_representation", FP_TREE_REPRESENTATIONS)
+def test_load_rejects_header_counts_or_item_order_that_do_not_match_the_nodes(textbook_transactions,
+                                                                                load_representation):
+    # Count header trong metadata lệch khỏi tổng count các nút của item đó
+    snapshot = FPGrowthAlgorithm(textbook_transactions, 2, PerformanceMetrics()).build_tree_snapshot()
+    snapshot.header_table["I5"]["count"] += 1
+    tree_buffer = io.BytesIO()
+    save_fp_tree(snapshot, tree_buffer)
+    with pytest.raises(ValueError, match="count header"):
+        load_fp_tree(io.BytesIO(tree_buffer.getvalue()), load_representation)
+    # Thứ tự item bị đảo: nút con có hạng nhỏ hơn nút cha (count header vẫn khớp)
+    snapshot = FPGrowthAlgorithm([["a", "b"], ["a", "b"]], 1, PerformanceMetrics()).build_tree_snapshot()
+    snapshot.item_order.reverse()
+    tree_buffer = io.BytesIO()
+    save_fp_tree(snapshot, tree_buffer)
+    with pytest.raises(ValueError, match="hạng item"):
+        load_fp_tree(io.BytesIO(tree_buffer.getvalue()), load_representation)
+
+
+@pytest.mark.parametrize("tree_representation", FP_TREE_REPRESENTATIONS)
+def test_mine_from_tree_at_higher_thresholds_matches_reference(groceries_transactions, groceries_reference,
+                                                               tree_representation):
+    snapshot = FPGrowthAlgorithm(groceries_transactions, 50, PerformanceMetrics(),
+                                 tree_representation=tree_representation).build_tree_snapshot()
+    for min_support_count in (50, 100, 300):
+        metrics = PerformanceMetrics()
+        algorithm = FPGrowthAlgorithm([], min_support_count, metrics, log_intermediate_steps=False)
+        assert algorithm.mine_from_tree(snapshot)[0] == groceries_reference(min_support_count)
+        assert algorithm.main_tree_snapshot is snapshot
+        assert (metrics.get_fp_growth_metrics_summary()["header_items_skipped"] > 0) == (min_support_count > 50)
+
+
+@pytest.mark.parametrize("options", ({"mining_mode": "closed"}, {"mining_mode": "maximal"},
+                                     {"mining_mode": "top_k", "top_k": 40}, {"mining_strategy": "iterative"}))
+def test_mine_from_tree_matches_a_full_run(groceries_transactions, options):
+    snapshot = FPGrowthAlgorithm(groceries_transactions, 50, PerformanceMetrics()).build_tree_snapshot()
+    from_tree = FPGrowthAlgorithm([], 120, PerformanceMetrics(), **options).mine_from_tree(snapshot)[0]
+    assert from_tree == run_fp_growth(groceries_transactions, 120, **options)
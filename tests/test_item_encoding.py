@@ -0,0 +1,58 @@
+# tests/test_item_encoding.py
+"""ItemVocabulary: mã hóa/giải mã và kết quả của các thuật toán chạy trên id so với chạy trên chuỗi."""
+from collections import Counter
+
+import pytest
+
+from algorithms.apriori_logic import AprioriAlgorithm
+from algorithms.fp_growth_logic import FPGrowthAlgorithm
+from utils.item_encoding import ItemVocabulary
+from utils.metrics_collector import PerformanceMetrics
+
+
+def test_ids_follow_descending_frequency(groceries_transactions):
+    vocabulary = ItemVocabulary.from_transactions(groceries_transactions)
+    item_counts = Counter(item for transaction in groceries_transactions for item in set(transaction))
+    assert len(vocabulary) == len(item_counts)
+    counts_by_id = [item_counts[item] for item in vocabulary.id_to_item]
+    assert counts_by_id == sorted(counts_by_id, reverse=True)
+    assert vocabulary.id_to_item[0] == "whole milk"
+    # Hòa tần suất: xếp theo item
+    for first, second in zip(vocabulary.id_to_item, vocabulary.id_to_item[1:]):
+        assert (-item_counts[first], first) < (-item_counts[second], second)
+
+
+def test_encode_decode_round_trip(groceries_transactions):
+    metrics = PerformanceMetrics()
+    vocabulary = ItemVocabulary.from_transactions(groceries_transactions)
+    encoded = vocabulary.encode_transactions(groceries_transactions, metrics)
+    assert all(isinstance(item_id, int) for transaction in encoded for item_id in transaction)
+    assert [[vocabulary.id_to_item[item_id] for item_id in transaction] for transaction in encoded] == \
+        groceries_transactions
+    assert all(vocabulary.item_to_id[vocabulary.id_to_item[item_id]] == item_id for item_id in range(len(vocabulary)))
+    summary = metrics.get_item_encoding_summary()
+    assert summary["vocabulary_size"] == len(vocabulary)
+    assert summary["transactions_MB_after"] < summary["transactions_MB_before"]
+
+
+def rule_keys(rules):
+    return sorted((rule["antecedent"], rule["consequent"], rule["itemset_support_count"], rule["confidence"])
+                  for rule in rules)
+
+
+@pytest.mark.parametrize("engine", (AprioriAlgorithm, FPGrowthAlgorithm))
+def test_encoded_run_decodes_to_the_string_run(groceries_transactions, engine):
+    string_run = engine(groceries_transactions, 50, PerformanceMetrics())
+    string_itemsets = string_run.run()[0]
+    string_rules = string_run.generate_association_rules(string_itemsets, 0.2)
+
+    metrics = PerformanceMetrics()
+    vocabulary = ItemVocabulary.from_transactions(groceries_transactions)
+    encoded_run = engine(vocabulary.encode_transactions(groceries_transactions, metrics), 50, metrics)
+    encoded_itemsets = encoded_run.run()[0]
+    encoded_rules = encoded_run.generate_association_rules(encoded_itemsets, 0.2)
+
+    assert vocabulary.decode_itemsets(encoded_itemsets, metrics) == string_itemsets
+    assert string_rules
+    assert rule_keys(vocabulary.decode_rules(encoded_rules, metrics)) == rule_keys(string_rules)
+    assert metrics.get_item_encoding_summary()["decode_seconds"] > 0
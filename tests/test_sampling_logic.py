@@ -0,0 +1,33 @@
+# tests/test_sampling_logic.py
+"""SamplingAlgorithm (Toivonen) so với tập mục phổ biến tham chiếu: kết quả phải chính xác với mọi mẫu."""
+import pytest
+
+from algorithms.sampling_logic import SamplingAlgorithm, SAMPLE_ENGINES
+from utils.metrics_collector import PerformanceMetrics
+
+
+@pytest.mark.parametrize("sample_engine", tuple(SAMPLE_ENGINES))
+def test_sampling_matches_reference(groceries_transactions, groceries_reference, sample_engine):
+    frequent_itemsets, _ = SamplingAlgorithm(groceries_transactions, 100, PerformanceMetrics(),
+                                             sample_engine=sample_engine, random_seed=0).run()
+    assert frequent_itemsets == groceries_reference(100)
+
+
+@pytest.mark.parametrize("random_seed", (0, 1, 2))
+def test_border_misses_are_rescanned_until_exact(groceries_transactions, groceries_reference, random_seed):
+    # Mẫu 3% không hạ ngưỡng: vài itemset phổ biến trên toàn DB nằm ngoài kết quả mẫu (biên âm bị trượt)
+    metrics = PerformanceMetrics()
+    frequent_itemsets, _ = SamplingAlgorithm(groceries_transactions, 300, metrics, sample_ratio=0.03,
+                                             support_lowering=1.0, random_seed=random_seed).run()
+    assert frequent_itemsets == groceries_reference(300)
+    summary = metrics.get_sampling_metrics_summary()
+    assert summary["sample_size"] == round(0.03 * len(groceries_transactions))
+    assert summary["total_border_misses"] > 0
+    assert summary["full_database_scans"] >= 2
+    assert summary["scan_stats"][-1]["border_misses"] == 0
+
+
+def test_sampling_on_empty_database():
+    metrics = PerformanceMetrics()
+    assert SamplingAlgorithm([], 1, metrics).run()[0] == {}
+    assert metrics.get_sampling_metrics_summary()["full_database_scans"] == 0
@@ -4,9 +4,92 @@ import streamlit as st
 import io
 import csv # Đảm bảo import csv
 import re # Thêm import re
-from typing import Tuple, List, Optional, Union, Any # Đảm bảo import Tuple và List
+import time
+from typing import Tuple, List, Optional, Union, Any, Iterator # Đảm bảo import Tuple và List
 import numpy as np
 
+# Constants for Online Retail cleaning
+NON_PRODUCT_STOCK_CODES = {
+    'POST', 'D', 'M', 'BANK CHARGES', 'AMAZONFEE', 'CRUK', 'DCGSSBOY',
+    'DCGSSGIRL', 'PADS', 'DOT', 'S', 'ADJUST', 'ADJUST2', 'SPENSE'
+}
+
+NON_PRODUCT_KEYWORDS = {
+    'POSTAGE', 'DOTCOM POSTAGE', 'MANUAL', 'CHARGES', 'AMAZON FEE',
+    'BANK CHARGES', 'Discount', 'CRUK Commission', 'SAMPLES',
+    'Gift Vouchers', 'Manual', 'Freight', 'Carriage', 'Shipping'
+}
+
+def clean_online_retail_rows(
+    df: pd.DataFrame,
+    invoice_col: str = 'InvoiceNo',
+    item_col: str = 'Description',
+    quantity_col: str = 'Quantity',
+    stock_code_col: str = 'StockCode',
+    warn=None
+) -> pd.DataFrame:
+    """
+    Làm sạch kiểu Online Retail trên các dòng (toàn bộ DataFrame hoặc một khối đọc theo chunk):
+    bỏ dòng thiếu mã hóa đơn, hóa đơn hủy (mã bắt đầu bằng 'C'), Quantity NaN hoặc <= 0, StockCode không phải sản phẩm
+    và mô tả chứa từ khóa phí/bưu phí. Dùng chung cho load_transactions_from_file và iter_transaction_chunks_from_file.
+
+    Args:
+        df: Các dòng cần làm sạch
+        warn: Hàm nhận thông báo khi thiếu cột (ví dụ st.warning); None = bỏ qua im lặng
+
+    Returns:
+        DataFrame đã lọc
+    """
+    def skipped(message: str) -> None:
+        if warn is not None:
+            warn(message)
+
+    # Clean invoice numbers and remove cancellations (dòng thiếu mã hóa đơn bị bỏ, không thành hóa đơn 'nan')
+    if invoice_col in df.columns:
+        df = df[df[invoice_col].notna()]
+        df = df.assign(**{invoice_col: df[invoice_col].astype(str)})
+        df = df[~df[invoice_col].str.startswith('C', na=False)] # Thêm na=False để xử lý NaN
+    else:
+        skipped(f"Invoice column '{invoice_col}' not found. Skipping cancellation cleaning.")
+
+    # Clean quantities
+    if quantity_col in df.columns:
+        df = df.assign(**{quantity_col: pd.to_numeric(df[quantity_col], errors='coerce')})
+        df = df[df[quantity_col].notna() & (df[quantity_col] > 0)] # Loại bỏ NaN và <= 0
+    else:
+        skipped(f"Quantity column '{quantity_col}' not found. Skipping quantity-based cleaning.")
+
+    # Clean stock codes
+    if stock_code_col in df.columns:
+        df = df.assign(**{stock_code_col: df[stock_code_col].astype(str).str.strip().str.upper()})
+        df = df[~df[stock_code_col].isin(NON_PRODUCT_STOCK_CODES)]
+    else:
+        skipped(f"StockCode column '{stock_code_col}' not found. Skipping StockCode cleaning.")
+
+    # Clean descriptions
+    if item_col in df.columns:
+        df = df.assign(**{item_col: df[item_col].astype(str).str.strip()})
+        # Tạo regex pattern từ danh sách keywords
+        pattern = '|'.join(re.escape(k) for k in NON_PRODUCT_KEYWORDS)
+        if pattern: # Chỉ áp dụng nếu có keywords
+            df = df[~df[item_col].str.contains(pattern, case=False, na=False)]
+    else:
+        skipped(f"Item column '{item_col}' not found. Skipping description cleaning.")
+    return df
+
+def detect_csv_encoding(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    Chọn bảng mã cho file CSV giống load_transactions_from_file: 'utf-8' nếu cả file giải mã được,
+    nếu không thì 'latin1'. File được đọc theo từng khối nên không nạp toàn bộ vào bộ nhớ.
+    """
+    try:
+        with open(file_path, encoding='utf-8') as csv_file:
+            while csv_file.read(block_size):
+                pass
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin1'
+
 @st.cache_data
 def load_transactions_from_file(
     uploaded_file: Optional[Any],
@@ -47,18 +130,6 @@ def load_transactions_from_file(
     if uploaded_file is None:
         return [], 0, 0, pd.DataFrame()
 
-    # Constants for Online Retail cleaning
-    NON_PRODUCT_STOCK_CODES = {
-        'POST', 'D', 'M', 'BANK CHARGES', 'AMAZONFEE', 'CRUK', 'DCGSSBOY',
-        'DCGSSGIRL', 'PADS', 'DOT', 'S', 'ADJUST', 'ADJUST2', 'SPENSE'
-    }
-    
-    NON_PRODUCT_KEYWORDS = {
-        'POSTAGE', 'DOTCOM POSTAGE', 'MANUAL', 'CHARGES', 'AMAZON FEE',
-        'BANK CHARGES', 'Discount', 'CRUK Commission', 'SAMPLES',
-        'Gift Vouchers', 'Manual', 'Freight', 'Carriage', 'Shipping'
-    }
-
     def load_dataframe() -> Optional[pd.DataFrame]:
         """Helper function to load DataFrame based on file type"""
         try:
@@ -141,36 +212,7 @@ def load_transactions_from_file(
     # Apply Online Retail specific cleaning
     if perform_online_retail_cleaning:
         with st.spinner("Applying Online Retail specific cleaning... This may take a moment for large datasets."):
-            # Clean invoice numbers and remove cancellations
-            if invoice_col in df.columns:
-                 df[invoice_col] = df[invoice_col].astype(str)
-                 df = df[~df[invoice_col].str.startswith('C', na=False)] # Thêm na=False để xử lý NaN
-            else:
-                 st.warning(f"Invoice column '{invoice_col}' not found. Skipping cancellation cleaning.")
-
-            # Clean quantities
-            if quantity_col in df.columns:
-                df[quantity_col] = pd.to_numeric(df[quantity_col], errors='coerce')
-                df = df[df[quantity_col].notna() & (df[quantity_col] > 0)] # Loại bỏ NaN và <= 0
-            else:
-                st.warning(f"Quantity column '{quantity_col}' not found. Skipping quantity-based cleaning.")
-            
-            # Clean stock codes
-            if stock_code_col in df.columns:
-                df[stock_code_col] = df[stock_code_col].astype(str).str.strip().str.upper()
-                df = df[~df[stock_code_col].isin(NON_PRODUCT_STOCK_CODES)]
-            else:
-                 st.warning(f"StockCode column '{stock_code_col}' not found. Skipping StockCode cleaning.")
-
-            # Clean descriptions
-            if item_col in df.columns:
-                df[item_col] = df[item_col].astype(str).str.strip()
-                # Tạo regex pattern từ danh sách keywords
-                pattern = '|'.join(re.escape(k) for k in NON_PRODUCT_KEYWORDS)
-                if pattern: # Chỉ áp dụng nếu có keywords
-                    df = df[~df[item_col].str.contains(pattern, case=False, na=False)]
-            else:
-                 st.warning(f"Item column '{item_col}' not found. Skipping description cleaning.")
+            df = clean_online_retail_rows(df, invoice_col, item_col, quantity_col, stock_code_col, warn=st.warning)
 
         st.info("✅ Online Retail specific cleaning completed.")
 
@@ -216,6 +258,149 @@ def load_transactions_from_file(
         transactions, processed_trans_count, processed_items_count, df
     )
 
+def iter_transaction_chunks_from_file(
+    file_path: str,
+    invoice_col: str = 'InvoiceNo',
+    item_col: str = 'Description',
+    transactions_per_chunk: int = 50000,
+    csv_rows_per_read: int = 200000,
+    encoding: Optional[str] = None,
+    perform_online_retail_cleaning: bool = False,
+    quantity_col: str = 'Quantity',
+    stock_code_col: str = 'StockCode',
+    invoices_sorted: bool = False
+) -> Iterator[List[List[str]]]:
+    """
+    Đọc file CSV theo từng khối và sinh ra các chunk giao dịch, không nạp toàn bộ file vào bộ nhớ.
+    Dùng làm nguồn dữ liệu cho PartitionAlgorithm (mỗi lượt gọi lại hàm này một lần).
+
+    Các dòng của cùng một hóa đơn phải nằm liền nhau trong file (như file xuất Online Retail);
+    hóa đơn cuối của mỗi khối đọc được giữ lại và ghép với khối tiếp theo. Điều kiện này được kiểm tra:
+    nếu một hóa đơn đã kết thúc lại xuất hiện ở dòng sau thì báo ValueError (sắp xếp file theo cột hóa đơn trước).
+    Dòng thiếu mã hóa đơn hoặc thiếu sản phẩm bị bỏ qua.
+
+    Bộ nhớ: chỉ một chunk giao dịch và một khối dòng CSV được giữ cùng lúc. Mặc định, kiểm tra trên còn giữ
+    tập mã các hóa đơn đã đóng, tăng tuyến tính theo số hóa đơn trong file (một chuỗi mã mỗi hóa đơn, không giữ
+    item). Với invoices_sorted=True (file đã sắp xếp theo cột hóa đơn, ví dụ file xuất nhiều năm), mỗi hóa đơn
+    mới chỉ được so với hóa đơn vừa đóng: mã phải tăng dần, nên hóa đơn bị tách kiểu A, B, A vẫn bị phát hiện
+    mà bộ nhớ chỉ phụ thuộc kích thước chunk.
+
+    Args:
+        file_path: Đường dẫn file CSV
+        invoice_col: Tên cột mã hóa đơn/giao dịch
+        item_col: Tên cột sản phẩm
+        transactions_per_chunk: Số giao dịch tối đa mỗi chunk
+        csv_rows_per_read: Số dòng CSV đọc mỗi lần
+        encoding: Bảng mã của file; None = tự chọn như load_transactions_from_file (utf-8, nếu lỗi thì latin1)
+        perform_online_retail_cleaning: Làm sạch từng khối bằng clean_online_retail_rows (giống bản nạp toàn bộ)
+        quantity_col: Tên cột số lượng (chỉ dùng khi làm sạch)
+        stock_code_col: Tên cột mã hàng (chỉ dùng khi làm sạch)
+        invoices_sorted: Mã hóa đơn tăng dần (so sánh chuỗi) trong file; kiểm tra thứ tự thay vì giữ tập mã đã đóng
+
+    Yields:
+        List các giao dịch (mỗi giao dịch là list item đã sắp xếp, không trùng)
+    """
+    if not file_path.lower().endswith('.csv'):
+        raise ValueError("Chỉ hỗ trợ đọc theo khối cho file CSV.")
+    if encoding is None:
+        encoding = detect_csv_encoding(file_path)
+    usecols = [invoice_col, item_col]
+    if perform_online_retail_cleaning:
+        usecols += [quantity_col, stock_code_col]
+    usecols = list(dict.fromkeys(usecols))
+
+    chunk: List[List[str]] = []
+    pending_invoice = None
+    pending_items: set = set()
+    # Mã các hóa đơn đã đóng (tăng theo số hóa đơn), để phát hiện file không gom liền; không cần khi file đã sắp xếp
+    finished_invoices: Optional[set] = None if invoices_sorted else set()
+
+    for rows in pd.read_csv(file_path, usecols=usecols, chunksize=csv_rows_per_read, encoding=encoding,
+                            dtype={invoice_col: str, item_col: str, stock_code_col: str}):
+        rows = rows.dropna(subset=[invoice_col, item_col])
+        if perform_online_retail_cleaning:
+            rows = clean_online_retail_rows(rows, invoice_col, item_col, quantity_col, stock_code_col)
+        for invoice, item in zip(rows[invoice_col].str.strip(), rows[item_col].str.strip()):
+            if invoice != pending_invoice:
+                if finished_invoices is None:
+                    if pending_invoice is not None and invoice < pending_invoice:
+                        raise ValueError(f"Hóa đơn '{invoice}' đứng sau '{pending_invoice}' trong file; với "
+                                         f"invoices_sorted=True file phải được sắp xếp theo cột '{invoice_col}'.")
+                elif invoice in finished_invoices:
+                    raise ValueError(f"Các dòng của hóa đơn '{invoice}' không nằm liền nhau trong file; "
+                                     f"hãy sắp xếp file theo cột '{invoice_col}' trước khi đọc theo khối.")
+                elif pending_invoice is not None:
+                    finished_invoices.add(pending_invoice)
+                if pending_items:
+                    chunk.append(sorted(pending_items))
+                    if len(chunk) >= transactions_per_chunk:
+                        yield chunk
+                        chunk = []
+                pending_invoice = invoice
+                pending_items = set()
+            if item:
+                pending_items.add(item)
+
+    if pending_items:
+        chunk.append(sorted(pending_items))
+    if chunk:
+        yield chunk
+
+def timestamped_transactions_from_dataframe(
+    df: pd.DataFrame,
+    invoice_col: str = 'InvoiceNo',
+    item_col: str = 'Description',
+    date_col: str = 'InvoiceDate'
+) -> List[Tuple[pd.Timestamp, List[str]]]:
+    """
+    Gom DataFrame (ví dụ DataFrame đã xử lý do load_transactions_from_file trả về) thành các cặp
+    (thời điểm hóa đơn, items) sắp theo InvoiceDate, làm luồng đầu vào cho SlidingWindowFPMiner.
+
+    Args:
+        df: DataFrame chứa các cột hóa đơn, sản phẩm và ngày
+        invoice_col: Tên cột mã hóa đơn/giao dịch
+        item_col: Tên cột sản phẩm
+        date_col: Tên cột thời điểm hóa đơn
+
+    Returns:
+        List các cặp (timestamp, list item đã sắp xếp, không trùng) theo thời gian tăng dần
+    """
+    missing_cols = [col for col in (invoice_col, item_col, date_col) if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Thiếu cột: {', '.join(missing_cols)}")
+    rows = df[[invoice_col, item_col, date_col]].dropna(subset=[item_col, date_col])
+    rows = rows.assign(**{date_col: pd.to_datetime(rows[date_col]),
+                          item_col: rows[item_col].astype(str).str.strip()})
+    rows = rows[rows[item_col] != '']
+    grouped = rows.groupby(invoice_col).agg({date_col: 'min', item_col: lambda items: sorted(set(items))})
+    grouped = grouped.sort_values(date_col, kind='stable')
+    return list(zip(grouped[date_col], grouped[item_col]))
+
+def compress_duplicate_transactions(
+    transactions: List[List[Any]],
+    metrics=None
+) -> List[Tuple[List[Any], int]]:
+    """
+    Gộp các giao dịch giống hệt nhau (so sánh theo tập item, bỏ item lặp, đã sắp xếp) thành cặp (items, số lần lặp).
+    Các engine nhận số lần lặp qua tham số transaction_weights nên mỗi giỏ hàng trùng chỉ được quét một lần.
+
+    Args:
+        transactions: List các giao dịch (mỗi giao dịch là list item)
+        metrics: PerformanceMetrics (tùy chọn) để ghi lại số giao dịch trước/sau khi gộp và thời gian gộp
+
+    Returns:
+        List các cặp (items đã sắp xếp, không trùng, multiplicity) theo thứ tự xuất hiện đầu tiên
+    """
+    started = time.perf_counter()
+    multiplicities: dict = {}
+    for transaction in transactions:
+        key = tuple(sorted(set(transaction))) # Item lặp trong một giỏ không làm giỏ khác đi
+        multiplicities[key] = multiplicities.get(key, 0) + 1
+    compressed = [(list(items), multiplicity) for items, multiplicity in multiplicities.items()]
+    if metrics is not None:
+        metrics.record_transaction_compression(len(transactions), len(compressed), time.perf_counter() - started)
+    return compressed
+
 def get_unique_items_from_transactions(transactions: List[List[str]]) -> List[str]:
     """
     Get unique items from all transactions.
@@ -0,0 +1,81 @@
+# utils/item_encoding.py
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional
+
+def _estimate_transactions_mb(transactions: List[List[Any]]) -> float:
+    """Ước lượng bộ nhớ (MB) của danh sách giao dịch: các list cộng với mỗi đối tượng item khác nhau (tính một lần)."""
+    seen_item_ids = set()
+    total_bytes = sys.getsizeof(transactions)
+    for transaction in transactions:
+        total_bytes += sys.getsizeof(transaction)
+        for item in transaction:
+            if id(item) not in seen_item_ids:
+                seen_item_ids.add(id(item))
+                total_bytes += sys.getsizeof(item)
+    return total_bytes / (1024 * 1024)
+
+class ItemVocabulary:
+    """
+    Bảng mã item dùng chung cho các thuật toán: ánh xạ mỗi item (thường là chuỗi mô tả sản phẩm dài)
+    sang một số nguyên liên tiếp, xếp hạng theo tần suất giảm dần (id 0 = item phổ biến nhất).
+    Thuật toán chạy trên id; kết quả chỉ được giải mã ở bước cuối (tập mục phổ biến, luật).
+    """
+    def __init__(self, items_by_rank: List[Hashable]):
+        self.id_to_item = list(items_by_rank)
+        self.item_to_id = {item: item_id for item_id, item in enumerate(self.id_to_item)}
+
+    def __len__(self):
+        return len(self.id_to_item)
+
+    @classmethod
+    def from_transactions(cls, transactions: List[List[Hashable]]) -> "ItemVocabulary":
+        """Xây bảng mã từ giao dịch: đếm tần suất một lần, sắp theo (-count, item)."""
+        item_counts = Counter()
+        for transaction in transactions:
+            item_counts.update(set(transaction))
+        return cls(sorted(item_counts, key=lambda item: (-item_counts[item], item)))
+
+    def encode_transactions(self, transactions: List[List[Hashable]], metrics=None) -> List[List[int]]:
+        """
+        Mã hóa giao dịch sang list id. Nếu có metrics, ghi lại thời gian mã hóa và
+        bộ nhớ ước lượng của giao dịch trước/sau mã hóa.
+        """
+        started = time.perf_counter()
+        item_to_id = self.item_to_id
+        encoded = [[item_to_id[item] for item in transaction] for transaction in transactions]
+        if metrics is not None:
+            metrics.record_item_encoding(len(self), time.perf_counter() - started,
+                                         _estimate_transactions_mb(transactions),
+                                         _estimate_transactions_mb(encoded))
+        return encoded
+
+    def decode_itemset(self, itemset: FrozenSet[int]) -> FrozenSet[Hashable]:
+        return frozenset(self.id_to_item[item_id] for item_id in itemset)
+
+    def decode_itemsets(self, itemsets: Dict[FrozenSet[int], int], metrics=None) -> Dict[FrozenSet[Hashable], int]:
+        """Giải mã {frozenset id: support} sang {frozenset item: support}."""
+        started = time.perf_counter()
+        decoded = {self.decode_itemset(itemset): support for itemset, support in itemsets.items()}
+        if metrics is not None:
+            metrics.record_item_decoding(time.perf_counter() - started)
+        return decoded
+
+    def decode_rules(self, rules: List[Dict[str, Any]], metrics=None) -> List[Dict[str, Any]]:
+        """Giải mã tiền đề/hậu quả của các luật (các chỉ số khác giữ nguyên)."""
+        started = time.perf_counter()
+        decoded_rules = []
+        for rule in rules:
+            decoded_rule = dict(rule)
+            decoded_rule["antecedent"] = tuple(sorted(self.id_to_item[item_id] for item_id in rule["antecedent"]))
+            decoded_rule["consequent"] = tuple(sorted(self.id_to_item[item_id] for item_id in rule["consequent"]))
+            decoded_rules.append(decoded_rule)
+        if metrics is not None:
+            metrics.record_item_decoding(time.perf_counter() - started)
+        return decoded_rules
+
+    def as_table(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Bảng (id, item) để hiển thị trong giao diện."""
+        items = self.id_to_item if limit is None else self.id_to_item[:limit]
+        return [{"ID": item_id, "Item": item} for item_id, item in enumerate(items)]
@@ -17,11 +17,43 @@ class PerformanceMetrics:
         self.current_step_start_time = None
         self.current_step_memory_before = None
         
+        # Mã hóa item thành số nguyên (không bị reset bởi start_overall_measurement vì diễn ra trước run())
+        self.item_encoding_stats = None
+        self.item_decoding_seconds = 0.0
+        self.transaction_compression_stats = None # Gộp giỏ hàng trùng thành giao dịch có trọng số
+
         # Specific metrics for algorithms
         self.apriori_candidates_generated_at_k = defaultdict(int)
         self.apriori_frequent_items_at_k = defaultdict(int)
+        self.apriori_hash_pruned_at_k = defaultdict(int) # Số ứng viên bị loại bởi bucket DHP
+        self.apriori_db_size_at_k = {} # Số giao dịch còn lại khi quét mức k (chế độ rút gọn DB)
+        self.apriori_worker_timings = [] # Thời gian đếm của từng worker (chế độ song song)
         self.fp_nodes_in_tree = 0
         self.fp_conditional_trees_built = 0
+        self.fp_cpb_seconds = 0.0 # Tổng thời gian lấy CPB (duyệt node-link) và đếm item trong CPB (hoặc FP-array)
+        self.fp_conditional_build_seconds = 0.0 # Tổng thời gian xây các Conditional FP-Tree (sắp xếp đường đi + chèn)
+        self.fp_header_items_skipped = 0 # Item header dưới ngưỡng bị bỏ qua khi khai phá lại cây đã xây (mine_from_tree)
+        self.fp_array_scans_skipped = 0 # Số lần count trong CPB được lấy từ FP-array thay vì quét CPB
+        self.fp_array_dense_trees = 0 # Số cây không dựng FP-array vì dữ liệu quá dày (phép thử mật độ)
+        self.fp_conditional_trees_released = 0 # Số cây được giải phóng sớm (miner lặp với max_alive_trees)
+        self.fp_peak_alive_conditional_trees = 0 # Số Conditional FP-Tree giữ cùng lúc nhiều nhất (miner lặp)
+        self.fp_closed_items_merged = 0 # Số item được gộp thẳng vào tiền tố (chế độ tập đóng)
+        self.fp_closed_candidates_pruned = 0 # Số ứng viên (và nhánh con) bị loại vì đã có tập cha đóng cùng support
+        self.fp_maximal_subtrees_skipped = 0 # Số nhánh bị bỏ qua nhờ lookahead (chế độ tập tối đại)
+        self.fp_maximal_tree_nodes = 0 # Số nút của MFI-tree
+        self.fp_top_k_thresholds = [] # Các giá trị ngưỡng support lần lượt được nâng lên (chế độ top-k)
+        self.fp_projection_stats = [] # Mỗi projected DB trên đĩa (chế độ out_of_core): item, số giao dịch, bytes, thời gian
+        self.fp_incremental_updates = [] # Mỗi lần thêm/xóa giao dịch của IncrementalFPTree
+        self.fp_tree_persistence = [] # Các lần lưu/nạp FP-Tree: thao tác, thời gian, kích thước file
+        self.fp_worker_timings = [] # Thời gian khai phá của từng nhóm CPB (chế độ song song)
+        self.fp_tree_memory_stats = {} # Cách lưu FP-Tree chính và bộ nhớ ước tính của nó
+        self.eclat_frequent_items_at_k = defaultdict(int)
+        self.partition_chunk_stats = [] # Số liệu từng chunk ở lượt 1 (chế độ Partition/SON)
+        self.partition_false_positives = 0
+        self.sampling_sample_stats = {} # Kích thước mẫu, ngưỡng hạ, số itemset phổ biến trên mẫu (chế độ Toivonen)
+        self.sampling_scans = [] # Số liệu từng lần quét toàn DB để kiểm chứng
+        self.eclat_tidset_intersections = 0
+        self.eclat_max_depth = 0
 
     def _get_memory_usage_mb(self):
         """Trả về mức sử dụng bộ nhớ hiện tại của tiến trình (MB)."""
@@ -74,12 +106,119 @@ class PerformanceMetrics:
         self.current_step_start_time = None
         self.current_step_memory_before = None
 
-    def record_apriori_candidates(self, k, count):
+    def record_item_encoding(self, vocabulary_size, encode_seconds, transactions_MB_before, transactions_MB_after):
+        self.item_encoding_stats = {
+            "vocabulary_size": vocabulary_size,
+            "encode_seconds": encode_seconds,
+            "transactions_MB_before": transactions_MB_before,
+            "transactions_MB_after": transactions_MB_after,
+        }
+
+    def record_item_decoding(self, decode_seconds):
+        self.item_decoding_seconds += decode_seconds
+
+    def record_transaction_compression(self, original_transactions, unique_transactions, compress_seconds):
+        self.transaction_compression_stats = {
+            "original_transactions": original_transactions,
+            "unique_transactions": unique_transactions,
+            "compress_seconds": compress_seconds,
+        }
+
+    def record_apriori_candidates(self, k, count, pruned_by_hash=0):
         self.apriori_candidates_generated_at_k[k] += count
+        if pruned_by_hash:
+            self.apriori_hash_pruned_at_k[k] += pruned_by_hash
 
     def record_apriori_frequent_items(self, k, count):
         self.apriori_frequent_items_at_k[k] += count
 
+    def record_apriori_db_size(self, k, transaction_count):
+        self.apriori_db_size_at_k[k] = transaction_count
+
+    def record_apriori_worker_timing(self, k, shard_index, worker_pid, duration_seconds, transactions_counted):
+        self.apriori_worker_timings.append({
+            "k": k,
+            "shard": shard_index,
+            "worker_pid": worker_pid,
+            "duration_seconds": duration_seconds,
+            "transactions": transactions_counted,
+        })
+
+    def record_fp_tree_memory(self, representation, total_bytes, num_nodes, build_peak_bytes=None):
+        self.fp_tree_memory_stats = {
+            "representation": representation,
+            "total_bytes": total_bytes,
+            # Bộ nhớ lúc vừa xây xong, trước khi bỏ các cấu trúc chỉ dùng khi chèn (bảng băm con của cây mảng)
+            "build_peak_bytes": total_bytes if build_peak_bytes is None else build_peak_bytes,
+            "num_nodes": num_nodes,
+        }
+
+    def record_fp_worker_timing(self, group_index, worker_pid, duration_seconds, items_mined, estimated_size):
+        self.fp_worker_timings.append({
+            "group": group_index,
+            "worker_pid": worker_pid,
+            "duration_seconds": duration_seconds,
+            "items": items_mined,
+            "estimated_size": estimated_size,
+        })
+
+    def record_fp_projection(self, item, num_transactions, spill_bytes, duration_seconds):
+        self.fp_projection_stats.append({
+            "item": item,
+            "transactions": num_transactions,
+            "spill_bytes": spill_bytes,
+            "duration_seconds": duration_seconds,
+        })
+
+    def record_fp_incremental_update(self, num_transactions, duration_seconds, nodes_after, expired=0):
+        self.fp_incremental_updates.append({
+            "transactions": num_transactions,
+            "expired": expired,
+            "duration_seconds": duration_seconds,
+            "nodes_after": nodes_after,
+        })
+
+    def record_fp_tree_persistence(self, operation, duration_seconds, file_bytes):
+        self.fp_tree_persistence.append({
+            "operation": operation,
+            "duration_seconds": duration_seconds,
+            "file_MB": round(file_bytes / (1024 * 1024), 3),
+        })
+
+    def record_fp_cpb_time(self, seconds):
+        self.fp_cpb_seconds += seconds
+
+    def record_fp_conditional_build_time(self, seconds):
+        self.fp_conditional_build_seconds += seconds
+
+    def record_fp_top_k_threshold(self, support_threshold):
+        self.fp_top_k_thresholds.append(support_threshold)
+
+    def record_partition_chunk(self, chunk_index, transaction_count, local_min_support_count, local_frequent_count):
+        self.partition_chunk_stats.append({
+            "chunk": chunk_index,
+            "transactions": transaction_count,
+            "local_min_support_count": local_min_support_count,
+            "local_frequent_itemsets": local_frequent_count,
+        })
+
+    def record_sampling_sample(self, sample_size, lowered_min_support_count, sample_frequent_count):
+        self.sampling_sample_stats = {
+            "sample_size": sample_size,
+            "lowered_min_support_count": lowered_min_support_count,
+            "sample_frequent_itemsets": sample_frequent_count,
+        }
+
+    def record_sampling_scan(self, scan_index, itemsets_counted, border_misses):
+        self.sampling_scans.append({
+            "scan": scan_index,
+            "itemsets_counted": itemsets_counted,
+            "border_misses": border_misses,
+        })
+
+    def record_eclat_frequent_items(self, k, count):
+        self.eclat_frequent_items_at_k[k] += count
+
     def get_overall_metrics_summary(self):
         """Trả về tóm tắt số liệu tổng thể."""
         if self.overall_start_time is None or self.overall_end_time is None:
@@ -106,6 +245,21 @@ class PerformanceMetrics:
             "peak_memory_usage_MB": f"{peak_memory:.2f}" if peak_memory > 0 else "N/A (ước tính)"
         }
 
+    def get_item_encoding_summary(self):
+        """Trả về số liệu mã hóa/giải mã item, hoặc None nếu lần chạy không dùng bảng mã."""
+        if self.item_encoding_stats is None:
+            return None
+        return dict(self.item_encoding_stats, decode_seconds=self.item_decoding_seconds)
+
+    def get_transaction_compression_summary(self):
+        """Trả về số liệu gộp giao dịch trùng (kèm tỷ lệ trùng lặp), hoặc None nếu không dùng."""
+        if self.transaction_compression_stats is None:
+            return None
+        stats = self.transaction_compression_stats
+        duplicates = stats["original_transactions"] - stats["unique_transactions"]
+        duplication_rate = duplicates / stats["original_transactions"] if stats["original_transactions"] else 0.0
+        return dict(stats, duplication_rate=duplication_rate)
+
     def get_step_metrics_table(self):
         """Trả về dữ liệu các bước dưới dạng list of dicts, phù hợp cho Pandas DataFrame."""
         return self.step_timings
@@ -118,12 +272,70 @@ class PerformanceMetrics:
             "total_frequent_itemsets_found": total_frequent,
             "candidates_per_k": dict(self.apriori_candidates_generated_at_k),
             "frequent_itemsets_per_k": dict(self.apriori_frequent_items_at_k),
+            "db_size_per_k": dict(self.apriori_db_size_at_k),
+            "worker_timings": list(self.apriori_worker_timings),
+            "hash_pruned_per_k": dict(self.apriori_hash_pruned_at_k),
+            "hash_pruning_ratio_per_k": {
+                k: pruned / (pruned + self.apriori_candidates_generated_at_k[k])
+                for k, pruned in self.apriori_hash_pruned_at_k.items()
+            },
         }
 
     def get_fp_growth_metrics_summary(self):
         return {
             "nodes_in_fp_tree": self.fp_nodes_in_tree,
             "conditional_fp_trees_built": self.fp_conditional_trees_built,
+            "conditional_fp_trees_released": self.fp_conditional_trees_released,
+            "peak_alive_conditional_trees": self.fp_peak_alive_conditional_trees,
+            "cpb_seconds": round(self.fp_cpb_seconds, 4),
+            "conditional_build_seconds": round(self.fp_conditional_build_seconds, 4),
+            "fp_array_scans_skipped": self.fp_array_scans_skipped,
+            "fp_array_dense_trees": self.fp_array_dense_trees,
+            "header_items_skipped": self.fp_header_items_skipped,
+            "worker_timings": list(self.fp_worker_timings),
+            "incremental_updates": list(self.fp_incremental_updates),
+            "tree_persistence": list(self.fp_tree_persistence),
+            "projected_databases": len(self.fp_projection_stats),
+            "largest_projection_transactions": max((stats["transactions"] for stats in self.fp_projection_stats), default=0),
+            "spilled_MB": round(sum(stats["spill_bytes"] for stats in self.fp_projection_stats) / (1024 * 1024), 3),
+            "closed_items_merged": self.fp_closed_items_merged,
+            "closed_candidates_pruned": self.fp_closed_candidates_pruned,
+            "maximal_subtrees_skipped": self.fp_maximal_subtrees_skipped,
+            "maximal_tree_nodes": self.fp_maximal_tree_nodes,
+            "top_k_threshold_raises": len(self.fp_top_k_thresholds),
+            "top_k_final_threshold": self.fp_top_k_thresholds[-1] if self.fp_top_k_thresholds else None,
+            "tree_representation": self.fp_tree_memory_stats.get("representation"),
+            "tree_memory_MB": self.fp_tree_memory_stats.get("total_bytes", 0) / (1024 * 1024),
+            "memory_per_node_bytes": (self.fp_tree_memory_stats["total_bytes"] / self.fp_tree_memory_stats["num_nodes"]
+                                      if self.fp_tree_memory_stats.get("num_nodes") else 0),
+            "tree_build_peak_MB": self.fp_tree_memory_stats.get("build_peak_bytes", 0) / (1024 * 1024),
+            "build_peak_per_node_bytes": (self.fp_tree_memory_stats["build_peak_bytes"] / self.fp_tree_memory_stats["num_nodes"]
+                                          if self.fp_tree_memory_stats.get("num_nodes") else 0),
+        }
+
+    def get_eclat_metrics_summary(self):
+        return {
+            "tidset_intersections": self.eclat_tidset_intersections,
+            "max_depth": self.eclat_max_depth,
+            "total_frequent_itemsets_found": sum(self.eclat_frequent_items_at_k.values()),
+            "frequent_itemsets_per_k": dict(self.eclat_frequent_items_at_k),
+        }
+
+    def get_partition_metrics_summary(self):
+        return {
+            "chunks": len(self.partition_chunk_stats),
+            "max_chunk_transactions": max((c["transactions"] for c in self.partition_chunk_stats), default=0),
+            "candidates_rejected_in_pass_2": self.partition_false_positives,
+            "chunk_stats": list(self.partition_chunk_stats),
+        }
+
+    def get_sampling_metrics_summary(self):
+        return {
+            "sample_size": self.sampling_sample_stats.get("sample_size", 0),
+            "lowered_min_support_count": self.sampling_sample_stats.get("lowered_min_support_count"),
+            "full_database_scans": len(self.sampling_scans),
+            "total_border_misses": sum(scan["border_misses"] for scan in self.sampling_scans),
+            "scan_stats": list(self.sampling_scans),
         }
 
     def get_node_count_for_step(self, step_name_to_find: str) -> Optional[int]:
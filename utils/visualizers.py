@@ -29,12 +29,12 @@ def display_itemsets_table(st_container, title, itemsets_data, k=None, support_t
     if isinstance(itemsets_data, dict):
         for itemset, count in itemsets_data.items():
             display_data.append({
-                "Itemset": ", ".join(sorted(list(itemset))), 
+                "Itemset": ", ".join(map(str, sorted(itemset))),
                 support_type: count
             })
     elif isinstance(itemsets_data, list) or isinstance(itemsets_data, set): # Dành cho danh sách ứng viên chưa có count
          for itemset in itemsets_data:
-            display_data.append({"Itemset": ", ".join(sorted(list(itemset)))})
+            display_data.append({"Itemset": ", ".join(map(str, sorted(itemset)))})
     
     if display_data:
         # Sắp xếp theo Itemset để dễ theo dõi
@@ -49,7 +49,7 @@ def visualize_fp_tree_interactive(st_container, tree_root, header_table, title="
     Trực quan hóa FP-Tree bằng Graphviz và hiển thị trong Streamlit.
     Args:
         st_container: Streamlit container.
-        tree_root (TreeNode): Nút gốc của FP-Tree.
+        tree_root (TreeNode | ArrayTreeNode): Nút gốc của FP-Tree.
         header_table (dict): Bảng header của FP-Tree.
         title (str): Tiêu đề cho biểu đồ.
         graph_size (str, optional): Kích thước của biểu đồ Graphviz, ví dụ "8,6".
@@ -214,6 +214,27 @@ def display_conditional_step_details(st_container, item_suffix, cpb_data, cond_t
             ht_data_display = [{"Item": item, "Count": data['count'], "Đầu chuỗi Node Link": f"-> {getattr(data['node'], 'item_name', 'Unknown')}:{data['node'].count}" if data['node'] else "Không có"} for item, data in sorted(cond_header_table.items(), key=lambda x: x[1]['count'], reverse=True)]
             st_container.dataframe(ht_data_display)
 
+def display_item_encoding_summary(st_container, encoding_summary, vocabulary=None):
+    """
+    Hiển thị số liệu của bảng mã item (thời gian mã hóa/giải mã, bộ nhớ giao dịch trước/sau).
+    Args:
+        st_container: Streamlit container.
+        encoding_summary (dict): Kết quả PerformanceMetrics.get_item_encoding_summary().
+        vocabulary (ItemVocabulary, optional): Bảng mã để hiển thị ánh xạ id -> item.
+    """
+    st_container.subheader("Mã hóa item thành số nguyên:")
+    col_before, col_after, col_time = st_container.columns(3)
+    col_before.metric(label="Bộ nhớ giao dịch (chuỗi)", value=f"{encoding_summary['transactions_MB_before']:.2f} MB")
+    col_after.metric(label="Bộ nhớ giao dịch (id)", value=f"{encoding_summary['transactions_MB_after']:.2f} MB",
+                     delta=f"{encoding_summary['transactions_MB_after'] - encoding_summary['transactions_MB_before']:+.2f} MB",
+                     delta_color="inverse")
+    col_time.metric(label="Mã hóa / Giải mã", value=f"{encoding_summary['encode_seconds']:.4f} / {encoding_summary['decode_seconds']:.4f} giây")
+    st_container.caption(f"Số item trong bảng mã: {encoding_summary['vocabulary_size']}. "
+                         "Các bước trung gian hiển thị item dưới dạng id.")
+    if vocabulary is not None:
+        vocabulary_expander = st_container.expander("Bảng mã item (id -> item, theo tần suất giảm dần)", expanded=False)
+        vocabulary_expander.dataframe(vocabulary.as_table(), hide_index=True)
+
 def display_rules_table(st_container, title, rules_data, num_transactions):
     """
     Hiển thị bảng các luật kết hợp.
@@ -233,8 +254,8 @@ def display_rules_table(st_container, title, rules_data, num_transactions):
     formatted_rules = []
     for rule in rules_data:
         formatted_rules.append({
-            "Tiền đề (Antecedent)": ", ".join(rule['antecedent']),
-            "Hậu quả (Consequent)": ", ".join(rule['consequent']),
+            "Tiền đề (Antecedent)": ", ".join(map(str, rule['antecedent'])),
+            "Hậu quả (Consequent)": ", ".join(map(str, rule['consequent'])),
             "Support": f"{rule['support']:.4f}",
             "Confidence": f"{rule['confidence']:.4f}",
             "Lift": f"{rule['lift']:.2f}",